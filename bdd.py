@@ -0,0 +1,411 @@
+"""Символьное вычисление схемы на упорядоченных сокращённых BDD (ROBDD).
+
+BDD хранит узлы в параллельных списках (уровень переменной, low, high);
+уникальная таблица гарантирует, что одинаковые функции — один и тот же
+узел, поэтому проверка эквивалентности выходов сводится к сравнению
+номеров. Операции строятся на ite() с кэшем вычисленных результатов.
+Сборка мусора — пометка от внешних ссылок (ref/deref) и освобождение
+остальных узлов в список свободных между операциями.
+
+Размер BDD определяется порядком переменных, поэтому CircuitBDD строится
+с одной из эвристик ORDER_HEURISTICS; 'best' пробует все и оставляет
+наименьшую диаграмму. Регистры и тактовые генераторы считаются равными 0,
+как в таблице истинности.
+"""
+from circuit_core import SOURCE_TYPES, REGISTER_TYPES
+
+FALSE, TRUE = 0, 1
+GC_THRESHOLD = 1 << 18  # узлов в уникальной таблице до первой сборки мусора
+MAX_NODES = 1 << 21  # предел размера, после которого построение прерывается
+ORDER_HEURISTICS = ('dfs', 'depth', 'input')
+
+
+class BDDLimitError(Exception):
+    """Диаграмма превысила допустимое число узлов"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        super().__init__(f"BDD превысила {limit} узлов — попробуйте другой порядок переменных")
+
+
+class BDD:
+    """Менеджер ROBDD над n_vars переменными (уровни 0 .. n_vars - 1)"""
+
+    def __init__(self, n_vars, max_nodes=MAX_NODES):
+        self.n_vars = n_vars
+        self.max_nodes = max_nodes
+        # Терминалы FALSE и TRUE лежат ниже всех переменных
+        self.level = [n_vars, n_vars]
+        self.low = [FALSE, TRUE]
+        self.high = [FALSE, TRUE]
+        self.unique = {}  # (уровень, low, high) -> узел
+        self.cache = {}  # (f, g, h) -> ite(f, g, h)
+        self.free = []
+        self.refs = {}  # внешние ссылки: узел -> счётчик
+        self.gc_threshold = GC_THRESHOLD
+        self.collections = 0
+
+    def __len__(self):
+        """Число живых внутренних узлов"""
+        return len(self.unique)
+
+    def mk(self, level, low, high):
+        """Узел с уникальностью и сокращением одинаковых потомков"""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            if len(self.unique) >= self.max_nodes:
+                raise BDDLimitError(self.max_nodes)
+            if self.free:
+                node = self.free.pop()
+                self.level[node] = level
+                self.low[node] = low
+                self.high[node] = high
+            else:
+                node = len(self.level)
+                self.level.append(level)
+                self.low.append(low)
+                self.high.append(high)
+            self.unique[key] = node
+        return node
+
+    def var(self, level):
+        """Функция, равная переменной уровня level"""
+        return self.mk(level, FALSE, TRUE)
+
+    def ite(self, f, g, h):
+        """if f then g else h — базовая операция, через которую выражаются остальные"""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        node = self.cache.get(key)
+        if node is not None:
+            return node
+
+        level, low, high = self.level, self.low, self.high
+        top = min(level[f], level[g], level[h])
+        f0, f1 = (low[f], high[f]) if level[f] == top else (f, f)
+        g0, g1 = (low[g], high[g]) if level[g] == top else (g, g)
+        h0, h1 = (low[h], high[h]) if level[h] == top else (h, h)
+        node = self.mk(top, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self.cache[key] = node
+        return node
+
+    def not_(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def and_(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def or_(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def xor(self, f, g):
+        return self.ite(f, self.not_(g), g)
+
+    def ref(self, node):
+        """Защищает узел от сборки мусора"""
+        self.refs[node] = self.refs.get(node, 0) + 1
+        return node
+
+    def deref(self, node):
+        """Снимает внешнюю ссылку"""
+        count = self.refs[node] - 1
+        if count:
+            self.refs[node] = count
+        else:
+            del self.refs[node]
+
+    def collect(self):
+        """Освобождает узлы, недостижимые из внешних ссылок; возвращает их число"""
+        low, high = self.low, self.high
+        marked = bytearray(len(self.level))
+        marked[FALSE] = marked[TRUE] = 1
+        stack = list(self.refs)
+        while stack:
+            node = stack.pop()
+            if not marked[node]:
+                marked[node] = 1
+                stack.append(low[node])
+                stack.append(high[node])
+
+        dead = [key for key, node in self.unique.items() if not marked[node]]
+        for key in dead:
+            self.free.append(self.unique.pop(key))
+        # В кэше могут быть ссылки на освобождённые узлы
+        self.cache.clear()
+        self.collections += 1
+        return len(dead)
+
+    def maybe_collect(self):
+        """Сборка мусора между операциями при разрастании уникальной таблицы"""
+        if len(self.unique) > self.gc_threshold:
+            self.collect()
+            if len(self.unique) > self.gc_threshold // 2:
+                self.gc_threshold *= 2
+
+    def size(self, roots):
+        """Число внутренних узлов, достижимых из roots"""
+        seen = set()
+        stack = [node for node in roots if node > TRUE]
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(child for child in (self.low[node], self.high[node]) if child > TRUE)
+        return len(seen)
+
+    def sat_count(self, f):
+        """Число наборов всех n_vars переменных, на которых f = 1"""
+        level, low, high = self.level, self.low, self.high
+        counts = {FALSE: 0, TRUE: 1}  # наборы переменных с уровня узла и ниже
+        stack = [f]
+        while stack:
+            node = stack[-1]
+            if node in counts:
+                stack.pop()
+                continue
+            pending = [child for child in (low[node], high[node]) if child not in counts]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            counts[node] = sum(counts[child] << (level[child] - level[node] - 1)
+                               for child in (low[node], high[node]))
+        return counts[f] << level[f]
+
+    def satisfy_one(self, f):
+        """Набор {уровень: значение}, на котором f = 1 (None, если f ≡ 0).
+
+        На каждом уровне предпочитается 0, пропущенные уровни равны 0.
+        """
+        if f == FALSE:
+            return None
+        assignment = {}
+        while f > TRUE:
+            if self.low[f] != FALSE:
+                assignment[self.level[f]] = 0
+                f = self.low[f]
+            else:
+                assignment[self.level[f]] = 1
+                f = self.high[f]
+        return assignment
+
+    def cubes(self, f, limit=None):
+        """Непересекающиеся кубы {уровень: значение}, покрывающие единицы f.
+
+        Каждый куб — путь от f до TRUE; переменные вне пути безразличны.
+        """
+        found = 0
+        stack = [(f, {})]
+        while stack and (limit is None or found < limit):
+            node, cube = stack.pop()
+            if node == TRUE:
+                found += 1
+                yield cube
+            elif node != FALSE:
+                level = self.level[node]
+                stack.append((self.high[node], {**cube, level: 1}))
+                stack.append((self.low[node], {**cube, level: 0}))
+
+
+def variable_order(netlist, heuristic='dfs'):
+    """Порядок переменных: позиции в netlist.inputs от верхнего уровня к нижнему.
+
+    'input' — порядок добавления IN; 'dfs' — порядок первого достижения при
+    обходе в глубину от выходов (переменные одного конуса оказываются рядом,
+    у сумматоров биты a_i и b_i чередуются); 'depth' — то же, но сначала
+    обходятся более глубокие источники (эвристика Фудзиты).
+    """
+    n_in = len(netlist.inputs)
+    if heuristic == 'input':
+        return list(range(n_in))
+    if heuristic not in ORDER_HEURISTICS:
+        raise ValueError(f"неизвестная эвристика порядка: {heuristic}")
+
+    position = {node: p for p, node in enumerate(netlist.inputs)}
+    fanin, level = netlist.fanin, netlist.level
+    order = []
+    seen = set()
+    for out in netlist.outputs:
+        stack = [out]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if node in position:
+                order.append(position[node])
+            elif netlist.types[node] not in REGISTER_TYPES:
+                srcs = fanin[node]
+                if heuristic == 'depth':
+                    srcs = sorted(srcs, key=lambda src: level[src])
+                # Стек: первым обходится последний добавленный источник
+                stack.extend(reversed(srcs) if heuristic == 'dfs' else srcs)
+    reached = set(order)
+    return order + [p for p in range(n_in) if p not in reached]
+
+
+class CircuitBDD:
+    """BDD всех выходов схемы в одном менеджере.
+
+    order — имя эвристики или готовый список позиций IN по уровням.
+    Несколько схем можно строить в одном менеджере (bdd=...), если у них
+    совпадает число входов: переменные сопоставляются по позиции IN.
+    """
+
+    def __init__(self, netlist, order='dfs', bdd=None, max_nodes=MAX_NODES):
+        n_in = len(netlist.inputs)
+        self.netlist = netlist
+        if order == 'best' and bdd is None:
+            best = self.best_of(netlist, max_nodes)
+            self.order, self.bdd = best.order, best.bdd
+            self.variables, self.outputs = best.variables, best.outputs
+            return
+        if isinstance(order, str):
+            order = variable_order(netlist, 'dfs' if order == 'best' else order)
+        self.order = list(order)
+        self.bdd = bdd if bdd is not None else BDD(n_in, max_nodes)
+        self.variables = [FALSE] * n_in
+        for level, p in enumerate(self.order):
+            self.variables[p] = self.bdd.ref(self.bdd.var(level))
+        self.outputs = self.build(netlist, self.variables)
+
+    @staticmethod
+    def best_of(netlist, max_nodes):
+        """Строит диаграмму со всеми эвристиками и возвращает наименьшую"""
+        best = None
+        limit = max_nodes
+        for heuristic in ORDER_HEURISTICS:
+            try:
+                circuit = CircuitBDD(netlist, heuristic, max_nodes=limit)
+            except BDDLimitError:
+                continue
+            if best is None or circuit.size() < best.size():
+                best = circuit
+                # Заведомо проигрывающие порядки обрываются раньше
+                limit = min(max_nodes, max(4 * best.size(), GC_THRESHOLD))
+        if best is None:
+            raise BDDLimitError(max_nodes)
+        return best
+
+    def build(self, netlist, inputs):
+        """Узлы выходов netlist при узлах inputs на его IN (в порядке netlist.inputs).
+
+        Экземпляры блоков подставляются рекурсивно: узлы их входов становятся
+        входами определения. Каждый возвращённый узел защищён одной ссылкой.
+        """
+        bdd = self.bdd
+        types, fanin = netlist.types, netlist.fanin
+        position = {node: p for p, node in enumerate(netlist.inputs)}
+
+        # Сколько ещё раз понадобится каждый узел; выходы держатся до конца
+        uses = [0] * len(types)
+        for i, srcs in enumerate(fanin):
+            if types[i] not in SOURCE_TYPES:
+                for src in srcs:
+                    uses[src] += 1
+        for i in netlist.outputs:
+            uses[i] += 1
+
+        nodes = [FALSE] * len(types)
+        block_outs = {}  # узел BLK -> узлы выходов блока
+
+        def release(i):
+            bdd.deref(nodes[i])
+            for node in block_outs.pop(i, ()):
+                bdd.deref(node)
+
+        for i in netlist.order:
+            typ = types[i]
+            srcs = fanin[i]
+            if typ == 'IN':
+                node = inputs[position[i]]
+            elif typ in SOURCE_TYPES:
+                node = FALSE
+            elif typ == 'OUT':
+                node = nodes[srcs[0]] if srcs else FALSE
+            elif typ == 'NOT':
+                node = bdd.not_(nodes[srcs[0]]) if srcs else TRUE
+            elif typ == 'BLK':
+                args = [FALSE if src is None else nodes[src] for src in netlist.block_args[i]]
+                block_outs[i] = self.build(netlist.blocks[i].netlist, args)
+                node = block_outs[i][0]
+            elif typ == 'PIN':
+                node = block_outs[srcs[0]][netlist.pins[i]]
+            else:
+                op = bdd.and_ if typ in ('AND', 'NAND') else bdd.or_ if typ in ('OR', 'NOR') \
+                    else bdd.xor
+                node = TRUE if typ in ('AND', 'NAND') else FALSE
+                for src in srcs:
+                    node = op(node, nodes[src])
+                if typ in ('NAND', 'NOR'):
+                    node = bdd.not_(node)
+
+            nodes[i] = bdd.ref(node)
+            if typ not in SOURCE_TYPES:
+                for src in srcs:
+                    uses[src] -= 1
+                    if not uses[src]:
+                        release(src)
+            if not uses[i]:
+                release(i)
+            bdd.maybe_collect()
+        return [nodes[i] for i in netlist.outputs]
+
+    def size(self):
+        """Число узлов общей диаграммы выходов"""
+        return self.bdd.size(self.outputs)
+
+    def sat_count(self, k):
+        """Число строк таблицы истинности, где выход k равен 1"""
+        return self.bdd.sat_count(self.outputs[k])
+
+    def row(self, assignment):
+        """Номер строки таблицы (первый IN — старший бит) для набора по уровням"""
+        n_in = len(self.order)
+        row = 0
+        for level, value in assignment.items():
+            if value:
+                row |= 1 << (n_in - 1 - self.order[level])
+        return row
+
+    def cube_strings(self, k, limit=None):
+        """Кубы единиц выхода k в виде строк по IN: '0', '1' или '-'"""
+        for cube in self.bdd.cubes(self.outputs[k], limit):
+            chars = ['-'] * len(self.order)
+            for level, value in cube.items():
+                chars[self.order[level]] = str(value)
+            yield ''.join(chars)
+
+    def equivalent_outputs(self):
+        """Группы номеров выходов с одинаковой функцией (по канонической форме)"""
+        groups = {}
+        for k, node in enumerate(self.outputs):
+            groups.setdefault(node, []).append(k)
+        return [group for group in groups.values() if len(group) > 1]
+
+
+def equivalent(netlist_a, netlist_b, order='dfs', max_nodes=MAX_NODES):
+    """Проверка эквивалентности двух схем с одинаковыми числами IN и OUT.
+
+    Возвращает None, если схемы эквивалентны, иначе (номер выхода,
+    номер строки-контрпримера).
+    """
+    if len(netlist_a.inputs) != len(netlist_b.inputs) or \
+            len(netlist_a.outputs) != len(netlist_b.outputs):
+        raise ValueError("схемы должны иметь одинаковое число входов и выходов")
+    a = CircuitBDD(netlist_a, order, max_nodes=max_nodes)
+    b = CircuitBDD(netlist_b, a.order, bdd=a.bdd)
+    for k, (f, g) in enumerate(zip(a.outputs, b.outputs)):
+        if f != g:
+            return k, a.row(a.bdd.satisfy_one(a.bdd.xor(f, g)))
+    return None
@@ -0,0 +1,357 @@
+"""Бенчмарки симулятора на синтетических схемах.
+
+    python bench.py [--quick] [-o results.json] [--compare baseline.json]
+
+Для каждой схемы из generators замеряются: построение netlist, полный
+прогон, событийный пересчёт после переключения входа, таблица истинности,
+потактовая симуляция (для схем с регистрами), оптимизация netlist и прогон
+по оптимизированному netlist, компиляция ядра codegen и прогон через него,
+случайная стимуляция, моделирование неисправностей, отрисовка окна в обычном масштабе и всей схемы
+целиком, сдвиг вида, трассировка проводов, перетаскивание, групповая
+правка графа схемы, поиск элементов по координатам и импорт схемы из BLIF
+(для комбинационных схем).
+Отрисовка идёт на настоящий Tk-холст, если есть дисплей (например, под
+Xvfb), иначе на MockCanvas. Результаты сохраняются в JSON, чтобы сравнивать
+версии между собой.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from circuit_core import CircuitGraph, Netlist, SpatialIndex
+from codegen import compile_netlist
+from faults import simulate_faults_random
+from generators import (array_multiplier, carry_lookahead_adder, parity_tree,
+                        counter, random_dag, ripple_carry_adder)
+from netlist_import import read_structural
+from optimize import optimize
+from sequential import SequentialSimulator
+from stimulus import simulate_random
+
+TABLE_ROW_LIMIT = 1 << 20  # строк таблицы истинности на замер
+RANDOM_VECTORS = 1 << 16  # случайных наборов на замер стимуляции
+FAULT_VECTORS = 256  # случайных наборов на замер моделирования неисправностей
+HIT_QUERIES = 2000
+EDIT_GROUP = 100  # элементов в групповой правке
+ROUTE_SAMPLE = 1000  # проводов на замер трассировки
+REGRESSION = 1.2  # во сколько раз медленнее считается регрессией
+
+CASES = [
+    ('ripple64', lambda: ripple_carry_adder(64)),
+    ('cla64', lambda: carry_lookahead_adder(64)),
+    ('mult8', lambda: array_multiplier(8)),
+    ('mult16', lambda: array_multiplier(16)),
+    ('parity1024', lambda: parity_tree(1024)),
+    ('random10k', lambda: random_dag(10000, inputs=20, depth=40)),
+    ('random50k', lambda: random_dag(50000, inputs=24, depth=60)),
+    ('counter16', lambda: counter(16, enable=True)),
+]
+QUICK_CASES = {'ripple64', 'mult8', 'parity1024', 'random10k', 'counter16'}
+
+
+class MockCanvas:
+    """Заглушка tk.Canvas: хранит только координаты и считает элементы"""
+
+    def __init__(self):
+        self.items = {}
+        self.ids = itertools.count(1)
+
+    def create_item(self, *coords, **options):
+        item = next(self.ids)
+        self.items[item] = list(coords)
+        return item
+
+    create_line = create_rectangle = create_oval = create_text = create_polygon = create_item
+
+    def delete(self, *items):
+        if items == ('all',):
+            self.items.clear()
+        for item in items:
+            self.items.pop(item, None)
+
+    def move(self, item, dx, dy):
+        for key in (list(self.items) if item == 'all' else [item]):
+            coords = self.items[key]
+            self.items[key] = [v + (dy if i % 2 else dx) for i, v in enumerate(coords)]
+
+    def coords(self, item, *coords):
+        if coords:
+            self.items[item] = list(coords)
+        return self.items[item]
+
+    def itemconfig(self, item, **options):
+        pass
+
+    def tag_lower(self, *args):
+        pass
+
+    def tag_raise(self, *args):
+        pass
+
+    def winfo_width(self):
+        return 1200
+
+    def winfo_height(self):
+        return 800
+
+
+def measure(fn, repeat=5):
+    """Медианное время вызова fn, секунды"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def write_blif(netlist, path):
+    """Комбинационный netlist в BLIF — исходные данные для замера импорта"""
+    outputs = {i: f"o{k}" for k, i in enumerate(netlist.outputs)}
+    with open(path, 'w', encoding='ascii') as f:
+        f.write(f".model bench\n.inputs {' '.join(f'n{i}' for i in netlist.inputs)}\n"
+                f".outputs {' '.join(outputs.values())}\n")
+        for i, (typ, fanin) in enumerate(zip(netlist.types, netlist.fanin)):
+            if typ == 'IN':
+                continue
+            k = len(fanin)
+            if typ in ('AND', 'OUT'):
+                patterns = ['1' * k]
+            elif typ == 'NOR' or typ == 'NOT':
+                patterns = ['0' * k]
+            elif typ in ('OR', 'NAND'):
+                bit = '1' if typ == 'OR' else '0'
+                patterns = ['-' * j + bit + '-' * (k - j - 1) for j in range(k)]
+            else:  # XOR
+                patterns = [''.join(bits) for bits in itertools.product('01', repeat=k)
+                            if bits.count('1') % 2]
+            names = [f"n{j}" for j in fanin] + [outputs.get(i, f"n{i}")]
+            f.write(f".names {' '.join(names)}\n")
+            f.writelines(f"{pattern} 1\n" if pattern else "1\n" for pattern in patterns)
+        f.write(".end\n")
+
+
+def make_canvas():
+    """Tk-холст, если доступен дисплей, иначе MockCanvas"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return tk.Canvas(root, width=1200, height=800), 'tk'
+    except Exception:
+        return MockCanvas(), 'mock'
+
+
+def bench_case(gates, connections, canvas, quick):
+    """Замеры для одной схемы"""
+    repeat = 3 if quick else 5
+    rnd = random.Random(0)
+    result = {'gates': len(gates), 'connections': len(connections)}
+
+    result['netlist_build'] = measure(lambda: Netlist.from_circuit(gates, connections), repeat)
+    netlist = Netlist.from_circuit(gates, connections)
+    result['depth'] = netlist.depth
+
+    result['simulate'] = measure(netlist.simulate, repeat)
+    result['gate_evals_per_s'] = len(gates) / result['simulate']
+
+    result['optimize'] = measure(lambda: optimize(netlist), repeat)
+    optimized = optimize(netlist)
+    result['optimized_gates'] = len(optimized.netlist.types)
+    result['simulate_optimized'] = measure(optimized.simulate, repeat)
+
+    result['kernel_compile'] = measure(lambda: compile_netlist(netlist, cache=False), 1)
+    kernel = netlist.kernel()
+    inputs = [int(gates[i].value) for i in netlist.inputs]
+    result['simulate_kernel'] = measure(lambda: kernel.evaluate(inputs), repeat)
+
+    ins = [gates[i] for i in netlist.inputs]
+
+    def toggle():
+        gate = rnd.choice(ins)
+        gate.value = not gate.value
+        netlist.propagate({netlist.index[gate]: int(gate.value)})
+
+    if ins:
+        result['toggle'] = measure(toggle, repeat * 4)
+
+    if netlist.registers:
+        sim = SequentialSimulator(netlist)
+        state = [0] * len(netlist.state_nodes)
+        cycles = 10000 if quick else 100000
+        result['cycles'] = measure(lambda: sim.run(cycles, [0] * len(ins), state), repeat)
+        result['cycles_per_s'] = cycles / result['cycles']
+
+    # Таблица истинности: полностью, если влезает в лимит, иначе первые строки
+    lane_bits = min(len(ins), 16)
+    blocks = max(1, min(1 << len(ins), TABLE_ROW_LIMIT) >> lane_bits)
+
+    def table():
+        for b in range(blocks):
+            netlist.table_block(b << lane_bits, lane_bits)
+
+    result['random'] = measure(lambda: simulate_random(netlist, RANDOM_VECTORS, seed=0), 1)
+    result['random_vectors_per_s'] = RANDOM_VECTORS / result['random']
+
+    faults = simulate_faults_random(netlist, FAULT_VECTORS, seed=0)
+    result['faults'] = faults.seconds
+    result['faults_detected'] = len(faults.detected)
+
+    rows = blocks << lane_bits
+    result['table_rows'] = rows
+    result['table'] = measure(table, 1 if quick else 3)
+    result['table_rows_per_s'] = rows / result['table']
+
+    if not netlist.state_nodes and not netlist.pins:
+        path = os.path.join(tempfile.gettempdir(), f"bench{os.getpid()}.blif")
+        write_blif(netlist, path)
+        try:
+            result['import_blif'] = measure(lambda: read_structural(path).to_circuit(),
+                                            1 if quick else 3)
+        finally:
+            os.remove(path)
+
+    spatial = SpatialIndex()
+
+    def index_build():
+        spatial.clear()
+        for gate in gates:
+            spatial.insert(gate)
+
+    result['index_build'] = measure(index_build, repeat)
+    xs = [g.x for g in gates]
+    ys = [g.y for g in gates]
+    points = [(rnd.uniform(min(xs), max(xs) + 100), rnd.uniform(min(ys), max(ys) + 60))
+              for _ in range(HIT_QUERIES)]
+
+    def hit():
+        for x, y in points:
+            spatial.find_gate(x, y)
+            spatial.find_port(x, y)
+
+    result['hit_test'] = measure(hit, repeat) / HIT_QUERIES
+
+    if canvas is not None:
+        from main import CanvasRenderer, ViewTransform
+        view = ViewTransform()
+        graph = CircuitGraph(gates, connections)
+        renderer = CanvasRenderer(canvas, graph, spatial, view)
+
+        def count_items():
+            return len(canvas.find_all()) if hasattr(canvas, 'find_all') else len(canvas.items)
+
+        result['render'] = measure(lambda: renderer.rebuild(), 1 if quick else 3)
+        result['render_items'] = count_items()
+
+        # Вся схема в окне: упрощённая отрисовка без текста и портов
+        width, height = renderer.viewport()
+        view.scale = max(0.02, min(width / (max(xs) + 200), height / (max(ys) + 100)))
+        result['render_fit'] = measure(renderer.refresh, 1 if quick else 3)
+        result['render_fit_items'] = count_items()
+        view.scale = 1.0
+        renderer.refresh()
+
+        def pan():
+            for step in range(20):
+                renderer.pan(-40 if step % 2 else 50, -30)
+
+        result['pan_step'] = measure(pan, repeat) / 20
+
+        # Перетаскивание элемента с наибольшим числом связей
+        gate = max(gates, key=lambda g: len(graph.wires(g)))
+
+        def drag():
+            for step in range(50):
+                d = 1 if step % 2 else -1
+                gate.x += d
+                spatial.update(gate)
+                renderer.move_gate(gate, d, 0)
+
+        result['drag_step'] = measure(drag, repeat) / 50
+
+        # Удаление и возврат группы элементов со всеми их соединениями
+        group = gates[:EDIT_GROUP]
+
+        def edit():
+            removed = graph.entries(group), graph.incident(group)
+            graph.remove(*removed)
+            graph.insert(*removed)
+
+        result['group_edit'] = measure(edit, repeat)
+
+        # Трассировка с нуля первых ROUTE_SAMPLE проводов
+        sample = connections[:ROUTE_SAMPLE]
+
+        def route():
+            renderer.router.clear()
+            for conn in sample:
+                renderer.router.path(conn)
+
+        result['route_wire'] = measure(route, 1 if quick else 3) / max(1, len(sample))
+    return result
+
+
+def compare(results, baseline):
+    """Печатает отношение времён к базовому прогону и возвращает число регрессий"""
+    regressions = 0
+    for case, metrics in results['results'].items():
+        old = baseline.get('results', {}).get(case)
+        if not old:
+            continue
+        for key, value in metrics.items():
+            if key not in old or not isinstance(value, float) or key.endswith('_per_s'):
+                continue
+            ratio = value / old[key] if old[key] else float('inf')
+            mark = '  <-- регрессия' if ratio > REGRESSION else ''
+            regressions += bool(mark)
+            print(f"{case:12} {key:16} {old[key]:.6f} -> {value:.6f}  x{ratio:.2f}{mark}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки симулятора логических схем")
+    parser.add_argument('--quick', action='store_true', help="только небольшие схемы")
+    parser.add_argument('--case', action='append', help="запустить только указанные схемы")
+    parser.add_argument('--no-render', action='store_true', help="без замеров отрисовки")
+    parser.add_argument('-o', '--output', help="файл для результатов (JSON)")
+    parser.add_argument('--compare', help="сравнить с результатами предыдущего прогона")
+    args = parser.parse_args(argv)
+
+    canvas, backend = (None, 'none') if args.no_render else make_canvas()
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'canvas': backend,
+        'results': {},
+    }
+    for name, build in CASES:
+        if args.case and name not in args.case or args.quick and name not in QUICK_CASES:
+            continue
+        gates, connections = build()
+        metrics = bench_case(gates, connections, canvas, args.quick)
+        results['results'][name] = metrics
+        print(f"{name:12} {metrics['gates']:7} эл.  прогон {metrics['simulate'] * 1000:8.2f} мс  "
+              f"таблица {metrics['table_rows_per_s']:12.0f} стр/с  "
+              f"поиск {metrics['hit_test'] * 1e6:6.1f} мкс"
+              + (f"  такты {metrics['cycles_per_s']:10.0f}/с" if 'cycles_per_s' in metrics else ''),
+              flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            return 1 if compare(results, json.load(f)) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
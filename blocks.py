@@ -0,0 +1,94 @@
+"""Иерархические подсхемы (блоки).
+
+Определение блока — комбинационная схема, чьи IN становятся входами, а
+OUT — выходами блока (в порядке добавления). На холсте экземпляр рисуется
+одним элементом BLK с портами, а в netlist занимает один узел BLK и по
+узлу PIN на каждый дополнительный используемый выход.
+
+Определение компилируется один раз при создании:
+
+- ядро — функция, сгенерированная codegen, общая для всех экземпляров и
+  битово-параллельная, как Netlist.evaluate;
+- для блоков с не более чем LUT_INPUTS входами — ещё и таблица выходов по
+  номеру строки, через которую идут одиночные (mask=1) вычисления:
+  интерактивная симуляция, событийный пересчёт и потактовый прогон.
+"""
+import time
+
+from circuit_core import Connection, Gate, Netlist
+from perf import monitor
+
+LUT_INPUTS = 16  # до стольких входов блок вычисляется по таблице
+
+
+def copy_circuit(gates, connections):
+    """Независимая копия части схемы: соединения только между gates"""
+    copies = {}
+    for gate in gates:
+        copy = Gate(gate.type, gate.x, gate.y)
+        copy.value = gate.value
+        if gate.block is not None:
+            copy.set_block(gate.block)
+        copies[gate] = copy
+    inner = [Connection(copies[c.src], copies[c.dst], c.src_pin, c.dst_pin)
+             for c in connections if c.src in copies and c.dst in copies]
+    return list(copies.values()), inner
+
+
+class BlockDef:
+    """Определение подсхемы, скомпилированное один раз на все экземпляры"""
+
+    def __init__(self, name, gates, connections):
+        self.name = name
+        self.gates = gates  # исходная схема блока — для сохранения в файл
+        self.connections = connections
+        self.netlist = Netlist.from_circuit(gates, connections)
+        if self.netlist.state_nodes:
+            raise ValueError("Блок должен быть комбинационным: без DFF, REG и CLK")
+        if not self.netlist.outputs:
+            raise ValueError("В блоке нет ни одного выхода (OUT)")
+        self.n_in = len(self.netlist.inputs)
+        self.n_out = len(self.netlist.outputs)
+        self.compile()
+
+    @classmethod
+    def from_selection(cls, name, gates, connections):
+        """Блок из выделенных элементов; холст и блок дальше не связаны"""
+        return cls(name, *copy_circuit(gates, connections))
+
+    def compile(self):
+        """Генерирует ядро и, для небольших блоков, таблицу выходов"""
+        start = time.perf_counter()
+        self.kernel = self.netlist.kernel()
+
+        self.table = None
+        if self.n_in <= LUT_INPUTS:
+            rows = 1 << self.n_in
+            words = self.netlist.table_block(0, self.n_in)
+            columns = [format(word, f"0{rows}b")[::-1] for word in words]
+            # Одинаковые векторы выходов — один и тот же кортеж
+            vectors = {}
+            self.table = [vectors.setdefault(bits, tuple(map(int, bits)))
+                          for bits in zip(*columns)]
+        monitor.record('compile', time.perf_counter() - start,
+                       gates=len(self.netlist.types), rows=len(self.table or ()))
+
+    def evaluate(self, args, mask=1):
+        """Выходы блока по словам входов"""
+        # mask может быть и массивом NumPy (случайная симуляция) — тогда только ядро
+        if self.table is not None and type(mask) is int and mask == 1:
+            row = 0
+            for arg in args:
+                row = row << 1 | arg
+            return self.table[row]
+        return self.kernel.evaluate(args, mask)
+
+    def __getstate__(self):
+        """Скомпилированное ядро не сериализуется и собирается заново"""
+        state = self.__dict__.copy()
+        del state['kernel'], state['table']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.compile()
@@ -0,0 +1,791 @@
+"""Ядро симулятора логических схем без зависимости от tkinter.
+
+Модель схемы (Gate, Connection), левелизованный Netlist с битово-параллельным
+вычислением и пространственный индекс. Модуль импортируется в headless-режиме:
+в CLI, на CI и в рабочих процессах.
+"""
+import functools
+import heapq
+import itertools
+import time
+
+from perf import monitor
+
+# Константы для цветов
+COLORS = {
+    'bg': '#2b2b2b',
+    'sidebar': '#3c3f41',
+    'canvas': '#ffffff',
+    'gate': '#4a9eff',
+    'gate_active': '#6ab0ff',
+    'input': '#6bbf59',
+    'output': '#ff6b6b',
+    'not': '#ffa154',
+    'wire': '#555',
+    'wire_active': '#ffcc00',
+    'text': '#ffffff',
+    'text_dark': '#333333',
+    'button': '#4a9eff',
+    'button_hover': '#6ab0ff',
+    'register': '#b07cd8',
+    'clock': '#2bb5a0',
+    'block': '#c9a227',
+    'heat_low': '#2c7bb6',  # тепловая карта: вероятность единицы 0
+    'heat_high': '#d7191c',  # ... и 1
+    'heat_stuck': '#000000',  # контур элемента, ни разу не переключившегося
+    'fault_found': '#2ecc71',  # неисправности: обе неисправности выхода обнаружены
+    'fault_partial': '#f1c40f',  # ... одна из двух
+    'fault_missed': '#e74c3c'  # ... ни одной
+}
+
+# D-триггер (вход D) и регистр (входы D, EN) защёлкиваются по такту
+REGISTER_TYPES = ('DFF', 'REG')
+# Значения источников задаются извне, а не вычисляются по входам
+SOURCE_TYPES = ('IN', 'CLK') + REGISTER_TYPES
+# Элементы без входного порта
+INPUTLESS_TYPES = ('IN', 'CLK')
+
+
+class Gate:
+    def __init__(self, typ, x, y):
+        self.type = typ
+        self.x = x
+        self.y = y
+        self.value = False
+        self.inputs = []
+        self.width = 80
+        self.height = 50
+        self.selected = False
+        self.radius = 8
+        self.block = None  # определение подсхемы для BLK
+        self.pin_values = []  # значения выходов блока; выход 0 — self.value
+
+        # Определяем цвета в зависимости от типа
+        if typ == 'IN':
+            self.color = COLORS['input']
+        elif typ == 'OUT':
+            self.color = COLORS['output']
+        elif typ == 'NOT':
+            self.color = COLORS['not']
+        elif typ in REGISTER_TYPES:
+            self.color = COLORS['register']
+        elif typ == 'CLK':
+            self.color = COLORS['clock']
+        elif typ == 'BLK':
+            self.color = COLORS['block']
+        else:
+            self.color = COLORS['gate']
+
+    def compute(self):
+        if self.type in SOURCE_TYPES:
+            return self.value
+        elif self.type == 'OUT':
+            return self.inputs[0] if self.inputs else False
+        elif self.type == 'NOT':
+            return not self.inputs[0]
+        elif self.type == 'AND':
+            return all(self.inputs)
+        elif self.type == 'OR':
+            return any(self.inputs)
+        elif self.type == 'XOR':
+            return sum(self.inputs) % 2 == 1
+        elif self.type == 'NAND':
+            return not all(self.inputs)
+        elif self.type == 'NOR':
+            return not any(self.inputs)
+        return False
+
+    def contains_point(self, x, y):
+        """Проверяет, находится ли точка внутри гейта"""
+        return (self.x <= x <= self.x + self.width and
+                self.y <= y <= self.y + self.height)
+
+    def set_block(self, block):
+        """Делает элемент экземпляром подсхемы: по порту на каждый вход и выход"""
+        self.block = block
+        self.pin_values = [False] * block.n_out
+        self.width = BLOCK_WIDTH
+        self.height = max(50, PIN_STEP * (max(block.n_in, block.n_out) + 1))
+
+    def input_count(self):
+        """Число входных портов"""
+        return self.block.n_in if self.block is not None else 1
+
+    def output_count(self):
+        """Число выходных портов"""
+        return self.block.n_out if self.block is not None else 1
+
+    def output_value(self, pin=0):
+        """Значение выхода pin (у обычных элементов выход один)"""
+        return self.pin_values[pin] if pin else self.value
+
+    def get_input_port(self, pin=0):
+        """Возвращает координаты входного порта"""
+        if self.block is None:
+            return (self.x, self.y + self.height // 2)
+        return (self.x, self.y + self.height * (pin + 1) // (self.block.n_in + 1))
+
+    def get_output_port(self, pin=0):
+        """Возвращает координаты выходного порта"""
+        if self.block is None:
+            return (self.x + self.width, self.y + self.height // 2)
+        return (self.x + self.width, self.y + self.height * (pin + 1) // (self.block.n_out + 1))
+
+
+GATE_TYPES = ('IN', 'OUT', 'AND', 'OR', 'NOT', 'XOR', 'NAND', 'NOR',
+              'DFF', 'REG', 'CLK', 'BLK')  # порядок = коды в файлах
+TABLE_CHUNK_BITS = 16  # строк таблицы истинности в одном слове: 2**16
+SPATIAL_CELL = 100  # размер ячейки пространственного индекса, px
+PORT_HIT = 10  # радиус попадания в порт, px
+PIN_STEP = 20  # расстояние между портами блока, px
+BLOCK_WIDTH = 100  # ширина экземпляра блока, px
+
+
+@functools.lru_cache(maxsize=None)
+def lane_pattern(bit, width):
+    """Слово из width бит, где бит j равен биту номер bit числа j"""
+    run = 1 << bit
+    word = ((1 << run) - 1) << run  # run нулей, затем run единиц
+    period = run << 1
+    while period < width:
+        word |= word << period
+        period <<= 1
+    return word
+
+
+def level_layout(netlist, x0=60, y0=40, dx=140, dy=80, max_rows=None):
+    """Координаты элементов по логическим уровням: столбец на уровень.
+
+    С max_rows уровень, в котором больше max_rows элементов, занимает
+    несколько соседних столбцов, а следующие уровни сдвигаются вправо:
+    широкий netlist не вытягивается в одну колонку высотой во всю схему.
+    """
+    rows = [0] * netlist.depth
+    if max_rows is None:
+        coords = []
+        for level in netlist.level:
+            coords.append((x0 + level * dx, y0 + rows[level] * dy))
+            rows[level] += 1
+        return coords
+
+    for level in netlist.level:
+        rows[level] += 1
+    columns = [0]  # первый столбец каждого уровня
+    for count in rows:
+        columns.append(columns[-1] + max(1, -(-count // max_rows)))
+    rows = [0] * netlist.depth
+    coords = []
+    for level in netlist.level:
+        column, row = divmod(rows[level], max_rows)
+        coords.append((x0 + (columns[level] + column) * dx, y0 + row * dy))
+        rows[level] += 1
+    return coords
+
+
+class SpatialIndex:
+    """Равномерная сетка-хэш по габаритам элементов для поиска по координатам.
+
+    Каждый элемент регистрируется во всех ячейках, которые пересекает его
+    прямоугольник вместе с зонами портов, поэтому поиск по точке смотрит
+    одну ячейку, а поиск по прямоугольнику — только покрытые им ячейки.
+    """
+
+    def __init__(self, cell_size=SPATIAL_CELL):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> {Gate: None}
+        self.boxes = {}  # Gate -> диапазон ячеек (cx0, cy0, cx1, cy1)
+        self.seq = {}  # Gate -> порядковый номер вставки
+        self.counter = itertools.count()
+        self.extent = None  # охват всех вставок в ячейках; при удалении не сжимается
+
+    def cell_range(self, gate):
+        """Диапазон ячеек, покрытых элементом вместе с портами"""
+        size = self.cell_size
+        return (int(gate.x - PORT_HIT) // size, int(gate.y) // size,
+                int(gate.x + gate.width + PORT_HIT) // size, int(gate.y + gate.height) // size)
+
+    def insert(self, gate):
+        """Добавляет элемент в индекс"""
+        self.seq.setdefault(gate, next(self.counter))
+        box = self.cell_range(gate)
+        self.boxes[gate] = box
+        cx0, cy0, cx1, cy1 = box
+        if self.extent is None:
+            self.extent = box
+        else:
+            ex0, ey0, ex1, ey1 = self.extent
+            self.extent = (min(ex0, cx0), min(ey0, cy0), max(ex1, cx1), max(ey1, cy1))
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells.setdefault((cx, cy), {})[gate] = None
+
+    def remove(self, gate, forget=True):
+        """Удаляет элемент из индекса"""
+        box = self.boxes.pop(gate, None)
+        if forget:
+            self.seq.pop(gate, None)
+        if box is None:
+            return
+        cx0, cy0, cx1, cy1 = box
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    cell.pop(gate, None)
+                    if not cell:
+                        del self.cells[(cx, cy)]
+
+    def update(self, gate):
+        """Обновляет индекс после перемещения элемента"""
+        if self.boxes.get(gate) != self.cell_range(gate):
+            self.remove(gate, forget=False)
+            self.insert(gate)
+
+    def clear(self):
+        """Очищает индекс"""
+        self.cells = {}
+        self.boxes = {}
+        self.seq = {}
+        self.extent = None
+
+    def bounds(self):
+        """Прямоугольник, охватывающий все элементы, или None для пустой схемы"""
+        if self.extent is None:
+            return None
+        size = self.cell_size
+        cx0, cy0, cx1, cy1 = self.extent
+        return cx0 * size, cy0 * size, (cx1 + 1) * size, (cy1 + 1) * size
+
+    def candidates(self, x, y):
+        """Элементы ячейки, в которую попадает точка, в порядке добавления"""
+        size = self.cell_size
+        cell = self.cells.get((int(x) // size, int(y) // size), {})
+        return sorted(cell, key=self.seq.__getitem__)
+
+    def find_gate(self, x, y):
+        """Первый по порядку добавления элемент, содержащий точку"""
+        for gate in self.candidates(x, y):
+            if gate.contains_point(x, y):
+                return gate
+        return None
+
+    def find_port(self, x, y):
+        """Элемент, тип порта ('input'/'output') и номер порта в окрестности точки"""
+        for gate in self.candidates(x, y):
+            if gate.type not in INPUTLESS_TYPES:
+                for pin in range(gate.input_count()):
+                    ix, iy = gate.get_input_port(pin)
+                    if abs(x - ix) < PORT_HIT and abs(y - iy) < PORT_HIT:
+                        return gate, 'input', pin
+
+            if gate.type != 'OUT':
+                for pin in range(gate.output_count()):
+                    ox, oy = gate.get_output_port(pin)
+                    if abs(x - ox) < PORT_HIT and abs(y - oy) < PORT_HIT:
+                        return gate, 'output', pin
+
+        return None, None, 0
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Элементы, корпус которых пересекает прямоугольник (для рамки выделения)"""
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        size = self.cell_size
+        cx0, cy0, cx1, cy1 = int(x0) // size, int(y0) // size, int(x1) // size, int(y1) // size
+
+        # Для огромной рамки дешевле пройти по занятым ячейкам, чем по всем покрытым
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            cells = [cell for (cx, cy), cell in self.cells.items()
+                     if cx0 <= cx <= cx1 and cy0 <= cy <= cy1]
+        else:
+            cells = [self.cells[key] for key in
+                     ((cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1))
+                     if key in self.cells]
+
+        found = {}
+        for cell in cells:
+            for gate in cell:
+                if (gate not in found and gate.x <= x1 and x0 <= gate.x + gate.width
+                        and gate.y <= y1 and y0 <= gate.y + gate.height):
+                    found[gate] = None
+        return sorted(found, key=self.seq.__getitem__)
+
+
+class Connection:
+    def __init__(self, src, dst, src_pin=0, dst_pin=0):
+        self.src = src
+        self.dst = dst
+        self.src_pin = src_pin  # номер выхода src (у блоков их несколько)
+        self.dst_pin = dst_pin  # номер входа dst; у обычных элементов важен порядок
+
+    def value(self):
+        """Значение сигнала на проводе"""
+        return self.src.output_value(self.src_pin)
+
+
+class CircuitGraph:
+    """Схема как граф: элементы и соединения со стабильными id и смежностью.
+
+    id выдаются по возрастанию и не переиспользуются; порядок id — это
+    порядок элементов для netlist (нумерация IN/OUT) и порядок соединений
+    (порядок входов элемента). Объект, возвращённый в схему отменой
+    удаления, получает прежний id, и схема совпадает с исходной. Добавление
+    и удаление — O(1) на объект, соединения элемента берутся из fanin и
+    fanout без просмотра всей схемы.
+    """
+
+    def __init__(self, gates=(), connections=()):
+        self.next_id = 0
+        self.clear()
+        for gate in gates:
+            self.add_gate(gate)
+        for conn in connections:
+            self.add_connection(conn)
+
+    def clear(self):
+        """Пустая схема; выданные id не переиспользуются"""
+        self.gates = {}  # id -> Gate
+        self.connections = {}  # id -> Connection
+        self.ids = {}  # Gate или Connection -> id
+        self.fanin = {}  # Gate -> {входящее Connection: None}
+        self.fanout = {}  # Gate -> {исходящее Connection: None}
+        self.ordered = True  # словари в порядке id (после возврата старого id — нет)
+        self.lists = None  # кэш (элементы, соединения) списками в порядке id
+
+    def new_id(self):
+        """Новый id для элемента или соединения"""
+        self.next_id += 1
+        return self.next_id - 1
+
+    def place(self, items, obj, oid):
+        """Кладёт объект в словарь items под id oid"""
+        if oid is None:
+            oid = self.new_id()
+        elif items and oid < next(reversed(items)):
+            self.ordered = False
+        items[oid] = obj
+        self.ids[obj] = oid
+        self.lists = None
+        return oid
+
+    def add_gate(self, gate, gid=None):
+        """Добавляет элемент (gid — прежний id при отмене удаления); возвращает id"""
+        self.fanin[gate] = {}
+        self.fanout[gate] = {}
+        return self.place(self.gates, gate, gid)
+
+    def add_connection(self, conn, cid=None):
+        """Добавляет соединение между элементами схемы; возвращает id"""
+        self.fanout[conn.src][conn] = None
+        self.fanin[conn.dst][conn] = None
+        return self.place(self.connections, conn, cid)
+
+    def remove_connection(self, conn):
+        """Удаляет соединение"""
+        del self.connections[self.ids.pop(conn)]
+        self.fanout[conn.src].pop(conn, None)
+        self.fanin[conn.dst].pop(conn, None)
+        self.lists = None
+
+    def remove_gate(self, gate):
+        """Удаляет элемент; его соединения должны быть удалены раньше"""
+        del self.gates[self.ids.pop(gate)]
+        del self.fanin[gate]
+        del self.fanout[gate]
+        self.lists = None
+
+    def insert(self, gates, connections):
+        """Добавляет [(id, Gate)] и [(id, Connection)]"""
+        for gid, gate in gates:
+            self.add_gate(gate, gid)
+        for cid, conn in connections:
+            self.add_connection(conn, cid)
+
+    def remove(self, gates, connections):
+        """Удаляет [(id, Gate)] и [(id, Connection)]"""
+        for _, conn in connections:
+            self.remove_connection(conn)
+        for _, gate in gates:
+            self.remove_gate(gate)
+
+    def wires(self, gate):
+        """Все соединения элемента: сначала исходящие, потом входящие"""
+        return list(self.fanout.get(gate, ())) + list(self.fanin.get(gate, ()))
+
+    def entries(self, gates):
+        """[(id, Gate)] для элементов gates в порядке id"""
+        return sorted((self.ids[gate], gate) for gate in gates)
+
+    def incident(self, gates):
+        """[(id, Connection)] соединений, у которых хоть один конец в gates, в порядке id"""
+        found = {}
+        for gate in gates:
+            for conn in self.wires(gate):
+                found[conn] = self.ids[conn]
+        return sorted((cid, conn) for conn, cid in found.items())
+
+    def gate_list(self):
+        """Элементы в порядке id"""
+        return self.ordered_lists()[0]
+
+    def connection_list(self):
+        """Соединения в порядке id"""
+        return self.ordered_lists()[1]
+
+    def ordered_lists(self):
+        """(элементы, соединения) списками; пересобираются только после изменений"""
+        if self.lists is None:
+            if not self.ordered:
+                self.gates = dict(sorted(self.gates.items()))
+                self.connections = dict(sorted(self.connections.items()))
+                self.ordered = True
+            self.lists = (list(self.gates.values()), list(self.connections.values()))
+        return self.lists
+
+
+class CombinationalLoopError(Exception):
+    """Схема содержит комбинационную петлю"""
+
+    def __init__(self, loop):
+        self.loop = loop  # индексы элементов петли в порядке распространения сигнала
+        super().__init__(f"Обнаружена комбинационная петля из {len(loop)} элементов")
+
+
+class Netlist:
+    """Левелизованный список связей схемы.
+
+    Строится один раз из gates/connections и хранит для каждого элемента
+    тип, источники (fanin), приёмники (fanout) и уровень. Элементы
+    вычисляются в топологическом порядке, каждый ровно один раз за прогон.
+
+    Экземпляр подсхемы — узел BLK (blocks[i] — её определение,
+    block_args[i] — источник для каждого входа или None); его значение —
+    выход 0, а каждый следующий используемый выход p — отдельный узел PIN
+    с единственным источником-блоком (pins[узел] = p).
+    """
+
+    def __init__(self, types, fanin, gates=None, blocks=None, pins=None, block_args=None):
+        self.types = types
+        self.fanin = fanin
+        self.gates = gates
+        self.values = None
+        self.blocks = blocks or {}
+        self.pins = pins or {}
+        self.block_args = block_args or {
+            i: (fanin[i] + [None] * block.n_in)[:block.n_in] for i, block in self.blocks.items()}
+        self.block_values = {}  # выходы блоков в последнем вычислении
+        self.compiled = {}  # ядра codegen по all_nodes, компилируются при первом kernel()
+
+        self.fanout = [[] for _ in types]
+        appenders = [dsts.append for dsts in self.fanout]
+        for dst, srcs in enumerate(fanin):
+            for src in srcs:
+                appenders[src](dst)
+
+        self.inputs = [i for i, typ in enumerate(types) if typ == 'IN']
+        self.outputs = [i for i, typ in enumerate(types) if typ == 'OUT']
+        self.registers = [i for i, typ in enumerate(types) if typ in REGISTER_TYPES]
+        self.clocks = [i for i, typ in enumerate(types) if typ == 'CLK']
+        self.state_nodes = self.registers + self.clocks  # состояние между тактами
+        self.levelize()
+
+    @classmethod
+    def from_circuit(cls, gates, connections):
+        """Строит netlist из списков Gate и Connection"""
+        index = {gate: i for i, gate in enumerate(gates)}
+        blocks = {i: gate.block for i, gate in enumerate(gates) if gate.block is not None}
+        if blocks:
+            edges = ((index[c.src], index[c.dst], c.src_pin, c.dst_pin) for c in connections)
+            return cls.from_pins([gate.type for gate in gates], edges, list(gates), blocks)
+        fanin = [[] for _ in gates]
+        for conn in connections:
+            fanin[index[conn.dst]].append(index[conn.src])
+        netlist = cls([gate.type for gate in gates], fanin, list(gates))
+        netlist.index = index
+        return netlist
+
+    @classmethod
+    def from_edges(cls, types, edges, gates=None):
+        """Строит netlist из плоской последовательности рёбер src, dst, src, dst, ..."""
+        fanin = [[] for _ in types]
+        appenders = [srcs.append for srcs in fanin]
+        pairs = iter(edges)
+        for src, dst in zip(pairs, pairs):
+            appenders[dst](src)
+        netlist = cls(types, fanin, gates)
+        if gates is not None:
+            netlist.index = {gate: i for i, gate in enumerate(gates)}
+        return netlist
+
+    @classmethod
+    def from_pins(cls, types, edges, gates=None, blocks=None):
+        """Строит netlist с блоками по рёбрам (src, dst, выход src, вход dst)"""
+        types = list(types)
+        fanin = [[] for _ in types]
+        pins = {}
+        pin_nodes = {}  # (блок, выход) -> узел PIN
+        block_args = {i: [None] * block.n_in for i, block in (blocks or {}).items()}
+        for src, dst, src_pin, dst_pin in edges:
+            if src_pin:
+                node = pin_nodes.get((src, src_pin))
+                if node is None:
+                    node = pin_nodes[src, src_pin] = len(types)
+                    types.append('PIN')
+                    fanin.append([src])
+                    pins[node] = src_pin
+                src = node
+            fanin[dst].append(src)
+            args = block_args.get(dst)
+            if args is not None and dst_pin < len(args):
+                args[dst_pin] = src
+        netlist = cls(types, fanin, gates, blocks, pins, block_args)
+        if gates is not None:
+            netlist.index = {gate: i for i, gate in enumerate(gates)}
+        return netlist
+
+    def gate_of(self, i):
+        """Gate, которому принадлежит узел i (узлы PIN — выходы блока)"""
+        if i >= len(self.gates):
+            i = self.fanin[i][0]
+        return self.gates[i]
+
+    def store_values(self, indices, values):
+        """Переносит значения узлов indices в связанные Gate"""
+        gates, n = self.gates, len(self.gates)
+        for i in indices:
+            if i < n:
+                gates[i].value = bool(values[i])
+            else:
+                gates[self.fanin[i][0]].pin_values[self.pins[i]] = bool(values[i])
+
+    def __getstate__(self):
+        """Для передачи в другие процессы: без объектов Gate и значений"""
+        state = self.__dict__.copy()
+        state['gates'] = None
+        state['values'] = None
+        state['block_values'] = {}
+        state['compiled'] = {}
+        state.pop('index', None)
+        return state
+
+    def levelize(self):
+        """Топологическая сортировка (алгоритм Кана) с расчётом уровней"""
+        fanout = self.fanout
+        # Входы регистров не задают порядок вычисления: их значения нужны
+        # только на следующем такте, поэтому петли через регистры допустимы
+        fanin = [() if typ in REGISTER_TYPES else srcs
+                 for typ, srcs in zip(self.types, self.fanin)]
+        pending = [len(srcs) for srcs in fanin]
+        order = [i for i, count in enumerate(pending) if count == 0]
+        append = order.append
+
+        # order дополняется по ходу обхода и служит очередью; у регистров
+        # счётчик уходит в минус, и повторно они в очередь не попадают
+        for src in order:
+            for dst in fanout[src]:
+                pending[dst] -= 1
+                if pending[dst] == 0:
+                    append(dst)
+
+        if len(order) < len(self.types):
+            raise CombinationalLoopError(self.find_loop(pending))
+
+        level = [0] * len(self.types)
+        get_level = level.__getitem__
+        for i in order:
+            if fanin[i]:
+                level[i] = 1 + max(map(get_level, fanin[i]))
+
+        order.sort(key=level.__getitem__)
+        self.order = order
+        self.level = level
+        self.depth = max(level) + 1 if level else 0
+
+    def find_loop(self, pending):
+        """Находит один цикл среди элементов, не попавших в порядок вычисления"""
+        # У каждого такого элемента есть хотя бы один источник, тоже не попавший
+        # в порядок, поэтому обход по fanin обязательно замкнётся
+        node = next(i for i, count in enumerate(pending) if count > 0)
+        seen = {}
+        path = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(src for src in self.fanin[node] if pending[src] > 0)
+        return path[seen[node]:][::-1]
+
+    def evaluate(self, inputs, mask=1, state=()):
+        """Вычисляет значения всех элементов.
+
+        inputs — слова для IN-элементов в порядке self.inputs, state — для
+        регистров и тактовых генераторов в порядке self.state_nodes (по
+        умолчанию 0). Каждый бит слова (в пределах mask) — независимый набор
+        значений, поэтому при mask=1 это обычная булева симуляция.
+        """
+        start = time.perf_counter()
+        values = [0] * len(self.types)
+        for i, word in zip(self.inputs, inputs):
+            values[i] = word & mask
+        for i, word in zip(self.state_nodes, state):
+            values[i] = word & mask
+
+        types, eval_gate = self.types, self.eval_gate
+        for i in self.order:
+            if types[i] not in SOURCE_TYPES:
+                values[i] = eval_gate(i, values, mask)
+
+        monitor.record('compute', time.perf_counter() - start,
+                       evaluations=len(self.order), lanes=mask.bit_length())
+        return values
+
+    def eval_gate(self, i, values, mask=1):
+        """Значение элемента i по уже вычисленным значениям его источников"""
+        typ = self.types[i]
+        srcs = self.fanin[i]
+        if typ in SOURCE_TYPES:
+            return values[i]
+        elif typ == 'OUT':
+            return values[srcs[0]] if srcs else 0
+        elif typ == 'NOT':
+            return mask ^ values[srcs[0]] if srcs else mask
+        elif typ == 'AND' or typ == 'NAND':
+            value = mask
+            for src in srcs:
+                value &= values[src]
+            return value ^ mask if typ == 'NAND' else value
+        elif typ == 'OR' or typ == 'NOR':
+            value = 0
+            for src in srcs:
+                value |= values[src]
+            return value ^ mask if typ == 'NOR' else value
+        elif typ == 'XOR':
+            value = 0
+            for src in srcs:
+                value ^= values[src]
+            return value
+        elif typ == 'BLK':
+            outs = self.blocks[i].evaluate(
+                [0 if src is None else values[src] for src in self.block_args[i]], mask)
+            self.block_values[i] = outs
+            return outs[0] if outs else 0
+        elif typ == 'PIN':
+            return self.block_values[srcs[0]][self.pins[i]]
+        return 0
+
+    def kernel(self, all_nodes=False):
+        """Скомпилированное ядро (codegen.Kernel) для многократных вычислений OUT.
+
+        При all_nodes ядро возвращает значения всех элементов.
+        """
+        kernel = self.compiled.get(all_nodes)
+        if kernel is None:
+            from codegen import compile_netlist
+            kernel = self.compiled[all_nodes] = compile_netlist(self, all_nodes=all_nodes)
+        return kernel
+
+    def propagate(self, updates):
+        """Событийный пересчёт после изменения значений источников.
+
+        updates — {индекс: новое значение}. Пересчитывается только конус
+        fanout изменившихся элементов; очередь упорядочена по уровню, поэтому
+        каждый элемент вычисляется не более одного раза, а распространение
+        останавливается там, где значение не изменилось. Требует предыдущего
+        полного прогона (self.values). Возвращает индексы изменившихся элементов.
+        """
+        start = time.perf_counter()
+        values, level, fanout = self.values, self.level, self.fanout
+        evaluations = 0
+        changed = []
+        queue = []
+        queued = set()
+
+        def schedule(src):
+            for dst in fanout[src]:
+                if dst not in queued:
+                    queued.add(dst)
+                    heapq.heappush(queue, (level[dst], dst))
+
+        for i, value in updates.items():
+            if values[i] != value:
+                values[i] = value
+                changed.append(i)
+                schedule(i)
+
+        blocks = self.blocks
+        while queue:
+            _, i = heapq.heappop(queue)
+            evaluations += 1
+            value = self.eval_gate(i, values)
+            if value != values[i]:
+                values[i] = value
+                changed.append(i)
+                schedule(i)
+            elif i in blocks:
+                # Остальные выходы блока могли измениться и при том же выходе 0
+                schedule(i)
+
+        if self.gates is not None:
+            self.store_values(changed, values)
+
+        monitor.record('compute', time.perf_counter() - start, evaluations=evaluations, lanes=1)
+        return changed
+
+    def table_block(self, start, lane_bits):
+        """Слова OUT для 2**lane_bits строк таблицы истинности, начиная с start.
+
+        start должен быть кратен 2**lane_bits. Бит j слова — строка start + j;
+        первый IN — старший бит номера строки, как в itertools.product.
+        Вычисляется скомпилированным ядром, состояние регистров — нулевое.
+        """
+        kernel = self.kernel()
+        begin = time.perf_counter()
+        count = 1 << lane_bits
+        mask = (1 << count) - 1
+        words = []
+        for bit in range(len(self.inputs) - 1, -1, -1):
+            if bit < lane_bits:
+                words.append(lane_pattern(bit, count))
+            else:
+                words.append(mask if (start >> bit) & 1 else 0)
+        outputs = kernel.evaluate(words, mask)
+        monitor.record('compute', time.perf_counter() - begin,
+                       evaluations=len(self.order), lanes=count)
+        return list(outputs)
+
+    def truth_table_chunks(self, chunk_bits=TABLE_CHUNK_BITS):
+        """Таблица истинности блоками по 2**chunk_bits строк.
+
+        Все строки блока вычисляются за один проход по netlist.
+        Возвращает кортежи (start, count, слова OUT).
+        """
+        lane_bits = min(len(self.inputs), chunk_bits)
+        count = 1 << lane_bits
+        for start in range(0, 1 << len(self.inputs), count):
+            yield start, count, self.table_block(start, lane_bits)
+
+    def next_state(self, values, mask=1):
+        """Состояние после такта: DFF берёт D, REG — D при EN=1, CLK инвертируется"""
+        state = []
+        for i in self.state_nodes:
+            typ, srcs = self.types[i], self.fanin[i]
+            d = values[srcs[0]] if srcs else 0
+            if typ == 'DFF':
+                state.append(d)
+            elif typ == 'REG':
+                enable = values[srcs[1]] if len(srcs) > 1 else mask
+                state.append((d & enable) | (values[i] & (mask ^ enable)))
+            else:
+                state.append(mask ^ values[i])
+        return state
+
+    def simulate(self):
+        """Прогон по связанным Gate: читает входы и записывает value всех элементов"""
+        gates = self.gates
+        values = self.evaluate([gates[i].value for i in self.inputs], 1,
+                               [gates[i].value for i in self.state_nodes])
+        for gate, value in zip(gates, values):
+            gate.value = bool(value)
+        if self.pins:
+            self.store_values(self.pins, values)
+        self.values = values
+        return values
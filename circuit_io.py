@@ -0,0 +1,336 @@
+"""Чтение и запись файлов схем.
+
+Основной формат (.lcb) — компактный двоичный netlist: заголовок, затем
+упакованные массивы кодов типов, координат, битов значений и рёбер. Файл
+читается потоково за один проход, массивы декодируются целиком через
+array.frombytes, без разбора по элементам.
+
+    заголовок   '<4sII': b'LCB1', число элементов n, число соединений m
+    типы        n байт — индексы в GATE_TYPES
+    координаты  2n × int32 (x, y)
+    значения    (n + 7) // 8 байт, бит i — value элемента i
+    соединения  2m × uint32 (src, dst)
+    блоки       необязательно: uint32 длина + JSON {"blocks": [...],
+                "instances": {элемент: имя}, "pins": [[соединение, выход, вход], ...]}
+
+Последняя секция есть, только если в схеме есть подсхемы (BLK), и
+содержит определения блоков в том же виде, что и JSON-формат.
+
+Текстовый формат для просмотра и правки вручную — JSON со списком
+элементов и соединений (номера элементов в списке):
+
+    {"gates": [{"type": "IN", "x": 150, "y": 150, "value": 0}, ...],
+     "connections": [[0, 2], [1, 2], ...]}
+
+У экземпляров блоков есть поле "block" с именем определения, а у
+соединений с выходом или входом блока, отличным от нулевого, — ещё два
+числа: [src, dst, выход, вход]. Определения лежат в списке "blocks" в
+порядке зависимостей: {"name": ..., "gates": [...], "connections": [...]}.
+
+Схемы в BLIF (.blif) и структурном Verilog (.v) только читаются — через
+netlist_import, с расстановкой элементов по логическим уровням.
+"""
+import itertools
+import json
+import struct
+import sys
+from array import array
+
+from blocks import BlockDef
+from circuit_core import GATE_TYPES, Connection, Gate, Netlist
+
+MAGIC = b'LCB1'
+HEADER = struct.Struct('<4sII')
+SECTION = struct.Struct('<I')
+GATE_CODES = {typ: code for code, typ in enumerate(GATE_TYPES)}
+
+
+class CircuitData:
+    """Схема в виде упакованных массивов, как она хранится в файле"""
+
+    def __init__(self, codes, coords, values, edges, extra=None):
+        self.codes = codes  # bytes, код типа на элемент
+        self.coords = coords  # array('i'): x0, y0, x1, y1, ...
+        self.values = values  # int, бит i — value элемента i
+        self.edges = edges  # array('I'): src0, dst0, src1, dst1, ...
+        self.extra = extra  # секция блоков (dict) или None
+
+    @classmethod
+    def from_circuit(cls, gates, connections, library=()):
+        """Упаковывает списки Gate и Connection"""
+        index = {gate: i for i, gate in enumerate(gates)}
+        codes = bytes(GATE_CODES[gate.type] for gate in gates)
+        coords = array('i', itertools.chain.from_iterable(
+            (round(gate.x), round(gate.y)) for gate in gates))
+        values = int(''.join('1' if gate.value else '0' for gate in reversed(gates)) or '0', 2)
+        edges = array('I', itertools.chain.from_iterable(
+            (index[conn.src], index[conn.dst]) for conn in connections))
+
+        extra = None
+        instances = {i: gate.block.name for i, gate in enumerate(gates) if gate.block is not None}
+        if instances or library:
+            extra = {
+                'blocks': blocks_to_list(gates, library),
+                'instances': instances,
+                'pins': [[k, conn.src_pin, conn.dst_pin] for k, conn in enumerate(connections)
+                         if conn.src_pin or conn.dst_pin],
+            }
+        return cls(codes, coords, values, edges, extra)
+
+    def blocks(self, library=None):
+        """Определения блоков из секции файла: {номер элемента: BlockDef}"""
+        if not self.extra:
+            return {}
+        defs = blocks_from_list(self.extra['blocks'], library)
+        return {int(i): defs[name] for i, name in self.extra['instances'].items()}
+
+    def pinned_edges(self):
+        """Рёбра (src, dst, выход, вход) с учётом номеров портов блоков"""
+        pins = {k: (src_pin, dst_pin) for k, src_pin, dst_pin in self.extra['pins']}
+        pairs = iter(self.edges)
+        return [(src, dst) + pins.get(k, (0, 0)) for k, (src, dst) in enumerate(zip(pairs, pairs))]
+
+    def types(self):
+        """Типы элементов"""
+        return [GATE_TYPES[code] for code in self.codes]
+
+    def to_netlist(self, gates=None):
+        """Netlist прямо из массивов, без объектов Gate"""
+        if self.extra:
+            return Netlist.from_pins(self.types(), self.pinned_edges(), gates, self.blocks())
+        return Netlist.from_edges(self.types(), self.edges, gates)
+
+    def to_circuit(self, library=None):
+        """Списки Gate и Connection для редактора"""
+        coords = self.coords
+        bits = format(self.values, f"0{len(self.codes)}b")[::-1]
+        gates = []
+        for i, typ in enumerate(self.types()):
+            gate = Gate(typ, coords[2 * i], coords[2 * i + 1])
+            gate.value = bits[i] == '1'
+            gates.append(gate)
+        if not self.extra:
+            pairs = iter(self.edges)
+            return gates, [Connection(gates[src], gates[dst]) for src, dst in zip(pairs, pairs)]
+
+        for i, block in self.blocks(library).items():
+            gates[i].set_block(block)
+        connections = [Connection(gates[src], gates[dst], src_pin, dst_pin)
+                       for src, dst, src_pin, dst_pin in self.pinned_edges()]
+        return gates, connections
+
+
+def write_binary(path, data):
+    """Записывает упакованную схему в двоичный файл"""
+    n, m = len(data.codes), len(data.edges) // 2
+    coords, edges = data.coords, data.edges
+    if sys.byteorder == 'big':
+        coords, edges = array('i', coords), array('I', edges)
+        coords.byteswap()
+        edges.byteswap()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, n, m))
+        f.write(data.codes)
+        coords.tofile(f)
+        f.write(data.values.to_bytes((n + 7) // 8, 'little'))
+        edges.tofile(f)
+        if data.extra:
+            section = json.dumps(data.extra, ensure_ascii=False).encode('utf-8')
+            f.write(SECTION.pack(len(section)))
+            f.write(section)
+
+
+def read_binary(path):
+    """Читает двоичный файл схемы за один проход"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError("Неизвестный формат файла схемы")
+        _, n, m = HEADER.unpack(header)
+        try:
+            codes = f.read(n)
+            coords = array('i')
+            coords.fromfile(f, 2 * n)
+            values = int.from_bytes(f.read((n + 7) // 8), 'little')
+            edges = array('I')
+            edges.fromfile(f, 2 * m)
+        except EOFError:
+            raise ValueError("Файл схемы обрезан") from None
+        extra = None
+        size = f.read(SECTION.size)
+        if size:
+            section = f.read(SECTION.unpack(size)[0]) if len(size) == SECTION.size else b''
+            try:
+                extra = json.loads(section.decode('utf-8'))
+            except ValueError:
+                raise ValueError("Повреждённая секция блоков") from None
+
+    if len(codes) != n or max(codes, default=0) >= len(GATE_TYPES):
+        raise ValueError("Повреждённый файл схемы")
+    if sys.byteorder == 'big':
+        coords.byteswap()
+        edges.byteswap()
+    if m and max(edges) >= n:
+        raise ValueError("Повреждённый файл схемы")
+    return CircuitData(codes, coords, values, edges, extra)
+
+
+def used_blocks(gates, library=()):
+    """Определения блоков library и всех вложенных в схему, в порядке зависимостей"""
+    ordered = {}
+
+    def visit(block):
+        if block.name not in ordered:
+            for gate in block.gates:
+                if gate.block is not None:
+                    visit(gate.block)
+            ordered[block.name] = block
+
+    for block in itertools.chain(library, (g.block for g in gates if g.block is not None)):
+        visit(block)
+    return list(ordered.values())
+
+
+def blocks_to_list(gates, library=()):
+    """Определения блоков для файла"""
+    return [dict(circuit_to_dict(block.gates, block.connections), name=block.name)
+            for block in used_blocks(gates, library)]
+
+
+def blocks_from_list(items, library=None):
+    """Собирает BlockDef из списка определений; library дополняется ими"""
+    defs = {} if library is None else library
+    for item in items:
+        gates, connections = circuit_from_dict(item, defs)
+        defs[item['name']] = BlockDef(item['name'], gates, connections)
+    return defs
+
+
+def merge_blocks(library, loaded, gates):
+    """Добавляет в library определения loaded, загруженные вместе со схемой gates.
+
+    Определение, совпадающее с уже имеющимся под тем же именем, не
+    дублируется: элементы схемы и вложенных блоков переключаются на
+    имеющееся. Другое определение с занятым именем получает имя
+    «имя (2)», «имя (3)», ... — прежнее и его экземпляры не меняются.
+    Возвращает список переименований [(старое имя, новое)].
+    """
+    same = {}  # загруженный BlockDef -> совпавший из library
+    renamed = []
+
+    def repoint(items):
+        for gate in items:
+            if gate.block in same:
+                gate.block = same[gate.block]
+
+    # loaded — в порядке зависимостей: вложенные блоки сопоставлены раньше внешних
+    for name, block in loaded.items():
+        repoint(block.gates)
+        existing = library.get(name)
+        if existing is not None and circuit_to_dict(existing.gates, existing.connections) == \
+                circuit_to_dict(block.gates, block.connections):
+            same[block] = existing
+            continue
+        if existing is not None:
+            k = 2
+            while f"{name} ({k})" in library:
+                k += 1
+            block.name = f"{name} ({k})"
+            renamed.append((name, block.name))
+        library[block.name] = block
+    repoint(gates)
+    return renamed
+
+
+def circuit_to_dict(gates, connections, library=()):
+    """Схема в виде словаря для JSON"""
+    index = {gate: i for i, gate in enumerate(gates)}
+    items = []
+    for g in gates:
+        item = {'type': g.type, 'x': g.x, 'y': g.y, 'value': int(g.value)}
+        if g.block is not None:
+            item['block'] = g.block.name
+        items.append(item)
+    data = {
+        'gates': items,
+        'connections': [[index[c.src], index[c.dst]] + ([c.src_pin, c.dst_pin]
+                                                        if c.src_pin or c.dst_pin else [])
+                        for c in connections],
+    }
+    if library or any(g.block is not None for g in gates):
+        data = {'blocks': blocks_to_list(gates, library), **data}
+    return data
+
+
+def circuit_from_dict(data, library=None):
+    """Восстанавливает списки Gate и Connection из словаря.
+
+    Определения блоков из "blocks" добавляются в library (если передан).
+    """
+    defs = blocks_from_list(data.get('blocks', ()), library)
+    gates = []
+    for item in data['gates']:
+        gate = Gate(item['type'], item.get('x', 0), item.get('y', 0))
+        gate.value = bool(item.get('value', 0))
+        if 'block' in item:
+            gate.set_block(defs[item['block']])
+        gates.append(gate)
+    connections = [Connection(gates[src], gates[dst], *pins)
+                   for src, dst, *pins in data['connections']]
+    return gates, connections
+
+
+def save_json(path, gates, connections, library=()):
+    """Сохраняет схему в текстовый JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(circuit_to_dict(gates, connections, library), f, ensure_ascii=False, indent=1)
+
+
+def load_json(path, library=None):
+    """Загружает схему из текстового JSON"""
+    with open(path, encoding='utf-8') as f:
+        return circuit_from_dict(json.load(f), library)
+
+
+def is_json(path):
+    """Текстовый ли формат у файла (по расширению)"""
+    return path.lower().endswith('.json')
+
+
+def save_circuit(path, gates, connections, library=()):
+    """Сохраняет схему в формате, выбранном по расширению файла.
+
+    library — определения блоков, которые нужно сохранить, даже если
+    в схеме нет их экземпляров.
+    """
+    if is_json(path):
+        save_json(path, gates, connections, library)
+    else:
+        write_binary(path, CircuitData.from_circuit(gates, connections, library))
+
+
+def load_circuit(path, library=None):
+    """Загружает списки Gate и Connection в формате, выбранном по расширению"""
+    if is_json(path):
+        return load_json(path, library)
+    return read_data(path).to_circuit(library)
+
+
+def read_data(path):
+    """CircuitData из двоичного файла или импортированного BLIF/Verilog"""
+    from netlist_import import is_structural, read_structural  # netlist_import импортирует этот модуль
+    if is_structural(path):
+        return read_structural(path)
+    return read_binary(path)
+
+
+def load_netlist(path):
+    """Загружает схему сразу в Netlist, без объектов Gate (для headless-режима)"""
+    if is_json(path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if 'blocks' in data:
+            return Netlist.from_circuit(*circuit_from_dict(data))
+        types = [item['type'] for item in data['gates']]
+        return Netlist.from_edges(types, itertools.chain.from_iterable(data['connections']))
+    return read_data(path).to_netlist()
@@ -0,0 +1,349 @@
+"""Пакетная симуляция схемы без графического интерфейса.
+
+    python cli.py схема.lcb [-i векторы.txt] [--table] [--timings] [-O]
+    python cli.py схема.lcb --verify [--expect 1=0] [--reference эталон.lcb] [--workers N]
+    python cli.py схема.lcb --bdd [--order best] [--reference эталон.lcb]
+    python cli.py схема.lcb --random 1000000 [--seed 1] [--coverage статистика.csv]
+    python cli.py схема.lcb --faults [--random 10000 | -i векторы.txt]
+    python cli.py схема.lcb --vcd трасса.vcd [-i векторы.txt | --cycles 1000000]
+
+Каждая строка входного файла (или stdin) — набор значений IN-элементов в
+порядке их добавления, например "0110"; пробелы и запятые игнорируются,
+всё после "#" — комментарий. Для каждого набора в stdout выводится строка
+значений OUT-элементов. Наборы вычисляются пачками, по одному биту слова
+на набор.
+
+--verify перебирает все наборы входов в пуле процессов и выводит число
+минтермов каждого выхода, гистограмму векторов OUT и первый контрпример к
+свойству (--expect: номер выхода=значение) или к эквивалентности с эталоном.
+--bdd делает то же символьно, через BDD, без перебора строк.
+--random прогоняет случайные наборы (или наборы из -i) и выводит для
+каждого выхода вероятность единицы и число переключений, а также выходы,
+так и не принявшие одно из значений; --coverage сохраняет статистику по
+всем элементам в .csv или .npz (нужен NumPy).
+--faults моделирует неисправности stuck-at-0/1 на выходах всех элементов
+на всех строках таблицы истинности, --random N случайных наборах или
+наборах из -i и выводит покрытие неисправностей и список необнаруженных.
+--vcd записывает значения всех цепей в VCD потоково, не держа трассу в
+памяти: по отсчёту (и такту) на набор из -i или исходное состояние и
+--cycles тактов при нулевых входах.
+-O перед симуляцией оптимизирует netlist; отчёт выводится в stderr.
+
+Схемы в BLIF (.blif) и структурном Verilog (.v) читаются напрямую, например
+эталонные ISCAS-85/89 и EPFL.
+"""
+import time
+
+START = time.perf_counter()
+
+import argparse
+import sys
+
+from circuit_core import CombinationalLoopError
+from circuit_io import load_netlist
+from bdd import ORDER_HEURISTICS, BDDLimitError, CircuitBDD, equivalent
+from optimize import optimize
+from waveform import VCDWriter, net_names, pack_values, trace
+from verify import ExhaustiveCheck
+
+DEFAULT_BATCH = 4096  # наборов в одном битово-параллельном прогоне
+DEFAULT_CYCLES = 1000  # тактов в --vcd без файла наборов
+BDD_CUBES = 8  # кубов на выход в сводке --bdd
+
+
+def parse_vector(line, width, lineno):
+    """Разбирает строку набора входов; возвращает None для пустой строки"""
+    bits = line.split('#', 1)[0].replace(' ', '').replace(',', '').strip()
+    if not bits:
+        return None
+    if len(bits) != width or bits.strip('01'):
+        raise ValueError(f"строка {lineno}: ожидается {width} символов 0/1, получено {bits!r}")
+    return bits
+
+
+def run_batch(netlist, batch, out):
+    """Вычисляет пачку наборов за один проход и пишет результаты"""
+    count = len(batch)
+    # Бит j слова входа p — значение входа p в наборе j
+    words = [int(''.join(vec[p] for vec in reversed(batch)), 2)
+             for p in range(len(netlist.inputs))]
+    outputs = netlist.kernel().evaluate(words, (1 << count) - 1)
+    columns = [format(word, f"0{count}b")[::-1] for word in outputs]
+    out.write(''.join(''.join(col[j] for col in columns) + '\n' for j in range(count)))
+
+
+def stream_vectors(netlist, stream, out, batch_size):
+    """Потоковая обработка наборов; возвращает их число"""
+    width = len(netlist.inputs)
+    total = 0
+    batch = []
+    for lineno, line in enumerate(stream, 1):
+        vector = parse_vector(line, width, lineno)
+        if vector is None:
+            continue
+        batch.append(vector)
+        if len(batch) >= batch_size:
+            run_batch(netlist, batch, out)
+            out.flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        run_batch(netlist, batch, out)
+        total += len(batch)
+    out.flush()
+    return total
+
+
+def stream_table(netlist, out):
+    """Выводит полную таблицу истинности: "входы выходы" на строку"""
+    row_format = f"0{len(netlist.inputs)}b"
+    for start, count, out_words in netlist.truth_table_chunks():
+        columns = [format(word, f"0{count}b")[::-1] for word in out_words]
+        out.write(''.join(format(start + j, row_format) + ' ' +
+                          ''.join(col[j] for col in columns) + '\n'
+                          for j in range(count)))
+    out.flush()
+
+
+def parse_expect(items, n_out):
+    """Разбирает свойства вида "номер=значение" (выходы нумеруются с 1)"""
+    expect = {}
+    for item in items or ():
+        out, sep, value = item.partition('=')
+        if not sep or not out.isdigit() or value not in ('0', '1') or not 1 <= int(out) <= n_out:
+            raise ValueError(f"свойство {item!r}: ожидается номер_выхода=0 или =1, выходов {n_out}")
+        expect[int(out) - 1] = int(value)
+    return expect
+
+
+def load_reference(path):
+    """Эталонная схема --reference; ошибки чтения — ValueError с именем файла"""
+    try:
+        return load_netlist(path)
+    except (CombinationalLoopError, ValueError, OSError) as e:
+        raise ValueError(f"эталон {path}: {e}") from None
+
+
+def run_verify(netlist, args, out):
+    """Полная проверка перебором; возвращает код выхода (1 — найден контрпример)"""
+    reference = load_reference(args.reference) if args.reference else None
+    expect = parse_expect(args.expect, len(netlist.outputs))
+    check = ExhaustiveCheck(netlist, expect, reference, workers=args.workers,
+                            stop_on_fail=args.stop)
+
+    def progress(check):
+        print(f"\rпроверено {100 * check.progress:5.1f}%", end='', file=sys.stderr, flush=True)
+
+    summary = check.run(progress if sys.stderr.isatty() else None)
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+
+    n_in, n_out = len(netlist.inputs), len(netlist.outputs)
+    out.write(f"строк: {summary.rows}\n")
+    for k, count in enumerate(summary.minterms):
+        out.write(f"OUT{k + 1}: минтермов {count}\n")
+    for vector, count in sorted(summary.histogram.items()):
+        out.write(f"{vector:0{n_out}b} {count}\n")
+    if expect or reference is not None:
+        if summary.counterexample is None:
+            out.write("свойство выполняется\n")
+        else:
+            out.write(f"контрпример: {summary.counterexample:0{n_in}b}\n")
+    out.flush()
+    return 0 if summary.counterexample is None else 1
+
+
+def run_bdd(netlist, args, out, cubes=BDD_CUBES):
+    """Символьная сводка по выходам или проверка эквивалентности через BDD"""
+    n_in = len(netlist.inputs)
+    if args.reference:
+        result = equivalent(netlist, load_reference(args.reference), args.order)
+        if result is None:
+            out.write("схемы эквивалентны\n")
+            return 0
+        k, row = result
+        out.write(f"OUT{k + 1} различается, контрпример: {row:0{n_in}b}\n")
+        return 1
+
+    circuit = CircuitBDD(netlist, args.order)
+    out.write(f"узлов BDD: {circuit.size()}, порядок IN: "
+              f"{' '.join(str(p + 1) for p in circuit.order)}\n")
+    for k in range(len(netlist.outputs)):
+        out.write(f"OUT{k + 1}: минтермов {circuit.sat_count(k)}\n")
+        for cube in circuit.cube_strings(k, cubes):
+            out.write(f"  {cube}\n")
+    for group in circuit.equivalent_outputs():
+        out.write("совпадают: " + ' '.join(f"OUT{k + 1}" for k in group) + "\n")
+    return 0
+
+
+def run_random(netlist, args, out):
+    """Статистика по случайным (или заданным в -i) наборам.
+
+    Возвращает код выхода (1 — есть постоянные выходы) и число наборов.
+    """
+    # stimulus тянет NumPy: импорт только для --random, чтобы не замедлять запуск
+    from stimulus import simulate_random, simulate_vectors
+
+    if args.inputs:
+        width = len(netlist.inputs)
+        with open(args.inputs) as stream:
+            vectors = [vector for lineno, line in enumerate(stream, 1)
+                       for vector in [parse_vector(line, width, lineno)] if vector is not None]
+        coverage = simulate_vectors(netlist, vectors)
+    else:
+        coverage = simulate_random(netlist, args.random, args.seed)
+
+    probability = coverage.probability()
+    out.write(f"наборов: {coverage.vectors}\n")
+    for k, i in enumerate(netlist.outputs):
+        out.write(f"OUT{k + 1}: P(1)={probability[i]:.4f} переключений {coverage.toggles[i]}\n")
+    uncovered = coverage.uncovered_outputs()
+    if uncovered:
+        out.write("постоянные выходы: " + ' '.join(f"OUT{k + 1}" for k in uncovered) + "\n")
+    if args.coverage:
+        coverage.save(args.coverage)
+    out.flush()
+    return (1 if uncovered else 0), coverage.vectors
+
+
+def run_faults(netlist, args, out):
+    """Покрытие неисправностей stuck-at; код выхода 1, если есть необнаруженные.
+
+    Возвращает код выхода и число наборов.
+    """
+    from faults import simulate_faults_random, simulate_faults_table, simulate_faults_vectors
+
+    if args.inputs:
+        width = len(netlist.inputs)
+        with open(args.inputs) as stream:
+            vectors = [vector for lineno, line in enumerate(stream, 1)
+                       for vector in [parse_vector(line, width, lineno)] if vector is not None]
+        simulation = simulate_faults_vectors(netlist, vectors)
+    elif args.random is not None:
+        simulation = simulate_faults_random(netlist, args.random, args.seed)
+    else:
+        simulation = simulate_faults_table(netlist)
+
+    undetected = simulation.undetected()
+    out.write(f"неисправностей: {len(simulation.faults)}, обнаружено: {len(simulation.detected)} "
+              f"({100 * simulation.coverage():.2f}%), наборов: {simulation.vectors}\n")
+    if simulation.unobservable:
+        out.write(f"не влияют ни на один выход: {simulation.unobservable}\n")
+    names = net_names(netlist)
+    for i, value in undetected:
+        out.write(f"  {names[i]} s-a-{value}\n")
+    out.flush()
+    return (1 if undetected else 0), simulation.vectors
+
+
+def run_vcd(netlist, args):
+    """Потоковая трасса в VCD; возвращает число отсчётов"""
+    state = [0] * len(netlist.state_nodes)
+    width = len(netlist.inputs)
+    with VCDWriter(args.vcd, net_names(netlist)) as writer:
+        if not args.inputs:
+            trace(netlist, args.cycles, [0] * width, state, writer, initial=True)
+            return args.cycles + 1
+        # Отсчёт на набор: значения при наборе и текущем состоянии, затем такт
+        kernel = netlist.kernel(all_nodes=True)
+        count = 0
+        with open(args.inputs) as stream:
+            for lineno, line in enumerate(stream, 1):
+                vector = parse_vector(line, width, lineno)
+                if vector is not None:
+                    values = kernel.evaluate([int(bit) for bit in vector], 1, state)
+                    writer.write(count, pack_values(values))
+                    state = netlist.next_state(values)
+                    count += 1
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная симуляция логической схемы")
+    parser.add_argument('circuit', help="файл схемы (.lcb, .json, .blif или .v)")
+    parser.add_argument('-i', '--inputs', help="файл наборов входов (по умолчанию stdin)")
+    parser.add_argument('--table', action='store_true', help="вывести таблицу истинности")
+    parser.add_argument('--batch', type=int, default=None,
+                        help=f"наборов в пачке (по умолчанию {DEFAULT_BATCH}, 1 для терминала)")
+    parser.add_argument('--timings', action='store_true', help="вывести замеры времени в stderr")
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help="оптимизировать netlist перед симуляцией")
+    parser.add_argument('--verify', action='store_true',
+                        help="полный перебор входов с итогами по выходам")
+    parser.add_argument('--expect', action='append',
+                        help="свойство для --verify: номер_выхода=значение (можно несколько)")
+    parser.add_argument('--reference', help="эталонная схема для проверки эквивалентности")
+    parser.add_argument('--stop', action='store_true', help="остановиться на первом контрпримере")
+    parser.add_argument('--bdd', action='store_true',
+                        help="символьная сводка или эквивалентность (--reference) через BDD")
+    parser.add_argument('--order', default='best', choices=ORDER_HEURISTICS + ('best',),
+                        help="эвристика порядка переменных BDD")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="число процессов для --verify (по умолчанию по числу ядер)")
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help="статистика по N случайным наборам (с -i — по наборам из файла)")
+    parser.add_argument('--seed', type=int, default=None, help="зерно генератора для --random")
+    parser.add_argument('--coverage', help="файл статистики --random по элементам (.csv, .npz)")
+    parser.add_argument('--faults', action='store_true',
+                        help="покрытие неисправностей stuck-at (таблица, --random N или -i)")
+    parser.add_argument('--vcd', help="записать трассу всех цепей по тактам в VCD")
+    parser.add_argument('--cycles', type=int, default=DEFAULT_CYCLES,
+                        help=f"тактов для --vcd без -i (по умолчанию {DEFAULT_CYCLES})")
+    args = parser.parse_args(argv)
+
+    timings = [('запуск', time.perf_counter() - START)]
+    mark = time.perf_counter()
+
+    try:
+        netlist = load_netlist(args.circuit)
+    except (CombinationalLoopError, ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    timings.append(('загрузка и левелизация', time.perf_counter() - mark))
+    mark = time.perf_counter()
+
+    if args.optimize:
+        optimized = optimize(netlist)
+        netlist = optimized.netlist
+        print(optimized.report(), file=sys.stderr)
+        timings.append(('оптимизация', time.perf_counter() - mark))
+        mark = time.perf_counter()
+
+    code = 0
+    try:
+        if args.bdd:
+            code = run_bdd(netlist, args, sys.stdout)
+            count = 0
+        elif args.vcd:
+            count = run_vcd(netlist, args)
+        elif args.faults:
+            code, count = run_faults(netlist, args, sys.stdout)
+        elif args.random is not None:
+            code, count = run_random(netlist, args, sys.stdout)
+        elif args.verify:
+            code = run_verify(netlist, args, sys.stdout)
+            count = 1 << len(netlist.inputs)
+        elif args.table:
+            stream_table(netlist, sys.stdout)
+            count = 1 << len(netlist.inputs)
+        elif args.inputs:
+            with open(args.inputs) as stream:
+                count = stream_vectors(netlist, stream, sys.stdout, args.batch or DEFAULT_BATCH)
+        else:
+            batch = args.batch or (1 if sys.stdin.isatty() else DEFAULT_BATCH)
+            count = stream_vectors(netlist, sys.stdin, sys.stdout, batch)
+    except (ValueError, BDDLimitError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 2
+    timings.append(('симуляция', time.perf_counter() - mark))
+
+    if args.timings:
+        for name, seconds in timings:
+            print(f"{name}: {seconds * 1000:.1f} мс", file=sys.stderr)
+        print(f"наборов: {count}, элементов: {len(netlist.types)}", file=sys.stderr)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Компиляция netlist в функцию Python.
+
+По levelized netlist генерируется прямолинейный код — по локальной
+переменной n<i> на цепь и побитовые операции над int:
+
+    def kernel(mask, inputs, state, blocks):
+        n0 = inputs[0] & mask
+        n1 = inputs[1] & mask
+        n2 = n0 & n1
+        n3 = n2
+        return (n3,)
+
+Вычисляются только элементы, от которых зависят OUT; вариант all_nodes
+возвращает значения всех элементов — для статистики по цепям. Каждый бит
+слова (в пределах mask) — независимый набор входов, так что одно и то же
+ядро даёт и одиночную симуляцию (mask=1), и блоки таблицы истинности, и
+пачки случайных векторов; словами могут быть и массивы NumPy uint64.
+Исходник компилируется один раз на топологию: ядра кэшируются по хешу
+типов и связей, поэтому пересборка netlist без изменения схемы (или
+одинаковые схемы) компиляцию не повторяют.
+"""
+import collections
+import hashlib
+import time
+
+from circuit_core import SOURCE_TYPES
+from perf import monitor
+
+KERNEL_CACHE = 32  # скомпилированных ядер в кэше
+
+_kernels = collections.OrderedDict()  # (ключ топологии, all_nodes) -> функция kernel
+
+
+def gate_expr(typ, args, one='1'):
+    """Выражение Python для элемента typ над выражениями входов args"""
+    if typ == 'OUT':
+        return args[0] if args else '0'
+    if typ == 'NOT':
+        return f"{one} ^ {args[0]}" if args else one
+    if typ in ('AND', 'NAND'):
+        expr = ' & '.join(args) if args else one
+    elif typ in ('OR', 'NOR'):
+        expr = ' | '.join(args) if args else '0'
+    elif typ == 'XOR':
+        expr = ' ^ '.join(args) if args else '0'
+    else:
+        return '0'
+    if typ in ('NAND', 'NOR'):
+        return f"{one} ^ ({expr})"
+    return expr
+
+
+def node_code(netlist, i, one='1', indent='    '):
+    """Строки кода, вычисляющие узел i в переменную n<i> (блоки — через blocks)"""
+    typ, srcs = netlist.types[i], netlist.fanin[i]
+    if typ == 'BLK':
+        args = ', '.join('0' if src is None else f"n{src}" for src in netlist.block_args[i])
+        return [f"{indent}b{i} = blocks[{i}].evaluate([{args}], {one})",
+                f"{indent}n{i} = b{i}[0]"]
+    if typ == 'PIN':
+        return [f"{indent}n{i} = b{srcs[0]}[{netlist.pins[i]}]"]
+    return [f"{indent}n{i} = {gate_expr(typ, [f'n{src}' for src in srcs], one)}"]
+
+
+def cone(netlist, roots):
+    """Комбинационные элементы, от которых зависят roots, в порядке уровней"""
+    needed = set()
+    stack = list(roots)
+    while stack:
+        i = stack.pop()
+        if i not in needed:
+            needed.add(i)
+            if netlist.types[i] not in SOURCE_TYPES:
+                stack.extend(netlist.fanin[i])
+    return [i for i in netlist.order if i in needed and netlist.types[i] not in SOURCE_TYPES]
+
+
+def kernel_source(netlist, all_nodes=False):
+    """Исходный код kernel(mask, inputs, state, blocks) -> кортеж слов OUT.
+
+    При all_nodes — список значений всех элементов в порядке netlist.types.
+    """
+    lines = ['def kernel(mask, inputs, state, blocks):']
+    # Недостающие входы и состояние — нули, как в Netlist.evaluate
+    for name, nodes in (('inputs', netlist.inputs), ('state', netlist.state_nodes)):
+        if nodes:
+            lines.append(f"    if len({name}) < {len(nodes)}:")
+            lines.append(f"        {name} = list({name}) + [0] * ({len(nodes)} - len({name}))")
+            lines += [f"    n{i} = {name}[{k}] & mask" for k, i in enumerate(nodes)]
+    if all_nodes:
+        for i in netlist.order:
+            if netlist.types[i] not in SOURCE_TYPES:
+                lines += node_code(netlist, i, one='mask')
+        lines.append(f"    return [{', '.join(f'n{i}' for i in range(len(netlist.types)))}]")
+        return '\n'.join(lines) + '\n'
+    for i in cone(netlist, netlist.outputs):
+        lines += node_code(netlist, i, one='mask')
+    lines.append(f"    return ({''.join(f'n{i}, ' for i in netlist.outputs)})")
+    return '\n'.join(lines) + '\n'
+
+
+def topology_key(netlist):
+    """Хеш типов и связей netlist: одинаковый у схем с одинаковым ядром"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((netlist.types, netlist.fanin, sorted(netlist.block_args.items()),
+                        sorted(netlist.pins.items()))).encode())
+    return digest.hexdigest()
+
+
+class Kernel:
+    """Скомпилированное ядро netlist; определения блоков передаются при вызове"""
+
+    def __init__(self, function, blocks, key):
+        self.function = function
+        self.blocks = blocks
+        self.key = key
+
+    def evaluate(self, inputs, mask=1, state=()):
+        """Слова OUT (в порядке netlist.outputs) или всех элементов — для all_nodes"""
+        return self.function(mask, inputs, state, self.blocks)
+
+
+def compile_netlist(netlist, cache=True, all_nodes=False):
+    """Ядро для netlist; при cache=True одинаковые топологии компилируются один раз"""
+    key = (topology_key(netlist), all_nodes)
+    function = _kernels.get(key) if cache else None
+    if function is None:
+        start = time.perf_counter()
+        namespace = {}
+        exec(compile(kernel_source(netlist, all_nodes), f"<kernel {key[0][:8]}>", 'exec'),
+             namespace)
+        function = namespace['kernel']
+        monitor.record('compile', time.perf_counter() - start, gates=len(netlist.types))
+        if cache:
+            _kernels[key] = function
+            if len(_kernels) > KERNEL_CACHE:
+                _kernels.popitem(last=False)
+    else:
+        _kernels.move_to_end(key)
+    return Kernel(function, netlist.blocks, key)
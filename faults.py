@@ -0,0 +1,235 @@
+"""Моделирование константных неисправностей (stuck-at-0/1) на выходах элементов.
+
+Неисправность — выход элемента, залипший в 0 или в 1; моделируются обе
+неисправности на выходе каждого элемента, кроме OUT. Набор входов
+обнаруживает неисправность, если хотя бы один OUT неисправной схемы
+отличается от исправной.
+
+Неисправности упаковываются по одной на бит слова (parallel fault
+simulation): бит k всех слов — копия схемы с k-й неисправностью. Ядро
+генерируется, как в codegen, но после каждого места неисправности стоит
+
+    n5 = n5 & keep[5] | stuck[5]
+
+где в keep[i] сброшены биты неисправностей узла i, а в stuck[i] выставлены
+биты залипаний в 1. Один проход ядра — один набор входов (каждый вход
+размножен на все биты) сразу для FAULT_GROUP неисправностей; выходы
+исправной схемы считаются обычным ядром по всей пачке наборов.
+Обнаруженные неисправности сразу выбывают (fault dropping): их биты
+снимаются с маски группы, а когда снятых битов набирается REPACK_SHARE,
+оставшиеся неисправности упаковываются заново, плотнее, так что проходы
+быстро сужаются.
+
+Неисправности элементов, от которых не зависит ни один OUT, не
+обнаружить никаким набором: они сразу считаются необнаруженными и в
+проходах не участвуют. Регистры и тактовые генераторы — источники с
+нулевым состоянием, как в stimulus: схема моделируется как комбинационная,
+поэтому их залипание в 0 тоже ненаблюдаемо.
+"""
+import time
+
+from circuit_core import lane_pattern
+from codegen import cone, node_code
+from perf import monitor
+from stimulus import pack_vectors, random_inputs
+
+FAULT_GROUP = 1 << 12  # неисправностей в одном проходе ядра (бит слова на неисправность)
+REPACK_SHARE = 0.1  # доля снятых с масок битов, после которой группы пересобираются плотнее
+FAULT_BATCH = 1 << 10  # наборов, для которых исправная схема считается за один вызов
+FAULT_SLICE = 0.2  # как часто fault_steps отчитывается о ходе, с
+TABLE_INPUTS = 20  # больше входов — только случайные или заданные наборы, не вся таблица
+
+
+def as_int(word):
+    """Слово наборов как int (слова stimulus с NumPy — массивы uint64)"""
+    return word if isinstance(word, int) else int.from_bytes(word.tobytes(), 'little')
+
+
+def table_inputs(n):
+    """words_for(start, count) для строк таблицы истинности подряд.
+
+    count — степень двойки, start кратен count; первый IN — старший бит
+    номера строки, как в Netlist.table_block.
+    """
+    def words_for(start, count):
+        lane_bits = count.bit_length() - 1
+        mask = (1 << count) - 1
+        return [lane_pattern(bit, count) if bit < lane_bits else (mask if start >> bit & 1 else 0)
+                for bit in range(n - 1, -1, -1)]
+    return words_for
+
+
+def fault_source(netlist):
+    """Исходный код kernel(mask, inputs, state, blocks, keep, stuck) -> кортеж слов OUT"""
+    lines = ['def kernel(mask, inputs, state, blocks, keep, stuck):']
+    for name, nodes in (('inputs', netlist.inputs), ('state', netlist.state_nodes)):
+        lines += [f"    n{i} = {name}[{k}] & mask & keep[{i}] | stuck[{i}]"
+                  for k, i in enumerate(nodes)]
+    for i in cone(netlist, netlist.outputs):
+        lines += node_code(netlist, i, one='mask')
+        if netlist.types[i] != 'OUT':
+            lines.append(f"    n{i} = n{i} & keep[{i}] | stuck[{i}]")
+    lines.append(f"    return ({''.join(f'n{i}, ' for i in netlist.outputs)})")
+    return '\n'.join(lines) + '\n'
+
+
+def compile_faults(netlist):
+    """Функция ядра с внедрением неисправностей для netlist"""
+    start = time.perf_counter()
+    namespace = {}
+    exec(compile(fault_source(netlist), "<fault kernel>", 'exec'), namespace)
+    monitor.record('compile', time.perf_counter() - start, gates=len(netlist.types))
+    return namespace['kernel']
+
+
+class FaultSimulation:
+    """Список неисправностей netlist и их обнаружение по мере прогона наборов"""
+
+    def __init__(self, netlist):
+        self.netlist = netlist
+        # Неисправность — (узел, залипшее значение); номер в списке — её номер
+        self.faults = [(i, value) for i, typ in enumerate(netlist.types) if typ != 'OUT'
+                       for value in (0, 1)]
+        nodes = cone(netlist, netlist.outputs)
+        live = set(nodes)
+        live.update(src for i in nodes for src in netlist.fanin[i])
+        # Состояние всегда 0: его залипание в 0 не меняет ни одного выхода
+        state = set(netlist.state_nodes)
+        # Ещё не обнаруженные наблюдаемые неисправности, в порядке номеров
+        self.pending = dict.fromkeys(k for k, (i, value) in enumerate(self.faults)
+                                     if i in live and (value or i not in state))
+        self.unobservable = len(self.faults) - len(self.pending)
+        self.detected = {}  # номер неисправности -> номер обнаружившего её набора
+        self.vectors = 0
+        self.seconds = 0.0
+        self.function = None  # ядро компилируется при первом прогоне
+        self.groups = []  # [группа, mask, keep, stuck] — упакованные pending
+        self.lanes = 0  # битов во всех группах, включая снятые с масок
+
+    def coverage(self):
+        """Доля обнаруженных неисправностей"""
+        return len(self.detected) / len(self.faults) if self.faults else 1.0
+
+    def undetected(self):
+        """Необнаруженные неисправности: [(узел, значение)]"""
+        return [fault for k, fault in enumerate(self.faults) if k not in self.detected]
+
+    def node_status(self):
+        """{узел: (обнаружена ли s-a-0, обнаружена ли s-a-1)}"""
+        status = {}
+        for k, (i, value) in enumerate(self.faults):
+            found = status.get(i, [False, False])
+            found[value] = k in self.detected
+            status[i] = found
+        return {i: tuple(found) for i, found in status.items()}
+
+    def pack(self, group):
+        """[группа, mask, keep, stuck]: бит k слов — неисправность group[k]"""
+        mask = (1 << len(group)) - 1
+        keep = [mask] * len(self.netlist.types)
+        stuck = [0] * len(self.netlist.types)
+        for k, fault in enumerate(group):
+            i, value = self.faults[fault]
+            keep[i] ^= 1 << k
+            if value:
+                stuck[i] |= 1 << k
+        return [group, mask, keep, stuck]
+
+    def repack(self):
+        """Группы по FAULT_GROUP из ещё не обнаруженных неисправностей"""
+        pending = list(self.pending)
+        self.groups = [self.pack(pending[k:k + FAULT_GROUP])
+                       for k in range(0, len(pending), FAULT_GROUP)]
+        self.lanes = len(pending)
+
+    def apply(self, bits, expect, vector):
+        """Один набор входов (bits — 0/1 на IN) против всех ещё не обнаруженных неисправностей.
+
+        expect — значения OUT исправной схемы на этом наборе.
+        """
+        netlist = self.netlist
+        state = [0] * len(netlist.state_nodes)
+        found = []
+        for entry in self.groups:
+            group, mask, keep, stuck = entry
+            if not mask:
+                continue
+            outputs = self.function(mask, [mask if bit else 0 for bit in bits], state,
+                                    netlist.blocks, keep, stuck)
+            diff = 0
+            for word, bit in zip(outputs, expect):
+                diff |= word ^ mask if bit else word
+            # Снятые биты могли выставить stuck — они не считаются
+            diff &= mask
+            if diff:
+                entry[1] = mask ^ diff
+                # Номера выставленных битов: разбор двоичной записи быстрее сдвигов
+                found += [group[k] for k, c in enumerate(reversed(bin(diff)[2:])) if c == '1']
+        for fault in found:
+            self.detected[fault] = vector
+            del self.pending[fault]
+        if found and len(self.pending) < (1 - REPACK_SHARE) * self.lanes:
+            self.repack()
+
+
+def fault_steps(simulation, words_for, total, batch=FAULT_BATCH, seconds=FAULT_SLICE):
+    """Прогон total наборов; words_for(start, count) даёт слова входов.
+
+    Примерно раз в seconds выдаёт число готовых наборов — для фоновых задач.
+    Прогон кончается раньше, когда обнаружены все наблюдаемые неисправности.
+    """
+    netlist = simulation.netlist
+    if simulation.function is None:
+        simulation.function = compile_faults(netlist)
+    simulation.repack()
+    kernel = netlist.kernel()
+    start = time.perf_counter() - simulation.seconds
+    reported = time.perf_counter()
+    done = 0
+    while done < total and simulation.pending:
+        count = min(batch, total - done)
+        words = [as_int(word) for word in words_for(done, count)]
+        good = kernel.evaluate(words, (1 << count) - 1)
+        for j in range(count):
+            simulation.apply([word >> j & 1 for word in words],
+                             [word >> j & 1 for word in good], simulation.vectors)
+            simulation.vectors += 1
+            done += 1
+            if not simulation.pending:
+                break
+            if time.perf_counter() - reported >= seconds and done < total:
+                simulation.seconds = time.perf_counter() - start
+                reported = time.perf_counter()
+                yield done
+        simulation.seconds = time.perf_counter() - start
+    yield done
+
+
+def run_faults(netlist, words_for, total, batch=FAULT_BATCH):
+    """Моделирование неисправностей на total наборах; возвращает FaultSimulation"""
+    simulation = FaultSimulation(netlist)
+    for _ in fault_steps(simulation, words_for, total, batch):
+        pass
+    monitor.record('faults', simulation.seconds, vectors=simulation.vectors,
+                   faults=len(simulation.faults))
+    return simulation
+
+
+def simulate_faults_table(netlist):
+    """Покрытие неисправностей всеми строками таблицы истинности"""
+    n = len(netlist.inputs)
+    if n > TABLE_INPUTS:
+        raise ValueError(f"{n} входов: вся таблица — {1 << n} наборов, нужны случайные наборы")
+    return run_faults(netlist, table_inputs(n), 1 << n)
+
+
+def simulate_faults_random(netlist, vectors, seed=None):
+    """Покрытие неисправностей vectors равномерно случайными наборами"""
+    return run_faults(netlist, random_inputs(len(netlist.inputs), seed), vectors)
+
+
+def simulate_faults_vectors(netlist, vectors):
+    """Покрытие неисправностей заданными наборами (строки "0110", кортежи 0/1)"""
+    n = len(netlist.inputs)
+    return run_faults(netlist, lambda start, count: pack_vectors(vectors[start:start + count], n),
+                      len(vectors))
@@ -0,0 +1,172 @@
+"""Параметрические генераторы схем для бенчмарков и проверок.
+
+Каждый генератор возвращает списки (gates, connections), уже расставленные
+на холсте по логическим уровням. Входы и выходы добавляются в порядке
+младший разряд → старший.
+"""
+import random
+
+from circuit_core import Connection, Gate, Netlist, level_layout
+
+
+class CircuitBuilder:
+    """Пошаговое построение схемы из элементов и соединений"""
+
+    def __init__(self):
+        self.gates = []
+        self.connections = []
+
+    def gate(self, typ, *srcs):
+        """Добавляет элемент с входами от srcs"""
+        gate = Gate(typ, 0, 0)
+        self.gates.append(gate)
+        for src in srcs:
+            self.connections.append(Connection(src, gate))
+        return gate
+
+    def connect(self, src, dst):
+        """Соединение, добавляемое после создания элемента (обратные связи)"""
+        self.connections.append(Connection(src, dst))
+
+    def inputs(self, count):
+        return [self.gate('IN') for _ in range(count)]
+
+    def outputs(self, srcs):
+        return [self.gate('OUT', src) for src in srcs]
+
+    def half_adder(self, a, b):
+        """Полусумматор: (сумма, перенос)"""
+        return self.gate('XOR', a, b), self.gate('AND', a, b)
+
+    def full_adder(self, a, b, c):
+        """Полный сумматор: (сумма, перенос)"""
+        p = self.gate('XOR', a, b)
+        s = self.gate('XOR', p, c)
+        carry = self.gate('OR', self.gate('AND', a, b), self.gate('AND', p, c))
+        return s, carry
+
+    def build(self):
+        """Расставляет элементы по уровням и возвращает (gates, connections)"""
+        netlist = Netlist.from_circuit(self.gates, self.connections)
+        for gate, (x, y) in zip(self.gates, level_layout(netlist)):
+            gate.x, gate.y = x, y
+        return self.gates, self.connections
+
+
+def ripple_carry_adder(bits):
+    """Сумматор с последовательным переносом: входы a, b, cin; выходы s, cout"""
+    c = CircuitBuilder()
+    a, b, (carry,) = c.inputs(bits), c.inputs(bits), c.inputs(1)
+    sums = []
+    for i in range(bits):
+        s, carry = c.full_adder(a[i], b[i], carry)
+        sums.append(s)
+    c.outputs(sums + [carry])
+    return c.build()
+
+
+def carry_lookahead_adder(bits, group=4):
+    """Сумматор с ускоренным переносом внутри групп по group разрядов"""
+    c = CircuitBuilder()
+    a, b, (carry,) = c.inputs(bits), c.inputs(bits), c.inputs(1)
+    g = [c.gate('AND', a[i], b[i]) for i in range(bits)]
+    p = [c.gate('XOR', a[i], b[i]) for i in range(bits)]
+    sums = []
+    for base in range(0, bits, group):
+        c0 = carry
+        for i in range(base, min(base + group, bits)):
+            sums.append(c.gate('XOR', p[i], carry))
+            # c[i+1] = g[i] | p[i]g[i-1] | ... | p[i]..p[base]c0 — без цепочки переносов
+            terms = [g[i]]
+            for j in range(i - 1, base - 1, -1):
+                terms.append(c.gate('AND', g[j], *p[j + 1:i + 1]))
+            terms.append(c.gate('AND', c0, *p[base:i + 1]))
+            carry = c.gate('OR', *terms)
+    c.outputs(sums + [carry])
+    return c.build()
+
+
+def array_multiplier(bits):
+    """Матричный умножитель bits × bits: выходы — 2·bits разрядов произведения"""
+    c = CircuitBuilder()
+    a, b = c.inputs(bits), c.inputs(bits)
+    row = [c.gate('AND', a[j], b[0]) for j in range(bits)]
+    product = [row[0]]
+    acc = row[1:]
+    for i in range(1, bits):
+        pp = [c.gate('AND', a[j], b[i]) for j in range(bits)]
+        nxt = []
+        s, carry = c.half_adder(pp[0], acc[0])
+        product.append(s)
+        for j in range(1, bits):
+            if j < len(acc):
+                s, carry = c.full_adder(pp[j], acc[j], carry)
+            else:
+                s, carry = c.half_adder(pp[j], carry)
+            nxt.append(s)
+        acc = nxt + [carry]
+    c.outputs(product + acc)
+    return c.build()
+
+
+def parity_tree(width):
+    """Сбалансированное дерево XOR2 над width входами с одним выходом"""
+    c = CircuitBuilder()
+    layer = c.inputs(width)
+    while len(layer) > 1:
+        nxt = [c.gate('XOR', layer[i], layer[i + 1]) for i in range(0, len(layer) - 1, 2)]
+        if len(layer) % 2:
+            nxt.append(layer[-1])
+        layer = nxt
+    c.outputs(layer)
+    return c.build()
+
+
+def random_dag(gates, inputs=16, depth=20, seed=0, outputs=16):
+    """Случайный ациклический граф заданного размера и глубины"""
+    rnd = random.Random(seed)
+    c = CircuitBuilder()
+    levels = [c.inputs(inputs)]
+    per_level = max(1, -(-gates // depth))
+    made = 0
+    while made < gates:
+        layer = []
+        for _ in range(min(per_level, gates - made)):
+            typ = rnd.choice(('AND', 'OR', 'XOR', 'NAND', 'NOR', 'NOT'))
+            # Один вход с предыдущего уровня гарантирует заданную глубину
+            srcs = [rnd.choice(levels[-1])]
+            if typ != 'NOT':
+                for _ in range(rnd.randint(1, 2)):
+                    srcs.append(rnd.choice(rnd.choice(levels)))
+            layer.append(c.gate(typ, *srcs))
+        made += len(layer)
+        levels.append(layer)
+    c.outputs(rnd.sample(levels[-1], min(outputs, len(levels[-1]))))
+    return c.build()
+
+
+def counter(bits, enable=False):
+    """Двоичный счётчик на D-триггерах (или регистрах с входом EN)"""
+    c = CircuitBuilder()
+    (en,) = c.inputs(1) if enable else (None,)
+    regs = [c.gate('REG' if enable else 'DFF') for _ in range(bits)]
+    carry = None
+    for i, q in enumerate(regs):
+        # q[i] переключается, когда все младшие разряды равны 1
+        d = c.gate('NOT', q) if carry is None else c.gate('XOR', q, carry)
+        c.connect(d, q)
+        if enable:
+            c.connect(en, q)
+        carry = q if carry is None else c.gate('AND', carry, q)
+    c.outputs(regs)
+    return c.build()
+
+
+GENERATORS = {
+    'ripple': ripple_carry_adder,
+    'cla': carry_lookahead_adder,
+    'multiplier': array_multiplier,
+    'parity': parity_tree,
+    'random': random_dag,
+    'counter': counter,
+}
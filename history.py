@@ -0,0 +1,138 @@
+"""Журнал правок схемы для отмены и повтора.
+
+Запись журнала — не снимок схемы, а дельта: «добавлены такие-то элементы
+и соединения», «удалены ...» или «элементы сдвинуты на (dx, dy)».
+Отмена и повтор применяют дельту через редактор (ModernApp), который
+меняет только затронутые элементы, провода и ячейки пространственного
+индекса, поэтому стоимость операции зависит от размера правки, а не от
+размера схемы.
+
+Элементы и соединения хранятся вместе со своими id в CircuitGraph: порядок
+id задаёт нумерацию входов и выходов netlist и порядок входов элементов, и
+после отмены удаления схема должна стать в точности прежней.
+
+Редактор должен уметь:
+
+    insert_items(gates, connections)  # [(id, объект)]
+    remove_items(gates, connections)
+    move_gates(gates, dx, dy)
+"""
+import collections
+
+HISTORY_BUDGET = 1 << 20  # суммарный размер записей журнала, элементов и соединений
+
+
+class AddItems:
+    """Добавлены элементы и соединения"""
+
+    open = False
+
+    def __init__(self, gates=(), connections=()):
+        self.gates = list(gates)  # [(id, Gate)]
+        self.connections = list(connections)  # [(id, Connection)]
+
+    def size(self):
+        return len(self.gates) + len(self.connections) + 1
+
+    def undo(self, editor):
+        editor.remove_items(self.gates, self.connections)
+
+    def redo(self, editor):
+        editor.insert_items(self.gates, self.connections)
+
+    def merge(self, other):
+        return False
+
+
+class RemoveItems(AddItems):
+    """Удалены элементы и соединения"""
+
+    def undo(self, editor):
+        editor.insert_items(self.gates, self.connections)
+
+    def redo(self, editor):
+        editor.remove_items(self.gates, self.connections)
+
+
+class MoveGates:
+    """Элементы сдвинуты на (dx, dy).
+
+    Пока запись открыта (идёт перетаскивание), следующие сдвиги тех же
+    элементов складываются в неё, и всё перетаскивание — одна запись.
+    """
+
+    def __init__(self, gates, dx, dy):
+        self.gates = list(gates)
+        self.dx = dx
+        self.dy = dy
+        self.open = True
+
+    def size(self):
+        return len(self.gates) + 1
+
+    def undo(self, editor):
+        editor.move_gates(self.gates, -self.dx, -self.dy)
+
+    def redo(self, editor):
+        editor.move_gates(self.gates, self.dx, self.dy)
+
+    def merge(self, other):
+        """Добавляет сдвиг other, если это продолжение того же перетаскивания"""
+        if not (self.open and isinstance(other, MoveGates) and other.gates == self.gates):
+            return False
+        self.dx += other.dx
+        self.dy += other.dy
+        return True
+
+
+class History:
+    """Стеки отмены и повтора с ограничением суммарного размера записей"""
+
+    def __init__(self, budget=HISTORY_BUDGET):
+        self.budget = budget
+        self.done = collections.deque()
+        self.undone = []
+        self.size = 0  # суммарный размер записей в обоих стеках
+
+    def push(self, command):
+        """Записывает выполненную правку; стек повтора сбрасывается"""
+        for entry in self.undone:
+            self.size -= entry.size()
+        self.undone = []
+        if self.done and self.done[-1].merge(command):
+            return
+        self.done.append(command)
+        self.size += command.size()
+        # Самые старые записи вытесняются; последняя остаётся в любом случае
+        while self.size > self.budget and len(self.done) > 1:
+            self.size -= self.done.popleft().size()
+
+    def close(self):
+        """Завершает открытую запись (конец перетаскивания)"""
+        if self.done:
+            self.done[-1].open = False
+
+    def undo(self, editor):
+        """Отменяет последнюю правку; False, если отменять нечего"""
+        if not self.done:
+            return False
+        command = self.done.pop()
+        command.open = False
+        command.undo(editor)
+        self.undone.append(command)
+        return True
+
+    def redo(self, editor):
+        """Повторяет последнюю отменённую правку; False, если повторять нечего"""
+        if not self.undone:
+            return False
+        command = self.undone.pop()
+        command.redo(editor)
+        self.done.append(command)
+        return True
+
+    def clear(self):
+        """Очищает журнал (загрузка новой схемы)"""
+        self.done.clear()
+        self.undone = []
+        self.size = 0
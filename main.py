@@ -1,85 +1,1209 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import itertools
-
-# Константы для цветов
-COLORS = {
-    'bg': '#2b2b2b',
-    'sidebar': '#3c3f41',
-    'canvas': '#ffffff',
-    'gate': '#4a9eff',
-    'gate_active': '#6ab0ff',
-    'input': '#6bbf59',
-    'output': '#ff6b6b',
-    'not': '#ffa154',
-    'wire': '#555',
-    'wire_active': '#ffcc00',
-    'text': '#ffffff',
-    'text_dark': '#333333',
-    'button': '#4a9eff',
-    'button_hover': '#6ab0ff'
-}
-
-
-class Gate:
-    def __init__(self, typ, x, y):
-        self.type = typ
-        self.x = x
-        self.y = y
-        self.value = False
-        self.inputs = []
-        self.width = 80
-        self.height = 50
-        self.selected = False
-        self.radius = 8
-
-        # Определяем цвета в зависимости от типа
-        if typ == 'IN':
-            self.color = COLORS['input']
-        elif typ == 'OUT':
-            self.color = COLORS['output']
-        elif typ == 'NOT':
-            self.color = COLORS['not']
+from tkinter import ttk, messagebox, filedialog, simpledialog
+import bisect
+import collections
+import math
+import os
+import time
+
+import circuit_io
+import netlist_import
+from blocks import BlockDef, copy_circuit
+from circuit_core import (COLORS, INPUTLESS_TYPES, REGISTER_TYPES, TABLE_CHUNK_BITS,
+                          PORT_HIT, CircuitGraph, CombinationalLoopError, Connection, Gate, Netlist,
+                          SpatialIndex)
+from history import HISTORY_BUDGET, AddItems, History, MoveGates, RemoveItems
+from perf import FRAME_BUDGET, monitor
+from router import Router
+from bdd import BDDLimitError, CircuitBDD
+from faults import TABLE_INPUTS, FaultSimulation, fault_steps, table_inputs
+from optimize import optimize
+from sequential import SequentialSimulator
+from stimulus import Coverage, random_inputs, stimulus_steps
+from waveform import VCDWriter, WaveformBuffer, net_names
+from verify import MAX_INPUTS, ExhaustiveCheck, match_blocks
+from worker import BackgroundJob
+
+VIEW_BLOCK_BITS = 8  # строк в блоке, вычисляемом для страницы таблицы: 2**8
+VIEW_PAGE = 25  # строк на странице таблицы истинности
+VIEW_CACHE = 64  # блоков в кэше окна таблицы
+HUD_INTERVAL = 500  # период обновления HUD, мс
+VERIFY_POLL = 50  # период опроса полной проверки, мс
+VERIFY_SLICE = 0.03  # сколько poll() может занять за раз, с
+VERIFY_SHOWN = 256  # векторов гистограммы в окне проверки
+JOB_POLL = 50  # период опроса фоновой задачи, мс
+BDD_CUBES = 16  # кубов на выход в сводке BDD
+HEAT_VECTORS = 1 << 18  # случайных наборов для тепловой карты по умолчанию
+FAULT_VECTORS = 1 << 12  # случайных наборов для покрытия неисправностей по умолчанию
+FAULT_SHOWN = 500  # необнаруженных неисправностей в окне итога
+WAVE_WIDTH = 360  # ширина панели осциллограмм, px
+WAVE_LABEL = 70  # ширина колонки имён сигналов, px
+WAVE_ROW = 28  # высота строки сигнала, px
+WAVE_STEP = 8  # пикселей на отсчёт по умолчанию
+MIN_SCALE, MAX_SCALE = 0.02, 4.0  # пределы масштаба холста
+LOD_SCALE = 0.5  # ниже этого масштаба элементы рисуются упрощённо
+OVERVIEW_GATES = 4000  # больше видимых элементов при мелком масштабе — обзорная карта плотности
+OVERVIEW_TILE = 12  # сторона клетки обзорной карты, px
+ZOOM_STEP = 1.1  # множитель масштаба на щелчок колеса
+GRID_SIZE = 20  # шаг сетки в мировых координатах
+GRID_MIN_STEP = 8  # сетка с шагом мельче стольких пикселей не рисуется
+CANVAS_AREA = (0, 0, 2000, 2000)  # минимальная прокручиваемая область, мировые координаты
+PASTE_OFFSET = 40  # сдвиг каждой следующей вставки из буфера обмена, мировые координаты
+RUN_SLICE = 0.05  # длительность порции тактов фонового прогона между отчётами, с
+VALUE_TYPES = ('IN', 'OUT', 'CLK') + REGISTER_TYPES  # элементы с подписью значения
+CIRCUIT_FILETYPES = [('Схема (двоичный формат)', '*.lcb'),
+                     ('JSON (текстовый экспорт)', '*.json'),
+                     ('Все файлы', '*.*')]
+IMPORT_FILETYPES = CIRCUIT_FILETYPES[:2] + [('Netlist (BLIF, структурный Verilog)', '*.blif *.v'),
+                                            ('Все файлы', '*.*')]
+
+
+def heat_color(probability):
+    """Цвет тепловой карты: от heat_low (всегда 0) до heat_high (всегда 1)"""
+    low, high = COLORS['heat_low'], COLORS['heat_high']
+    channels = (round(int(low[k:k + 2], 16) * (1 - probability) +
+                      int(high[k:k + 2], 16) * probability) for k in (1, 3, 5))
+    return '#' + ''.join(f"{c:02x}" for c in channels)
+
+
+def heat_steps(netlist, vectors):
+    """Фоновая задача тепловой карты: снимок статистики после каждой пачки наборов"""
+    coverage = Coverage(netlist)
+    for done in stimulus_steps(coverage, random_inputs(len(netlist.inputs)), vectors):
+        # Снимок делается в потоке задачи: интерфейс не читает Coverage во время add
+        yield done / vectors, (done, coverage.probability(),
+                               [toggles > 0 for toggles in coverage.toggles],
+                               coverage.uncovered_outputs(), coverage.seconds)
+
+
+def fault_job_steps(netlist, vectors):
+    """Фоновая задача покрытия неисправностей; vectors = 0 — вся таблица истинности"""
+    n = len(netlist.inputs)
+    if vectors:
+        words_for, total = random_inputs(n), vectors
+    elif n > TABLE_INPUTS:
+        raise ValueError(f"{n} входов: вся таблица — {1 << n} наборов, нужны случайные наборы")
+    else:
+        words_for, total = table_inputs(n), 1 << n
+    simulation = FaultSimulation(netlist)
+    for done in fault_steps(simulation, words_for, total):
+        # Снимок делается в потоке задачи, как в heat_steps
+        yield done / total, (simulation.vectors, simulation.node_status(), simulation.coverage(),
+                             simulation.undetected(), len(simulation.faults), simulation.seconds)
+
+
+def load_steps(path):
+    """Загрузка схемы для BackgroundJob; BLIF и Verilog читаются по шагам с прогрессом.
+
+    Результат — (gates, connections, определения блоков из файла). Библиотеку
+    редактора поток не трогает: определения добавляются в неё в finish_load.
+    """
+    library = {}
+    if not netlist_import.is_structural(path):
+        yield 1.0, circuit_io.load_circuit(path, library) + (library,)
+        return
+    for progress, data in netlist_import.import_steps(path):
+        yield progress, None if data is None else data.to_circuit(library) + (library,)
+
+
+def bdd_summary(netlist):
+    """Фоновая задача сводки BDD: строки текста сводки"""
+    total = 1 << len(netlist.inputs)
+    with monitor.timed('bdd') as data:
+        circuit = CircuitBDD(netlist, 'best')
+        data['nodes'] = circuit.size()
+
+    lines = [f"Узлов BDD: {circuit.size()}",
+             "Порядок переменных: " + ' '.join(f"IN{p + 1}" for p in circuit.order), ""]
+    for k in range(len(netlist.outputs)):
+        count = circuit.sat_count(k)
+        lines.append(f"OUT{k + 1} = 1 в {count} строках из {total} "
+                     f"({100 * count / total:.2f}%)")
+        cubes = list(circuit.cube_strings(k, BDD_CUBES + 1))
+        lines += [f"    {cube}" for cube in cubes[:BDD_CUBES]]
+        if len(cubes) > BDD_CUBES:
+            lines.append("    …")
+    for group in circuit.equivalent_outputs():
+        lines.append("Совпадают: " + ' ≡ '.join(f"OUT{k + 1}" for k in group))
+    yield 1.0, lines
+
+
+class ViewTransform:
+    """Преобразование мировых координат схемы в экранные координаты холста.
+
+    Схема хранится в мировых координатах; холст не прокручивается и не
+    масштабируется сам, поэтому и отрисовка, и поиск элемента под курсором
+    идут через одно и то же преобразование.
+    """
+
+    def __init__(self, scale=1.0, x0=0.0, y0=0.0):
+        self.scale = scale
+        self.x0 = x0  # мировые координаты левого верхнего угла окна
+        self.y0 = y0
+
+    def to_screen(self, x, y):
+        """Мировая точка -> точка холста"""
+        return (x - self.x0) * self.scale, (y - self.y0) * self.scale
+
+    def to_world(self, sx, sy):
+        """Точка холста (event.x, event.y) -> мировая точка"""
+        return sx / self.scale + self.x0, sy / self.scale + self.y0
+
+    def zoom_at(self, sx, sy, factor):
+        """Масштаб с неподвижной точкой (sx, sy); False, если упёрлись в предел"""
+        x, y = self.to_world(sx, sy)
+        scale = min(MAX_SCALE, max(MIN_SCALE, self.scale * factor))
+        if scale == self.scale:
+            return False
+        self.scale = scale
+        self.x0, self.y0 = x - sx / scale, y - sy / scale
+        return True
+
+    def pan(self, dx, dy):
+        """Сдвиг вида на (dx, dy) пикселей экрана"""
+        self.x0 -= dx / self.scale
+        self.y0 -= dy / self.scale
+
+    def world_rect(self, width, height):
+        """Мировой прямоугольник, видимый в окне width × height"""
+        return self.x0, self.y0, self.x0 + width / self.scale, self.y0 + height / self.scale
+
+    def detailed(self):
+        """Рисовать ли элементы полностью (иначе — упрощённо, одним прямоугольником)"""
+        return self.scale >= LOD_SCALE
+
+
+class CanvasRenderer:
+    """Отрисовка схемы в retained-режиме.
+
+    Хранит id элементов холста для каждого Gate и Connection, поэтому
+    перемещение элемента, смена выделения или значений меняют только его
+    собственные элементы холста и подключённые к нему провода.
+
+    На холсте есть только элементы, попадающие в окно (их находит
+    пространственный индекс), и провода, у которых виден хотя бы один конец.
+    Провода идут по ортогональным трассам Router, которые прокладываются при
+    первой отрисовке и перекладываются, только если их задело перемещение.
+    При мелком масштабе элемент — один прямоугольник без текста и портов,
+    провод — тонкая прямая линия без стрелки, трассы не прокладываются.
+    Если же в окно при мелком масштабе попадает больше OVERVIEW_GATES
+    элементов (импортированный netlist целиком), вместо них рисуется
+    обзорная карта: клетки экрана, закрашенные по числу элементов в них,
+    без проводов. Элементы появляются при приближении.
+    """
+
+    def __init__(self, canvas, graph, spatial, view):
+        self.canvas = canvas
+        self.graph = graph  # CircuitGraph: провода элемента берутся из его смежности
+        self.spatial = spatial
+        self.view = view
+        # Gate -> {'body': [...], 'label', 'value', 'ports': [...]}, только для видимых элементов
+        self.gate_items = {}
+        self.wire_items = {}  # Connection -> id линии, только нарисованные
+        self.heat = {}  # Gate -> (вероятность единицы, переключался ли) для тепловой карты
+        self.faults = {}  # Gate -> (обнаружена ли s-a-0, обнаружена ли s-a-1)
+        self.router = Router(spatial, GRID_SIZE)
+        self.overview = False  # окно показано обзорной картой, а не элементами
+        self.tile_items = {}  # (tx, ty) -> id клетки обзорной карты
+        self.density = None  # (масштаб, Counter клеток, максимум) — кэш overview_tiles
+
+    def viewport(self):
+        """Размер окна холста в пикселях"""
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if width <= 1 or height <= 1:  # окно ещё не показано
+            width, height = int(self.canvas.cget('width')), int(self.canvas.cget('height'))
+        return width, height
+
+    def view_rect(self):
+        """Мировой прямоугольник, видимый в окне"""
+        return self.view.world_rect(*self.viewport())
+
+    def in_view(self, gate, rect=None):
+        """Попадает ли элемент вместе с портами в окно"""
+        x0, y0, x1, y1 = rect or self.view_rect()
+        return (gate.x - PORT_HIT <= x1 and x0 <= gate.x + gate.width + PORT_HIT
+                and gate.y <= y1 and y0 <= gate.y + gate.height)
+
+    def visible_gates(self):
+        """Элементы, попадающие в окно"""
+        x0, y0, x1, y1 = self.view_rect()
+        return self.spatial.query_rect(x0 - PORT_HIT, y0, x1 + PORT_HIT, y1)
+
+    def rebuild(self):
+        """Полная перерисовка холста после замены схемы"""
+        with monitor.timed('redraw', kind='rebuild'):
+            self.router.clear()
+            self.density = None
+            self.refresh()
+
+    def refresh(self):
+        """Перерисовка окна после смены масштаба или размера"""
+        with monitor.timed('redraw', kind='view'):
+            self.canvas.delete("all")
+            self.gate_items = {}
+            self.wire_items = {}
+
+            # Сетка для фона
+            self.draw_grid()
+
+            self.tile_items = {}
+            if not self.view.detailed():
+                tiles = self.visible_tiles()
+                self.overview = sum(count for _, count in tiles) > OVERVIEW_GATES
+                if self.overview:
+                    for tile, count in tiles:
+                        self.draw_tile(tile, count)
+                    return
+
+            # Сначала провода видимых элементов, сверху — сами элементы
+            visible = self.visible_gates()
+            for gate in visible:
+                for conn in self.graph.wires(gate):
+                    if conn not in self.wire_items:
+                        self.draw_wire(conn, lower=False)
+            for gate in visible:
+                self.draw_gate(gate)
+
+    def overview_tiles(self):
+        """Число элементов в клетках обзорной карты при текущем масштабе.
+
+        Клетки — мировая сетка с шагом OVERVIEW_TILE px экрана, поэтому при
+        сдвиге вида нарисованные клетки просто двигаются вместе с холстом.
+        Подсчёт проходит по всем элементам и кэшируется до смены масштаба
+        или правки схемы.
+        """
+        if self.density is None or self.density[0] != self.view.scale:
+            tile = OVERVIEW_TILE / self.view.scale
+            tiles = collections.Counter(
+                (math.floor((gate.x + gate.width / 2) / tile),
+                 math.floor((gate.y + gate.height / 2) / tile))
+                for gate in self.graph.gates.values())
+            self.density = (self.view.scale, tiles, max(tiles.values(), default=1))
+        return self.density[1]
+
+    def visible_tiles(self):
+        """Непустые клетки обзорной карты в окне: [((tx, ty), число элементов)]"""
+        tiles = self.overview_tiles()
+        tile = OVERVIEW_TILE / self.view.scale
+        x0, y0, x1, y1 = self.view_rect()
+        tx0, ty0 = math.floor(x0 / tile), math.floor(y0 / tile)
+        tx1, ty1 = math.floor(x1 / tile), math.floor(y1 / tile)
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > len(tiles):
+            return [(key, count) for key, count in tiles.items()
+                    if tx0 <= key[0] <= tx1 and ty0 <= key[1] <= ty1]
+        return [(key, tiles[key]) for key in
+                ((tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1))
+                if key in tiles]
+
+    def draw_tile(self, key, count):
+        """Клетка обзорной карты: тем темнее, чем больше в ней элементов"""
+        tile = OVERVIEW_TILE / self.view.scale
+        x, y = self.view.to_screen(key[0] * tile, key[1] * tile)
+        shade = 200 - 150 * count // self.density[2]
+        self.tile_items[key] = self.canvas.create_rectangle(
+            x, y, x + OVERVIEW_TILE, y + OVERVIEW_TILE, width=0,
+            fill=f'#{shade:02x}{shade:02x}{min(255, shade + 40):02x}')
+
+    def pan(self, dx, dy):
+        """Сдвиг вида: нарисованное двигается, дорисовываются только вошедшие в окно элементы"""
+        if self.overview:
+            self.pan_overview(dx, dy)
+            return
+        with monitor.timed('redraw', kind='pan'):
+            self.view.pan(dx, dy)
+            self.canvas.move("all", dx, dy)
+            self.canvas.delete('grid')
+            self.draw_grid()
+            rect = self.view_rect()
+            for gate in [gate for gate in self.gate_items if not self.in_view(gate, rect)]:
+                self.hide_gate(gate)
+            for gate in self.visible_gates():
+                if gate not in self.gate_items:
+                    self.show_gate(gate)
+
+    def pan_overview(self, dx, dy):
+        """Сдвиг обзорной карты: дорисовываются только вошедшие в окно клетки"""
+        with monitor.timed('redraw', kind='pan'):
+            self.view.pan(dx, dy)
+            tiles = self.visible_tiles()
+            if sum(count for _, count in tiles) <= OVERVIEW_GATES:
+                self.refresh()  # в окне мало элементов: рисуются они сами
+                return
+            self.canvas.move("all", dx, dy)
+            visible = dict(tiles)
+            for key in [key for key in self.tile_items if key not in visible]:
+                self.canvas.delete(self.tile_items.pop(key))
+            for key, count in tiles:
+                if key not in self.tile_items:
+                    self.draw_tile(key, count)
+
+    def draw_grid(self):
+        """Рисует сетку в пределах окна; при мелком масштабе сетки нет"""
+        step = GRID_SIZE * self.view.scale
+        if step < GRID_MIN_STEP:
+            return
+        width, height = self.viewport()
+        x0, y0, _, _ = self.view_rect()
+        sx = (-x0 % GRID_SIZE) * self.view.scale
+        sy = (-y0 % GRID_SIZE) * self.view.scale
+
+        # Вертикальные линии
+        while sx < width:
+            self.canvas.create_line(sx, 0, sx, height, fill='#f0f0f0', tags='grid')
+            sx += step
+
+        # Горизонтальные линии
+        while sy < height:
+            self.canvas.create_line(0, sy, width, sy, fill='#f0f0f0', tags='grid')
+            sy += step
+        self.canvas.tag_lower('grid')
+
+    def gate_style(self, gate):
+        """Цвета заливки и контура элемента с учётом выделения, тепловой карты и неисправностей"""
+        if gate.selected:
+            return COLORS['gate_active'], '#ffcc00', 3
+        if gate in self.faults:
+            found = sum(self.faults[gate])
+            color = ('fault_missed', 'fault_partial', 'fault_found')[found]
+            return COLORS[color], '#333', 2 if found == 2 else 4
+        if gate in self.heat:
+            probability, toggled = self.heat[gate]
+            outline = '#333' if toggled else COLORS['heat_stuck']
+            return heat_color(probability), outline, 2 if toggled else 4
+        return gate.color, '#333', 2
+
+    def add_gate(self, gate):
+        """Новый элемент схемы: рисуется, если попадает в окно"""
+        self.density = None
+        if self.in_view(gate) and not self.overview:
+            self.draw_gate(gate)
+        self.reroute(self.router.touched(*self.gate_box(gate)))
+
+    def show_gate(self, gate):
+        """Рисует вошедший в окно элемент вместе с его ещё не нарисованными проводами"""
+        self.draw_gate(gate)
+        for conn in self.graph.wires(gate):
+            if conn not in self.wire_items:
+                self.draw_wire(conn)
+
+    def draw_gate(self, gate):
+        """Рисует один элемент и запоминает id его элементов холста"""
+        scale = self.view.scale
+        x, y = self.view.to_screen(gate.x, gate.y)
+        width, height = gate.width * scale, gate.height * scale
+        fill_color, outline_color, outline_width = self.gate_style(gate)
+
+        if not self.view.detailed():
+            # Мелкий масштаб: один прямоугольник вместо шести фигур, текста и портов
+            body = [self.canvas.create_rectangle(x, y, x + width, y + height, fill=fill_color,
+                                                 outline=outline_color, width=1, tags='gate')]
+            self.gate_items[gate] = {'body': body, 'label': None, 'value': None, 'ports': []}
+            return
+
+        radius = gate.radius * scale
+        style = dict(fill=fill_color, outline=outline_color, width=outline_width, tags='gate')
+
+        # Рисуем скругленный прямоугольник
+        body = [
+            self.canvas.create_rectangle(x + radius, y, x + width - radius, y + height, **style),
+            self.canvas.create_rectangle(x, y + radius, x + width, y + height - radius, **style),
+            self.canvas.create_oval(x, y, x + 2 * radius, y + 2 * radius, **style),
+            self.canvas.create_oval(x + width - 2 * radius, y, x + width, y + 2 * radius, **style),
+            self.canvas.create_oval(x, y + height - 2 * radius, x + 2 * radius, y + height, **style),
+            self.canvas.create_oval(x + width - 2 * radius, y + height - 2 * radius,
+                                    x + width, y + height, **style),
+        ]
+
+        # Текст элемента; у экземпляра блока — имя определения
+        label = self.canvas.create_text(
+            x + width / 2, y + height / 2,
+            text=gate.block.name if gate.block is not None else gate.type,
+            font=('Segoe UI', max(1, round(10 * scale)), 'bold'),
+            fill=COLORS['text'], tags='gate'
+        )
+
+        # Отображаем значение для входов и выходов
+        value = None
+        if gate.type in VALUE_TYPES:
+            value = self.canvas.create_text(
+                x + width - 15 * scale, y + 15 * scale,
+                text="1" if gate.value else "0",
+                font=('Segoe UI', max(1, round(12 * scale)), 'bold'),
+                fill="#2ecc71" if gate.value else "#e74c3c", tags='gate'
+            )
+
+        # Рисуем порты подключения
+        ports = []
+        r = 6 * scale
+        if gate.type not in INPUTLESS_TYPES:  # Входные порты
+            for pin in range(gate.input_count()):
+                ix, iy = self.view.to_screen(*gate.get_input_port(pin))
+                ports.append(self.canvas.create_oval(
+                    ix - r, iy - r, ix + r, iy + r,
+                    fill='#e74c3c', outline='#c0392b', width=2, tags='gate'
+                ))
+
+        if gate.type != 'OUT':  # Выходные порты
+            for pin in range(gate.output_count()):
+                ox, oy = self.view.to_screen(*gate.get_output_port(pin))
+                ports.append(self.canvas.create_oval(
+                    ox - r, oy - r, ox + r, oy + r,
+                    fill='#2ecc71', outline='#27ae60', width=2, tags='gate'
+                ))
+
+        self.gate_items[gate] = {'body': body, 'label': label, 'value': value, 'ports': ports}
+
+    def remove_gate(self, gate):
+        """Удаляет элемент и все подключённые к нему провода (до удаления из графа)"""
+        self.density = None
+        for conn in self.graph.wires(gate):
+            self.remove_wire(conn)
+        items = self.gate_items.pop(gate, None)
+        if items:
+            self.canvas.delete(*self.gate_item_ids(items))
+
+    def hide_gate(self, gate):
+        """Убирает с холста элемент, вышедший из окна, и его провода без видимых концов"""
+        items = self.gate_items.pop(gate, None)
+        if items:
+            self.canvas.delete(*self.gate_item_ids(items))
+        for conn in self.graph.wires(gate):
+            if conn.src not in self.gate_items and conn.dst not in self.gate_items:
+                self.hide_wire(conn)
+
+    def gate_item_ids(self, items):
+        """Все id элементов холста одного элемента схемы"""
+        ids = items['body'] + items['ports']
+        for key in ('label', 'value'):
+            if items[key] is not None:
+                ids.append(items[key])
+        return ids
+
+    def wire_coords(self, conn):
+        """Экранные координаты точек провода: трасса или, при мелком масштабе, прямая"""
+        if self.view.detailed():
+            points = self.router.path(conn)
+        else:
+            points = (conn.src.get_output_port(conn.src_pin),
+                      conn.dst.get_input_port(conn.dst_pin))
+        return [v for point in points for v in self.view.to_screen(*point)]
+
+    def gate_box(self, gate):
+        """Корпус элемента в мировых координатах"""
+        return gate.x, gate.y, gate.x + gate.width, gate.y + gate.height
+
+    def reroute(self, conns):
+        """Сбрасывает трассы проводов и перекладывает нарисованные из них"""
+        for conn in conns:
+            self.router.forget(conn)
+        for conn in conns:
+            if conn in self.wire_items:
+                self.canvas.coords(self.wire_items[conn], *self.wire_coords(conn))
+
+    def add_wire(self, conn, lower=True):
+        """Новый провод (уже в графе); рисуется, если виден хотя бы один его конец"""
+        if conn.src in self.gate_items or conn.dst in self.gate_items:
+            self.draw_wire(conn, lower)
+
+    def draw_wire(self, conn, lower=True):
+        """Рисует провод; lower опускает его под элементы схемы"""
+        # Цвет провода в зависимости от значения
+        wire_color = COLORS['wire_active'] if conn.value() else COLORS['wire']
+        if self.view.detailed():
+            scale = self.view.scale
+            item = self.canvas.create_line(*self.wire_coords(conn),
+                                           fill=wire_color, width=max(1, 3 * scale), arrow=tk.LAST,
+                                           arrowshape=(8 * scale, 10 * scale, 5 * scale))
+        else:
+            item = self.canvas.create_line(*self.wire_coords(conn), fill=wire_color, width=1)
+        if lower and self.gate_items:
+            self.canvas.tag_lower(item, 'gate')
+
+        self.wire_items[conn] = item
+
+    def remove_wire(self, conn):
+        """Удаляет провод с холста и его трассу"""
+        self.hide_wire(conn)
+        self.router.forget(conn)
+
+    def hide_wire(self, conn):
+        """Убирает провод с холста"""
+        item = self.wire_items.pop(conn, None)
+        if item is not None:
+            self.canvas.delete(item)
+
+    def move_gate(self, gate, dx, dy):
+        """Сдвигает элементы холста одного Gate (dx, dy — в мировых единицах) и его провода"""
+        self.move_gates([gate], dx, dy)
+
+    def move_gates(self, gates, dx, dy):
+        """Сдвигает элементы холста группы; каждый задетый провод перекладывается один раз"""
+        with monitor.timed('redraw', kind='move', gates=len(gates)):
+            rect = self.view_rect()
+            scale = self.view.scale
+            wires = {}
+            for gate in gates:
+                items = self.gate_items.get(gate)
+                visible = self.in_view(gate, rect) and not self.overview
+                if items and not visible:
+                    self.hide_gate(gate)
+                elif visible and not items:
+                    self.show_gate(gate)
+                elif items:
+                    for item in self.gate_item_ids(items):
+                        self.canvas.move(item, dx * scale, dy * scale)
+                # Перекладываются провода элемента и трассы, через которые он теперь проходит
+                wires.update(dict.fromkeys(self.graph.wires(gate)))
+                wires.update(dict.fromkeys(self.router.touched(*self.gate_box(gate))))
+            self.reroute(list(wires))
+        self.density = None
+        if self.overview:
+            self.refresh()
+
+    def restyle_gate(self, gate):
+        """Перекрашивает корпус элемента после смены выделения"""
+        items = self.gate_items.get(gate)
+        if not items:
+            return
+        fill_color, outline_color, outline_width = self.gate_style(gate)
+        if not self.view.detailed():
+            outline_width = 1
+        for item in items['body']:
+            self.canvas.itemconfig(item, fill=fill_color, outline=outline_color,
+                                   width=outline_width)
+
+    def update_values(self, gates):
+        """Перекрашивает только провода и значения указанных элементов"""
+        with monitor.timed('redraw', kind='values'):
+            for gate in gates:
+                for conn in self.graph.fanout.get(gate, ()):
+                    if conn in self.wire_items:
+                        wire_color = COLORS['wire_active'] if conn.value() else COLORS['wire']
+                        self.canvas.itemconfig(self.wire_items[conn], fill=wire_color)
+                items = self.gate_items.get(gate)
+                if items and items['value'] is not None:
+                    self.canvas.itemconfig(items['value'],
+                                           text="1" if gate.value else "0",
+                                           fill="#2ecc71" if gate.value else "#e74c3c")
+
+
+class JobPanel:
+    """Полоса прогресса и кнопка отмены фоновой задачи (BackgroundJob).
+
+    run() запускает задачу и опрашивает её из after: частичные результаты
+    передаются в on_result по мере готовности, а по завершении или отмене
+    вызывается on_done(job). У панели одна задача: новая отменяет прежнюю.
+    """
+
+    def __init__(self, parent, bg):
+        self.frame = tk.Frame(parent, bg=bg)
+        self.label = tk.Label(self.frame, text="", bg=bg, fg=COLORS['text'],
+                              font=('Segoe UI', 9), anchor='w')
+        self.label.pack(fill=tk.X)
+        self.bar = ttk.Progressbar(self.frame, maximum=1.0)
+        self.bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_button = ttk.Button(self.frame, text="⏹", width=3, command=self.cancel,
+                                        state='disabled')
+        self.cancel_button.pack(side=tk.LEFT, padx=(5, 0))
+        self.job = None
+        self.text = ""
+        self.on_result = None
+        self.on_done = None
+        self.poll_job = None
+
+    def run(self, job, text, on_result, on_done=None):
+        """Запускает задачу; text — подпись на время работы"""
+        self.cancel()
+        self.job = job.start()
+        self.text = text
+        self.on_result = on_result
+        self.on_done = on_done
+        self.bar['value'] = 0
+        self.cancel_button.state(['!disabled'])
+        self.poll()
+        return job
+
+    def poll(self):
+        """Забирает готовые результаты задачи, не блокируя интерфейс"""
+        job = self.job
+        for result in job.poll():
+            self.on_result(result)
+            if job is not self.job:
+                return  # on_result отменил задачу или запустил новую
+        self.bar['value'] = job.progress
+        if job.done:
+            self.poll_job = None
+            self.finish()
+        else:
+            self.label.config(text=f"⏳ {self.text}: {100 * job.progress:.0f}%")
+            self.poll_job = self.frame.after(JOB_POLL, self.poll)
+
+    def cancel(self):
+        """Отменяет текущую задачу; её on_done узнаёт об отмене по job.cancelled"""
+        if self.job is None:
+            return
+        if self.poll_job is not None:
+            self.frame.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.job.cancel()
+        self.finish()
+
+    def finish(self):
+        """Освобождает панель и сообщает о завершении задачи"""
+        job, on_done = self.job, self.on_done
+        self.job = None
+        self.on_result = self.on_done = None
+        self.cancel_button.state(['disabled'])
+        if job.cancelled:
+            self.label.config(text=f"⏹ {self.text}: отменено на {100 * job.progress:.0f}%")
+        elif job.error is not None:
+            self.label.config(text=f"⚠ {self.text}: ошибка")
+        else:
+            self.label.config(text=f"✓ {self.text}: {job.elapsed:.2f} с")
+        if on_done is not None:
+            on_done(job)
+
+    @property
+    def busy(self):
+        """Задача панели ещё идёт"""
+        return self.job is not None
+
+
+class TruthTableView:
+    """Виртуализированное окно таблицы истинности.
+
+    Строки нигде не хранятся: входные биты — двоичная запись номера строки,
+    а выходы вычисляются по запросу выровненными блоками. В Treeview всегда
+    лежит только видимая страница, поэтому окно открывается мгновенно и для
+    схем с 32 и более входами. Совпадения фильтра ищутся фоновой задачей и
+    добавляются в таблицу по мере нахождения.
+    """
+
+    def __init__(self, root, netlist):
+        self.root = root
+        self.netlist = netlist
+        self.n_in = len(netlist.inputs)
+        self.n_out = len(netlist.outputs)
+        self.total = 1 << self.n_in
+        self.top = 0
+        self.blocks = collections.OrderedDict()  # (start, lane_bits) -> слова OUT
+
+        # Фильтр по значению выхода: совпадения ищутся в фоне блоками
+        self.filter = None  # (номер выхода, значение)
+        self.scan_bits = min(self.n_in, TABLE_CHUNK_BITS)
+        self.scan_pos = 0
+        self.match_starts = []  # начала блоков, в которых есть совпадения
+        self.match_prefix = []  # число совпадений до конца блока включительно
+        self.match_count = 0
+        self.positions = collections.OrderedDict()  # start -> номера строк совпадений
+
+        self.build()
+        self.refresh()
+
+    def build(self):
+        """Создание окна"""
+        self.win = tk.Toplevel(self.root)
+        self.win.title("📊 Таблица истинности")
+        self.win.geometry("800x560")
+        self.win.configure(bg=COLORS['bg'])
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Панель навигации и фильтра
+        bar = tk.Frame(self.win, bg=COLORS['bg'])
+        bar.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        tk.Label(bar, text="Строка:", bg=COLORS['bg'], fg=COLORS['text']).pack(side=tk.LEFT)
+        self.jump_entry = ttk.Entry(bar, width=14)
+        self.jump_entry.pack(side=tk.LEFT, padx=5)
+        self.jump_entry.bind('<Return>', lambda e: self.jump())
+        ttk.Button(bar, text="Перейти", command=self.jump).pack(side=tk.LEFT)
+
+        tk.Label(bar, text="Фильтр:", bg=COLORS['bg'], fg=COLORS['text']).pack(side=tk.LEFT,
+                                                                              padx=(20, 5))
+        choices = ["все строки"] + [f"OUT{i + 1} = {v}" for i in range(self.n_out) for v in (0, 1)]
+        self.filter_box = ttk.Combobox(bar, values=choices, state='readonly', width=14)
+        self.filter_box.current(0)
+        self.filter_box.pack(side=tk.LEFT)
+        self.filter_box.bind('<<ComboboxSelected>>', lambda e: self.apply_filter())
+
+        ttk.Button(bar, text="🔍 Полная проверка",
+                   command=lambda: VerifyView(self.root, self.netlist)).pack(side=tk.RIGHT)
+        ttk.Button(bar, text="🧮 Сводка BDD", command=self.show_bdd).pack(side=tk.RIGHT, padx=5)
+
+        # Treeview на одну страницу и собственная полоса прокрутки
+        frame = tk.Frame(self.win, bg=COLORS['bg'])
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        headers = ["№"] + [f"IN{i + 1}" for i in range(self.n_in)] + \
+                  [f"OUT{i + 1}" for i in range(self.n_out)]
+        self.tree = ttk.Treeview(frame, columns=headers, show='headings', height=VIEW_PAGE)
+        for header in headers:
+            self.tree.heading(header, text=header)
+            self.tree.column(header, width=80 if header == "№" else 50, anchor='center')
+        for r in range(VIEW_PAGE):
+            self.tree.insert('', 'end', iid=str(r))
+
+        self.v_scroll = ttk.Scrollbar(frame, orient='vertical', command=self.on_scroll)
+        h_scroll = ttk.Scrollbar(frame, orient='horizontal', command=self.tree.xview)
+        self.tree.configure(xscrollcommand=h_scroll.set)
+
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.v_scroll.grid(row=0, column=1, sticky='ns')
+        h_scroll.grid(row=1, column=0, sticky='ew')
+        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll_to(self.top - (3 if e.delta > 0 else -3)))
+        self.tree.bind('<Up>', lambda e: self.scroll_to(self.top - 1))
+        self.tree.bind('<Down>', lambda e: self.scroll_to(self.top + 1))
+        self.tree.bind('<Prior>', lambda e: self.scroll_to(self.top - VIEW_PAGE))
+        self.tree.bind('<Next>', lambda e: self.scroll_to(self.top + VIEW_PAGE))
+
+        # Информация о таблице и ход поиска совпадений
+        self.info_label = tk.Label(self.win, bg=COLORS['bg'], fg=COLORS['text'])
+        self.info_label.pack(pady=(0, 5))
+        self.jobs = JobPanel(self.win, COLORS['bg'])
+        self.jobs.frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+    def view_size(self):
+        """Число строк в текущем представлении (с учётом фильтра)"""
+        return self.total if self.filter is None else self.match_count
+
+    def on_scroll(self, action, amount, unit=None):
+        """Обработчик полосы прокрутки"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.view_size()))
+        elif unit == 'pages':
+            self.scroll_to(self.top + int(amount) * VIEW_PAGE)
+        else:
+            self.scroll_to(self.top + int(amount))
+
+    def scroll_to(self, top):
+        """Показывает страницу, начинающуюся с позиции top"""
+        self.top = max(0, min(top, self.view_size() - VIEW_PAGE))
+        self.refresh()
+        return 'break'
+
+    def block_outputs(self, start, lane_bits):
+        """Слова OUT выровненного блока строк (с LRU-кэшем)"""
+        key = (start, lane_bits)
+        words = self.blocks.get(key)
+        if words is None:
+            with monitor.timed('show_table', rows=1 << lane_bits):
+                words = self.netlist.table_block(start, lane_bits)
+            self.blocks[key] = words
+            if len(self.blocks) > VIEW_CACHE:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(key)
+        return words
+
+    def row_outputs(self, row):
+        """Значения выходов строки row"""
+        lane_bits = min(self.n_in, VIEW_BLOCK_BITS)
+        start = row >> lane_bits << lane_bits
+        return [(word >> (row - start)) & 1 for word in self.block_outputs(start, lane_bits)]
+
+    def visible_rows(self):
+        """Номера строк таблицы на текущей странице"""
+        end = min(self.top + VIEW_PAGE, self.view_size())
+        if self.filter is None:
+            return list(range(self.top, end))
+        return [self.match_row(k) for k in range(self.top, end)]
+
+    def refresh(self):
+        """Перезаполняет видимую страницу"""
+        rows = self.visible_rows()
+        row_format = f"0{self.n_in}b"
+        for r in range(VIEW_PAGE):
+            if r < len(rows):
+                row = rows[r]
+                values = [row] + list(format(row, row_format)) + self.row_outputs(row)
+            else:
+                values = []
+            self.tree.item(str(r), values=values)
+
+        size = self.view_size()
+        if size:
+            self.v_scroll.set(self.top / size, min(1.0, (self.top + VIEW_PAGE) / size))
+        else:
+            self.v_scroll.set(0, 1)
+        self.update_info()
+
+    def update_info(self):
+        """Обновляет строку состояния окна"""
+        text = f"Всего строк: {self.total} | Входов: {self.n_in} | Выходов: {self.n_out}"
+        if self.filter is not None:
+            scanned = 100 * self.scan_pos / self.total
+            text += f" | Совпадений: {self.match_count} (просмотрено {scanned:.1f}%)"
+        self.info_label.config(text=text)
+
+    def jump(self):
+        """Переход к строке с заданным номером"""
+        try:
+            row = int(self.jump_entry.get())
+        except ValueError:
+            return
+        row = max(0, min(row, self.total - 1))
+        if self.filter is None:
+            self.scroll_to(row)
+        else:
+            self.scroll_to(self.match_index(row))
+
+    def apply_filter(self):
+        """Включает фильтр по значению выхода и запускает поиск совпадений"""
+        self.jobs.cancel()
+
+        choice = self.filter_box.current()
+        self.filter = None if choice <= 0 else divmod(choice - 1, 2)
+        self.scan_pos = 0
+        self.match_starts = []
+        self.match_prefix = []
+        self.match_count = 0
+        self.positions.clear()
+        self.top = 0
+        if self.filter is not None:
+            job = BackgroundJob(match_blocks, self.netlist, *self.filter, self.scan_bits,
+                                name='table_scan')
+            self.jobs.run(job, "Поиск совпадений", self.add_matches)
+        self.refresh()
+
+    def match_word(self, start):
+        """Слово совпадений фильтра для блока сканирования"""
+        out, value = self.filter
+        word = self.block_outputs(start, self.scan_bits)[out]
+        return word if value else word ^ ((1 << (1 << self.scan_bits)) - 1)
+
+    def add_matches(self, result):
+        """Добавляет найденные фоновым поиском блоки совпадений"""
+        self.scan_pos, found = result
+        shown = self.match_count
+        for start, count in found:
+            self.match_count += count
+            self.match_starts.append(start)
+            self.match_prefix.append(self.match_count)
+
+        # Страница перерисовывается, только если на ней появились новые строки
+        if shown < self.top + VIEW_PAGE and self.match_count > shown:
+            self.refresh()
+        else:
+            self.update_info()
+
+    def block_positions(self, start):
+        """Номера строк совпадений в блоке сканирования"""
+        positions = self.positions.get(start)
+        if positions is None:
+            bits = format(self.match_word(start), f"0{1 << self.scan_bits}b")[::-1]
+            positions = [start + j for j, bit in enumerate(bits) if bit == '1']
+            self.positions[start] = positions
+            if len(self.positions) > VIEW_CACHE:
+                self.positions.popitem(last=False)
+        return positions
+
+    def match_row(self, k):
+        """Номер строки k-го совпадения"""
+        i = bisect.bisect_right(self.match_prefix, k)
+        before = self.match_prefix[i - 1] if i else 0
+        return self.block_positions(self.match_starts[i])[k - before]
+
+    def match_index(self, row):
+        """Порядковый номер первого найденного совпадения не раньше строки row"""
+        i = bisect.bisect_right(self.match_starts, row) - 1
+        if i < 0:
+            return 0
+        before = self.match_prefix[i - 1] if i else 0
+        return before + bisect.bisect_left(self.block_positions(self.match_starts[i]), row)
+
+    def show_bdd(self):
+        """Сжатая сводка таблицы через BDD: минтермы, кубы и совпадающие выходы.
+
+        BDD строится фоновой задачей; окно сводки открывается сразу и
+        заполняется, когда она готова.
+        """
+        win = tk.Toplevel(self.win)
+        win.title("🧮 Сводка BDD")
+        win.geometry("560x420")
+        text = tk.Text(win, bg=COLORS['canvas'], fg=COLORS['text_dark'], font=('Consolas', 10),
+                       relief=tk.FLAT, state=tk.DISABLED)
+        text.pack(fill=tk.BOTH, expand=True)
+        jobs = JobPanel(win, COLORS['bg'])
+        jobs.frame.pack(fill=tk.X, padx=10, pady=5)
+
+        def show(lines):
+            text.config(state=tk.NORMAL)
+            text.insert('1.0', '\n'.join(lines))
+            text.config(state=tk.DISABLED)
+
+        def done(job):
+            if isinstance(job.error, BDDLimitError):
+                messagebox.showwarning("BDD", str(job.error), parent=win)
+                win.destroy()
+            elif job.error is not None:
+                show([f"Ошибка: {job.error}"])
+
+        def close():
+            jobs.cancel()
+            win.destroy()
+
+        # Отменённое построение дорабатывает в фоне, но результат уже никуда не попадёт
+        win.protocol("WM_DELETE_WINDOW", close)
+        jobs.run(BackgroundJob(bdd_summary, self.netlist, name='bdd_summary'),
+                 "Построение BDD", show, done)
+
+    def close(self):
+        """Закрытие окна с остановкой поиска"""
+        self.jobs.cancel()
+        self.win.destroy()
+
+
+class WaveformView:
+    """Панель осциллограмм рядом с холстом.
+
+    Отсчёты лежат в WaveformBuffer; панель рисует только окно, которое
+    помещается по ширине, — по одной ломаной на сигнал. Пока включено
+    слежение, окно держится у последнего отсчёта.
+    """
+
+    def __init__(self, parent, export, stream, pick):
+        self.buffer = None
+        self.names = []
+        self.nets = []  # показываемые цепи
+        self.start = 0  # первый видимый отсчёт
+        self.step = WAVE_STEP  # пикселей на отсчёт
+        self.follow = True
+
+        self.frame = tk.Frame(parent, bg=COLORS['sidebar'], width=WAVE_WIDTH)
+        bar = tk.Frame(self.frame, bg=COLORS['sidebar'])
+        bar.pack(fill=tk.X)
+        tk.Label(bar, text="〰 Осциллограммы", bg=COLORS['sidebar'], fg=COLORS['text'],
+                 font=('Segoe UI', 9, 'bold')).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="💾 VCD", command=export).pack(side=tk.RIGHT, padx=2, pady=2)
+        self.stream_button = ttk.Button(bar, text="⏺ Поток", command=stream)
+        self.stream_button.pack(side=tk.RIGHT, padx=2, pady=2)
+        ttk.Button(bar, text="🎯", width=3, command=pick).pack(side=tk.RIGHT, padx=2, pady=2)
+        self.info = tk.Label(self.frame, text="", bg=COLORS['sidebar'], fg='#9bd1ff',
+                             font=('Consolas', 8), anchor='w')
+        self.info.pack(fill=tk.X, padx=5)
+
+        self.canvas = tk.Canvas(self.frame, bg=COLORS['bg'], width=WAVE_WIDTH,
+                                highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.scroll = ttk.Scrollbar(self.frame, orient='horizontal', command=self.on_scroll)
+        self.scroll.pack(fill=tk.X)
+        self.canvas.bind('<Configure>', lambda e: self.refresh())
+        self.canvas.bind('<MouseWheel>', self.on_wheel)
+        self.canvas.bind('<Control-MouseWheel>', self.on_zoom)
+
+    def set_buffer(self, buffer, names, nets):
+        """Новый буфер (после смены топологии) и набор сигналов"""
+        self.buffer = buffer
+        self.names = names
+        self.nets = nets
+        self.start = 0
+        self.follow = True
+        self.refresh()
+
+    def visible(self):
+        """Сколько отсчётов помещается по ширине"""
+        return max(1, (self.canvas.winfo_width() - WAVE_LABEL) // self.step)
+
+    def scroll_to(self, start):
+        """Сдвигает окно; у последнего отсчёта включается слежение"""
+        buffer = self.buffer
+        if buffer is None:
+            return
+        last = max(buffer.first, buffer.total - self.visible())
+        self.start = max(buffer.first, min(int(start), last))
+        self.follow = self.start >= last
+        self.refresh()
+
+    def on_scroll(self, action, amount, unit=None):
+        """Обработчик полосы прокрутки"""
+        if self.buffer is None:
+            return
+        if action == 'moveto':
+            first = self.buffer.first
+            self.scroll_to(first + float(amount) * (self.buffer.total - first))
+        elif unit == 'pages':
+            self.scroll_to(self.start + int(amount) * self.visible())
+        else:
+            self.scroll_to(self.start + int(amount) * max(1, self.visible() // 10))
+
+    def on_wheel(self, event):
+        """Прокрутка по времени колесом"""
+        self.scroll_to(self.start - (1 if event.delta > 0 else -1) * max(1, self.visible() // 10))
+
+    def on_zoom(self, event):
+        """Масштаб по времени с Ctrl"""
+        self.step = max(1, min(64, self.step * 2 if event.delta > 0 else self.step // 2))
+        self.scroll_to(self.start)
+
+    def refresh(self):
+        """Перерисовывает видимое окно"""
+        canvas = self.canvas
+        canvas.delete('all')
+        buffer = self.buffer
+        if buffer is None or not buffer.total:
+            self.info.config(text="нет отсчётов")
+            self.scroll.set(0, 1)
+            return
+        count = self.visible()
+        if self.follow or self.start < buffer.first:
+            self.start = max(buffer.first, buffer.total - count)
+        t0, t1 = self.start, min(self.start + count, buffer.total)
+
+        step = self.step
+        for k, net in enumerate(self.nets):
+            top = 8 + k * WAVE_ROW
+            high, low = top + 2, top + WAVE_ROW - 8
+            canvas.create_text(4, (high + low) // 2, text=self.names[net], anchor='w',
+                               fill=COLORS['text'], font=('Consolas', 8))
+            points = []
+            for a, b, v in buffer.segments(net, t0, t1):
+                y = high if v else low
+                points += [WAVE_LABEL + (a - t0) * step, y, WAVE_LABEL + (b - t0) * step, y]
+            if len(points) >= 4:
+                canvas.create_line(*points, fill=COLORS['wire_active'], width=1)
+
+        span = buffer.total - buffer.first
+        self.scroll.set((t0 - buffer.first) / span, (t1 - buffer.first) / span)
+        self.info.config(text=f"отсчёты {t0}–{t1 - 1} из {buffer.first}–{buffer.total - 1}")
+
+
+class VerifyView:
+    """Окно полной проверки перебором всех наборов входов в пуле процессов.
+
+    Итоги (минтермы выходов, гистограмма векторов OUT, первый контрпример к
+    свойству "OUTk всегда = v") обновляются по мере готовности отрезков.
+    """
+
+    def __init__(self, root, netlist):
+        self.root = root
+        self.netlist = netlist
+        self.n_in = len(netlist.inputs)
+        self.n_out = len(netlist.outputs)
+        self.check = None
+        self.poll_job = None
+        self.build()
+
+    def build(self):
+        """Создание окна"""
+        self.win = tk.Toplevel(self.root)
+        self.win.title("🔍 Полная проверка")
+        self.win.geometry("520x480")
+        self.win.configure(bg=COLORS['bg'])
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+
+        bar = tk.Frame(self.win, bg=COLORS['bg'])
+        bar.pack(fill=tk.X, padx=10, pady=(10, 0))
+
+        tk.Label(bar, text="Свойство:", bg=COLORS['bg'], fg=COLORS['text']).pack(side=tk.LEFT)
+        choices = ["нет"] + [f"OUT{i + 1} ≡ {v}" for i in range(self.n_out) for v in (0, 1)]
+        self.property_box = ttk.Combobox(bar, values=choices, state='readonly', width=10)
+        self.property_box.current(0)
+        self.property_box.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(bar, text="Процессов:", bg=COLORS['bg'], fg=COLORS['text']).pack(side=tk.LEFT,
+                                                                                 padx=(10, 5))
+        self.workers_entry = ttk.Entry(bar, width=4)
+        self.workers_entry.insert(0, str(os.cpu_count() or 1))
+        self.workers_entry.pack(side=tk.LEFT)
+
+        self.start_button = ttk.Button(bar, text="▶ Начать", command=self.toggle)
+        self.start_button.pack(side=tk.RIGHT)
+
+        self.progress = ttk.Progressbar(self.win, maximum=1.0)
+        self.progress.pack(fill=tk.X, padx=10, pady=10)
+
+        self.text = tk.Text(self.win, bg=COLORS['canvas'], fg=COLORS['text_dark'],
+                            font=('Consolas', 10), relief=tk.FLAT, state=tk.DISABLED)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        self.info_label = tk.Label(self.win, bg=COLORS['bg'], fg=COLORS['text'],
+                                   text=f"Строк для проверки: {1 << self.n_in}")
+        self.info_label.pack(pady=(5, 10))
+
+        if self.n_in > MAX_INPUTS:
+            self.start_button.state(['disabled'])
+            self.info_label.config(text=f"⚠ Слишком много входов для перебора: {self.n_in}")
+
+    def toggle(self):
+        """Запуск или отмена проверки"""
+        if self.check is not None:
+            progress = self.check.progress
+            self.stop()
+            self.info_label.config(text=f"⏹ Отменено на {100 * progress:.1f}%")
+            return
+        try:
+            workers = max(1, int(self.workers_entry.get()))
+        except ValueError:
+            workers = None
+        choice = self.property_box.current()
+        expect = None
+        if choice > 0:
+            out, value = divmod(choice - 1, 2)
+            expect = {out: value}
+
+        self.check = ExhaustiveCheck(self.netlist, expect, workers=workers)
+        self.check.start()
+        self.start_button.config(text="⏹ Отмена")
+        self.poll()
+
+    def poll(self):
+        """Забирает готовые отрезки, не блокируя интерфейс"""
+        finished = self.check.poll(VERIFY_SLICE)
+        self.show(self.check.summary)
+        self.progress['value'] = self.check.progress
+        rate = self.check.summary.rows / max(self.check.elapsed, 1e-9)
+        if finished:
+            self.info_label.config(text=f"✓ Проверено {self.check.summary.rows} строк за "
+                                        f"{self.check.elapsed:.2f} с ({rate:,.0f} строк/с)"
+                                        .replace(',', ' '))
+            self.check = None
+            self.poll_job = None
+            self.start_button.config(text="▶ Начать")
         else:
-            self.color = COLORS['gate']
-
-    def compute(self):
-        if self.type == 'IN':
-            return self.value
-        elif self.type == 'OUT':
-            return self.inputs[0] if self.inputs else False
-        elif self.type == 'NOT':
-            return not self.inputs[0]
-        elif self.type == 'AND':
-            return all(self.inputs)
-        elif self.type == 'OR':
-            return any(self.inputs)
-        elif self.type == 'XOR':
-            return sum(self.inputs) % 2 == 1
-        elif self.type == 'NAND':
-            return not all(self.inputs)
-        elif self.type == 'NOR':
-            return not any(self.inputs)
-        return False
-
-    def contains_point(self, x, y):
-        """Проверяет, находится ли точка внутри гейта"""
-        return (self.x <= x <= self.x + self.width and
-                self.y <= y <= self.y + self.height)
-
-    def get_input_port(self):
-        """Возвращает координаты входного порта"""
-        return (self.x, self.y + self.height // 2)
-
-    def get_output_port(self):
-        """Возвращает координаты выходного порта"""
-        return (self.x + self.width, self.y + self.height // 2)
-
-
-class Connection:
-    def __init__(self, src, dst):
-        self.src = src
-        self.dst = dst
+            self.info_label.config(text=f"⏳ {100 * self.check.progress:.1f}% "
+                                        f"({rate:,.0f} строк/с)".replace(',', ' '))
+            self.poll_job = self.win.after(VERIFY_POLL, self.poll)
+
+    def show(self, summary):
+        """Выводит текущие итоги"""
+        lines = [f"Проверено строк: {summary.rows}", ""]
+        lines += [f"OUT{k + 1}: минтермов {count}" for k, count in enumerate(summary.minterms)]
+        if self.property_box.current() > 0:
+            lines.append("")
+            if summary.counterexample is None:
+                lines.append("Контрпример не найден")
+            else:
+                lines.append(f"Контрпример: строка {summary.counterexample}, "
+                             f"входы {summary.counterexample:0{self.n_in}b}")
+        if summary.histogram:
+            lines += ["", "Векторы OUT (по убыванию числа строк):"]
+            ranked = sorted(summary.histogram.items(), key=lambda item: -item[1])
+            lines += [f"  {vector:0{self.n_out}b}  {count}" for vector, count in ranked[:VERIFY_SHOWN]]
+            if len(ranked) > VERIFY_SHOWN:
+                lines.append(f"  … ещё {len(ranked) - VERIFY_SHOWN}")
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', '\n'.join(lines))
+        self.text.config(state=tk.DISABLED)
+
+    def stop(self):
+        """Отмена опроса и проверки"""
+        if self.poll_job is not None:
+            self.win.after_cancel(self.poll_job)
+            self.poll_job = None
+        if self.check is not None:
+            self.check.cancel()
+            self.check = None
+        self.start_button.config(text="▶ Начать")
+
+    def close(self):
+        """Закрытие окна с отменой проверки"""
+        self.stop()
+        self.win.destroy()
 
 
 class ModernApp:
@@ -92,13 +1216,36 @@ class ModernApp:
         # Устанавливаем стиль для ttk
         self.setup_styles()
 
-        # Данные схемы
-        self.gates = []
-        self.connections = []
+        # Данные схемы: граф со смежностью; gates/connections — его списки в порядке id
+        self.graph = CircuitGraph()
+        self.selection = {}  # выделенные элементы: Gate -> None в порядке выделения
+        self.clipboard = None  # (элементы, соединения) последнего копирования
+        self.paste_count = 0  # вставок из буфера с последнего копирования
         self.drag_gate = None
+        self.drag_gates = []  # элементы, которые двигает текущее перетаскивание
         self.drag_offset = (0, 0)
         self.connect_mode = False
         self.connect_start = None
+        self.netlist = None  # кэш netlist, сбрасывается при изменении топологии
+        self.sequential = None  # скомпилированный потактовый симулятор для netlist
+        self.optimized = None  # оптимизированная копия netlist для симуляции
+        self.optimize_var = tk.BooleanVar(value=False)
+        self.cycle = 0
+        self.run_job = None  # фоновый прогон тактов (BackgroundJob)
+        self.run_sim = None
+        self.heat_job = None  # фоновая стимуляция для тепловой карты
+        self.fault_job = None  # фоновое моделирование неисправностей
+        self.loaded = None  # (gates, connections) из фоновой загрузки
+        self.wave = None  # WaveformBuffer текущей топологии, пока открыта панель
+        self.wave_view = None
+        self.spatial = SpatialIndex()
+        self.view = ViewTransform()  # мировые координаты схемы -> координаты холста
+        self.pan_start = None  # последняя точка перетаскивания вида средней кнопкой
+        self.blocks = {}  # библиотека подсхем: имя -> BlockDef
+        self.band_start = None  # начало рамки выделения
+        self.band_item = None
+        # Журнал правок для отмены и повтора; бюджет можно задать через окружение
+        self.history = History(int(os.environ.get('LCS_HISTORY_BUDGET', HISTORY_BUDGET)))
 
         # Создаем интерфейс
         self.create_interface()
@@ -178,7 +1325,10 @@ class ModernApp:
             ('¬ НЕ (NOT)', 'NOT'),
             ('⊕ Искл. ИЛИ (XOR)', 'XOR'),
             ('⊼ И-НЕ (NAND)', 'NAND'),
-            ('⊽ ИЛИ-НЕ (NOR)', 'NOR')
+            ('⊽ ИЛИ-НЕ (NOR)', 'NOR'),
+            ('⧉ D-триггер (DFF)', 'DFF'),
+            ('▤ Регистр D, EN (REG)', 'REG'),
+            ('⏱ Тактовый генератор (CLK)', 'CLK')
         ]
 
         for text, typ in elements:
@@ -200,6 +1350,8 @@ class ModernApp:
         controls = [
             ('▶ Запустить симуляцию', self.calc),
             ('📊 Таблица истинности', self.show_table),
+            ('🌡 Тепловая карта', self.toggle_heatmap),
+            ('🎯 Неисправности', self.toggle_faults),
             ('🔗 Соединить элементы', self.toggle_conn),
             ('🗑 Очистить схему', self.clear),
             ('💾 Сохранить схему', self.save_circuit),
@@ -211,10 +1363,33 @@ class ModernApp:
                              command=command)
             btn.pack(fill=tk.X, pady=2)
 
-        # Статус бар
+        tk.Checkbutton(control_frame, text="⚙ Оптимизировать netlist", variable=self.optimize_var,
+                       command=self.toggle_optimize, bg=COLORS['sidebar'], fg=COLORS['text'],
+                       selectcolor=COLORS['bg'], activebackground=COLORS['sidebar'],
+                       activeforeground=COLORS['text']).pack(anchor='w', pady=(6, 0))
+
+        # Подсхемы: определение из выделения и вставка экземпляров
+        blocks_frame = tk.Frame(sidebar, bg=COLORS['sidebar'])
+        blocks_frame.pack(fill=tk.X, padx=10, pady=(12, 5))
+        tk.Label(blocks_frame, text="БЛОКИ",
+                 bg=COLORS['sidebar'], fg=COLORS['text'],
+                 font=('Segoe UI', 10, 'bold')).pack(anchor='w', pady=(0, 8))
+        ttk.Button(blocks_frame, text="🧩 Блок из выделения", style='Modern.TButton',
+                   command=self.make_block).pack(fill=tk.X, pady=2)
+        self.block_choice = tk.StringVar()
+        self.block_combo = ttk.Combobox(blocks_frame, textvariable=self.block_choice,
+                                        state='readonly', values=[])
+        self.block_combo.pack(fill=tk.X, pady=2)
+        ttk.Button(blocks_frame, text="➕ Вставить", style='Modern.TButton',
+                   command=self.insert_block).pack(fill=tk.X, pady=2)
+
+        # Статус бар и ход фоновой задачи (прогон тактов, тепловая карта)
         status_frame = tk.Frame(sidebar, bg=COLORS['sidebar'])
         status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
 
+        self.jobs = JobPanel(status_frame, COLORS['sidebar'])
+        self.jobs.frame.pack(fill=tk.X, pady=(0, 6))
+
         self.status = tk.Label(status_frame, text="✓ Готов к работе",
                                bg=COLORS['sidebar'], fg='#6bbf59',
                                font=('Segoe UI', 9))
@@ -234,42 +1409,77 @@ class ModernApp:
                  bg=COLORS['sidebar'], fg=COLORS['text'],
                  font=('Segoe UI', 10)).pack(side=tk.LEFT, padx=10)
 
+        # Отмена и повтор правок
+        ttk.Button(toolbar, text="↶", width=3, command=self.undo).pack(side=tk.LEFT, pady=4)
+        ttk.Button(toolbar, text="↷", width=3, command=self.redo).pack(side=tk.LEFT, padx=(2, 10),
+                                                                       pady=4)
+
+        # Потактовая симуляция: один такт или прогон с обновлением раз в N тактов
+        ttk.Button(toolbar, text="⏭ Такт", command=self.step_cycle).pack(side=tk.LEFT, pady=4)
+        tk.Label(toolbar, text="Тактов:", bg=COLORS['sidebar'], fg=COLORS['text'],
+                 font=('Segoe UI', 9)).pack(side=tk.LEFT, padx=(10, 2))
+        self.cycles_entry = ttk.Entry(toolbar, width=9)
+        self.cycles_entry.insert(0, "1000000")
+        self.cycles_entry.pack(side=tk.LEFT)
+        tk.Label(toolbar, text="обновлять каждые:", bg=COLORS['sidebar'], fg=COLORS['text'],
+                 font=('Segoe UI', 9)).pack(side=tk.LEFT, padx=(10, 2))
+        self.sync_entry = ttk.Entry(toolbar, width=7)
+        self.sync_entry.insert(0, "0")
+        self.sync_entry.pack(side=tk.LEFT)
+        self.run_button = ttk.Button(toolbar, text="⏩ Пуск", command=self.toggle_run)
+        self.run_button.pack(side=tk.LEFT, padx=5, pady=4)
+
         # Информация о режиме
         self.mode_label = tk.Label(toolbar, text="Режим: Выбор",
                                    bg=COLORS['sidebar'], fg='#ffcc00',
                                    font=('Segoe UI', 9))
         self.mode_label.pack(side=tk.RIGHT, padx=10)
 
+        # Панель метрик производительности (HUD), включается кнопкой или F12
+        self.hud_visible = False
+        self.hud_job = None
+        ttk.Button(toolbar, text="📈 HUD", command=self.toggle_hud).pack(side=tk.RIGHT, pady=4)
+        ttk.Button(toolbar, text="〰 Осциллограммы",
+                   command=self.toggle_waveforms).pack(side=tk.RIGHT, padx=5, pady=4)
+        self.hud_label = tk.Label(toolbar, text="", bg=COLORS['sidebar'], fg='#9bd1ff',
+                                  font=('Consolas', 9))
+        self.hud_label.pack(side=tk.RIGHT, padx=10)
+
         # Холст для рисования
         canvas_frame = tk.Frame(workspace, bg=COLORS['bg'])
         canvas_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
 
         # Полосы прокрутки
-        v_scroll = ttk.Scrollbar(canvas_frame, orient='vertical')
-        h_scroll = ttk.Scrollbar(canvas_frame, orient='horizontal')
+        # Холст сам не прокручивается: полосы двигают вид (ViewTransform)
+        self.v_scroll = ttk.Scrollbar(canvas_frame, orient='vertical',
+                                      command=lambda *args: self.scroll_view(1, *args))
+        self.h_scroll = ttk.Scrollbar(canvas_frame, orient='horizontal',
+                                      command=lambda *args: self.scroll_view(0, *args))
 
-        self.canvas = tk.Canvas(canvas_frame, bg=COLORS['canvas'],
-                                yscrollcommand=v_scroll.set,
-                                xscrollcommand=h_scroll.set,
-                                scrollregion=(0, 0, 2000, 2000))
-
-        v_scroll.config(command=self.canvas.yview)
-        h_scroll.config(command=self.canvas.xview)
+        self.canvas = tk.Canvas(canvas_frame, bg=COLORS['canvas'])
 
         self.canvas.grid(row=0, column=0, sticky='nsew')
-        v_scroll.grid(row=0, column=1, sticky='ns')
-        h_scroll.grid(row=1, column=0, sticky='ew')
+        self.v_scroll.grid(row=0, column=1, sticky='ns')
+        self.h_scroll.grid(row=1, column=0, sticky='ew')
 
         canvas_frame.grid_rowconfigure(0, weight=1)
         canvas_frame.grid_columnconfigure(0, weight=1)
+        self.canvas_frame = canvas_frame
+
+        self.renderer = CanvasRenderer(self.canvas, self.graph, self.spatial, self.view)
+        self.renderer.draw_grid()
 
         # Привязка событий
         self.canvas.bind("<Button-1>", self.click)
+        self.canvas.bind("<Shift-Button-1>", lambda e: self.click(e, extend=True))
         self.canvas.bind("<B1-Motion>", self.drag)
         self.canvas.bind("<ButtonRelease-1>", self.release)
         self.canvas.bind("<Double-Button-1>", self.dblclick)
         self.canvas.bind("<MouseWheel>", self.zoom)
         self.canvas.bind("<Control-MouseWheel>", self.horizontal_scroll)
+        self.canvas.bind("<ButtonPress-2>", self.pan_press)
+        self.canvas.bind("<B2-Motion>", self.pan_drag)
+        self.canvas.bind("<Configure>", self.on_resize)
 
     def create_demo_circuit(self):
         """Создание демонстрационной схемы"""
@@ -285,13 +1495,15 @@ class ModernApp:
             self.add_gate(typ, x, y)
 
         # Создаем соединения
-        if len(self.gates) >= 4:
-            self.connections = [
-                Connection(self.gates[0], self.gates[2]),
-                Connection(self.gates[1], self.gates[2]),
-                Connection(self.gates[2], self.gates[3])
-            ]
-            self.redraw()
+        gates = self.gates
+        if len(gates) >= 4:
+            for src, dst in ((0, 2), (1, 2), (2, 3)):
+                conn = Connection(gates[src], gates[dst])
+                self.graph.add_connection(conn)
+                self.renderer.add_wire(conn)
+            self.invalidate_netlist()
+        # Демонстрационная схема — исходное состояние, а не правка
+        self.history.clear()
 
     def bind_hotkeys(self):
         """Привязка горячих клавиш"""
@@ -300,171 +1512,137 @@ class ModernApp:
         self.root.bind('<Escape>', lambda e: self.cancel_connection())
         self.root.bind('<Control-s>', lambda e: self.save_circuit())
         self.root.bind('<Control-l>', lambda e: self.load_circuit())
+        self.root.bind('<Control-z>', lambda e: self.undo())
+        self.root.bind('<Control-y>', lambda e: self.redo())
+        self.root.bind('<Control-Z>', lambda e: self.redo())
+        # В полях ввода Ctrl+C/Ctrl+V работают с текстом, а не со схемой
+        self.root.bind('<Control-c>', lambda e: None if isinstance(e.widget, tk.Entry)
+                       else self.copy_selected())
+        self.root.bind('<Control-v>', lambda e: None if isinstance(e.widget, tk.Entry)
+                       else self.paste())
+        self.root.bind('<Home>', lambda e: self.fit_view())
         self.root.bind('<F5>', lambda e: self.calc())
+        self.root.bind('<F12>', lambda e: self.toggle_hud())
 
-    def add_gate(self, typ, x=None, y=None):
-        """Добавление нового элемента"""
+    def toggle_hud(self):
+        """Показывает или скрывает панель метрик производительности"""
+        self.hud_visible = not self.hud_visible
+        if self.hud_visible:
+            self.update_hud()
+        else:
+            if self.hud_job is not None:
+                self.root.after_cancel(self.hud_job)
+                self.hud_job = None
+            self.hud_label.config(text="")
+
+    def update_hud(self):
+        """Обновляет текст HUD по последним замерам monitor"""
+        frame = monitor.last.get('redraw')
+        compute = monitor.last.get('compute')
+        over = sum(stat['over_budget'] for stat in monitor.stats.values())
+        parts = [
+            f"кадр {frame[0] * 1000:.1f} мс ({frame[1]['kind']})" if frame else "кадр —",
+            f"объектов {len(self.canvas.find_all())}",
+            f"прогон {compute[0] * 1000:.2f} мс / {compute[1]['evaluations']} выч."
+            if compute else "прогон —",
+            f"таблица {monitor.rate('show_table', 'rows'):,.0f} стр/с".replace(',', ' '),
+            f">{FRAME_BUDGET * 1000:.0f} мс: {over}",
+        ]
+        self.hud_label.config(text=" | ".join(parts))
+        self.hud_job = self.root.after(HUD_INTERVAL, self.update_hud)
+
+    def add_gate(self, typ, x=None, y=None, block=None):
+        """Добавление нового элемента (block — определение для экземпляра BLK)"""
         if x is None or y is None:
-            x, y = 400, 300
+            # По центру видимой области
+            width, height = self.renderer.viewport()
+            x, y = self.view.to_world(width / 2, height / 2)
 
         gate = Gate(typ, x, y)
-        self.gates.append(gate)
-        self.redraw()
-        self.status.config(text=f"✓ Добавлен элемент {typ}", fg='#6bbf59')
-
-    def redraw(self):
-        """Перерисовка всего холста"""
-        self.canvas.delete("all")
-
-        # Сетка для фона
-        self.draw_grid()
-
-        # Рисуем все соединения
-        for conn in self.connections:
-            src_x, src_y = conn.src.get_output_port()
-            dst_x, dst_y = conn.dst.get_input_port()
-
-            # Цвет провода в зависимости от значения
-            wire_color = COLORS['wire_active'] if conn.src.value else COLORS['wire']
-            self.canvas.create_line(src_x, src_y, dst_x, dst_y,
-                                    fill=wire_color, width=3,
-                                    arrow=tk.LAST, arrowshape=(8, 10, 5))
-
-        # Рисуем все элементы
-        for gate in self.gates:
-            self.draw_gate(gate)
-
-    def draw_grid(self):
-        """Рисует сетку на холсте"""
-        grid_size = 20
-        width = 2000
-        height = 2000
-
-        # Вертикальные линии
-        for x in range(0, width, grid_size):
-            self.canvas.create_line(x, 0, x, height,
-                                    fill='#f0f0f0', tags='grid')
-
-        # Горизонтальные линии
-        for y in range(0, height, grid_size):
-            self.canvas.create_line(0, y, width, y,
-                                    fill='#f0f0f0', tags='grid')
-
-    def draw_gate(self, gate):
-        """Рисует один элемент"""
-        x, y = gate.x, gate.y
-        width, height = gate.width, gate.height
-        radius = gate.radius
-
-        # Выбираем цвет фона
-        if gate.selected:
-            fill_color = COLORS['gate_active']
-            outline_color = '#ffcc00'
-            outline_width = 3
-        else:
-            fill_color = gate.color
-            outline_color = '#333'
-            outline_width = 2
-
-        # Рисуем скругленный прямоугольник
-        self.canvas.create_rectangle(
-            x + radius, y, x + width - radius, y + height,
-            fill=fill_color, outline=outline_color, width=outline_width
-        )
-        self.canvas.create_rectangle(
-            x, y + radius, x + width, y + height - radius,
-            fill=fill_color, outline=outline_color, width=outline_width
-        )
-        self.canvas.create_oval(
-            x, y, x + 2 * radius, y + 2 * radius,
-            fill=fill_color, outline=outline_color, width=outline_width
-        )
-        self.canvas.create_oval(
-            x + width - 2 * radius, y, x + width, y + 2 * radius,
-            fill=fill_color, outline=outline_color, width=outline_width
-        )
-        self.canvas.create_oval(
-            x, y + height - 2 * radius, x + 2 * radius, y + height,
-            fill=fill_color, outline=outline_color, width=outline_width
-        )
-        self.canvas.create_oval(
-            x + width - 2 * radius, y + height - 2 * radius,
-            x + width, y + height,
-            fill=fill_color, outline=outline_color, width=outline_width
-        )
+        if block is not None:
+            gate.set_block(block)
+        self.apply(AddItems([(self.graph.new_id(), gate)]))
+        self.status.config(text=f"✓ Добавлен элемент {block.name if block else typ}", fg='#6bbf59')
+
+    def make_block(self):
+        """Определение подсхемы из выделенных элементов и соединений между ними"""
+        selected = list(self.selection)
+        if not selected:
+            messagebox.showinfo("Информация", "Выделите элементы будущего блока рамкой")
+            return
+        name = simpledialog.askstring("Новый блок", "Имя блока:", parent=self.root)
+        if not name:
+            return
+        if name in self.blocks:
+            messagebox.showerror("Ошибка", f"Блок {name} уже есть в библиотеке")
+            return
+        try:
+            block = BlockDef.from_selection(name, selected,
+                                            [conn for _, conn in self.graph.incident(selected)])
+        except (CombinationalLoopError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось создать блок:\n{e}")
+            return
+        self.blocks[name] = block
+        self.refresh_blocks()
+        self.block_choice.set(name)
+        self.status.config(text=f"🧩 Блок {name}: {block.n_in} вх., {block.n_out} вых.",
+                           fg='#6bbf59')
+
+    def insert_block(self):
+        """Добавление экземпляра выбранного блока"""
+        block = self.blocks.get(self.block_choice.get())
+        if block is None:
+            self.status.config(text="⚠ Сначала создайте блок из выделения", fg='#e74c3c')
+            return
+        self.add_gate('BLK', block=block)
 
-        # Текст элемента
-        self.canvas.create_text(
-            x + width // 2, y + height // 2,
-            text=gate.type, font=('Segoe UI', 10, 'bold'),
-            fill=COLORS['text']
-        )
+    def refresh_blocks(self):
+        """Обновляет список блоков в боковой панели"""
+        self.block_combo.config(values=sorted(self.blocks))
+        if self.block_choice.get() not in self.blocks:
+            self.block_choice.set(next(iter(sorted(self.blocks)), ''))
 
-        # Отображаем значение для входов и выходов
-        if gate.type in ('IN', 'OUT'):
-            value_text = "1" if gate.value else "0"
-            value_color = "#2ecc71" if gate.value else "#e74c3c"
-            self.canvas.create_text(
-                x + width - 15, y + 15,
-                text=value_text, font=('Segoe UI', 12, 'bold'),
-                fill=value_color
-            )
+    @property
+    def gates(self):
+        """Элементы схемы в порядке id"""
+        return self.graph.gate_list()
 
-        # Рисуем порты подключения
-        if gate.type != 'IN':  # Входной порт
-            ix, iy = gate.get_input_port()
-            self.canvas.create_oval(
-                ix - 6, iy - 6, ix + 6, iy + 6,
-                fill='#e74c3c', outline='#c0392b', width=2
-            )
+    @property
+    def connections(self):
+        """Соединения схемы в порядке id"""
+        return self.graph.connection_list()
 
-        if gate.type != 'OUT':  # Выходной порт
-            ox, oy = gate.get_output_port()
-            self.canvas.create_oval(
-                ox - 6, oy - 6, ox + 6, oy + 6,
-                fill='#2ecc71', outline='#27ae60', width=2
-            )
+    def redraw(self):
+        """Перерисовка всего холста"""
+        self.renderer.rebuild()
+        self.update_scrollbars()
 
     def find_gate(self, x, y):
         """Поиск элемента по координатам"""
-        for gate in self.gates:
-            if gate.contains_point(x, y):
-                return gate
-        return None
+        return self.spatial.find_gate(x, y)
 
     def find_gate_at_port(self, x, y):
         """Поиск элемента и порта по координатам"""
-        for gate in self.gates:
-            if gate.type != 'IN':
-                ix, iy = gate.get_input_port()
-                if abs(x - ix) < 10 and abs(y - iy) < 10:
-                    return gate, 'input'
+        return self.spatial.find_port(x, y)
 
-            if gate.type != 'OUT':
-                ox, oy = gate.get_output_port()
-                if abs(x - ox) < 10 and abs(y - oy) < 10:
-                    return gate, 'output'
-
-        return None, None
-
-    def click(self, event):
-        """Обработка клика мыши"""
-        x, y = event.x, event.y
+    def click(self, event, extend=False):
+        """Обработка клика мыши; extend (Shift) добавляет к выделению или убирает из него"""
+        x, y = self.view.to_world(event.x, event.y)
 
         if self.connect_mode:
-            gate, port_type = self.find_gate_at_port(x, y)
+            gate, port_type, pin = self.find_gate_at_port(x, y)
             if gate:
                 if self.connect_start is None:
                     if port_type == 'output':
-                        self.connect_start = (gate, port_type)
+                        self.connect_start = (gate, pin)
                         self.status.config(text="Выберите входной порт...", fg='#ffcc00')
                 else:
-                    start_gate, start_type = self.connect_start
+                    start_gate, start_pin = self.connect_start
                     if port_type == 'input' and gate != start_gate:
-                        self.connections.append(Connection(start_gate, gate))
+                        conn = Connection(start_gate, gate, start_pin, pin)
                         self.connect_start = None
                         self.connect_mode = False
-                        self.redraw()
+                        self.apply(AddItems(connections=[(self.graph.new_id(), conn)]))
                         self.mode_label.config(text="Режим: Выбор")
                         self.status.config(text="✓ Соединение создано", fg='#6bbf59')
                     else:
@@ -472,47 +1650,99 @@ class ModernApp:
             return
 
         # Проверяем клик на порт для начала соединения
-        gate, port_type = self.find_gate_at_port(x, y)
+        gate, port_type, pin = self.find_gate_at_port(x, y)
         if gate and port_type == 'output':
-            self.connect_start = (gate, port_type)
+            self.connect_start = (gate, pin)
             self.connect_mode = True
             self.mode_label.config(text="Режим: Соединение")
             self.status.config(text="Выберите входной порт...", fg='#ffcc00')
             return
 
-        # Снимаем выделение со всех элементов
-        for g in self.gates:
-            g.selected = False
-
         # Ищем элемент под курсором
         clicked_gate = self.find_gate(x, y)
-        if clicked_gate:
-            clicked_gate.selected = True
+        if clicked_gate and extend:
+            if clicked_gate in self.selection:
+                self.deselect([clicked_gate])
+            else:
+                self.select([clicked_gate])
+            self.status.config(text=f"Выделено элементов: {len(self.selection)}", fg='#3498db')
+        elif clicked_gate:
+            # Клик по уже выделенному элементу двигает всё выделение
+            if clicked_gate not in self.selection:
+                self.clear_selection()
+                self.select([clicked_gate])
             self.drag_gate = clicked_gate
+            self.drag_gates = list(self.selection)
             self.drag_offset = (x - clicked_gate.x, y - clicked_gate.y)
-            self.redraw()
-            self.status.config(text=f"Выбран: {clicked_gate.type}", fg='#3498db')
+            self.status.config(text=f"Выбран: {clicked_gate.type}" if len(self.selection) == 1
+                               else f"Выделено элементов: {len(self.selection)}", fg='#3498db')
         else:
-            self.redraw()
+            # Клик по пустому месту начинает рамку выделения; с Shift — добавляет к выделению
+            if not extend:
+                self.clear_selection()
+            self.band_start = (event.x, event.y)
+            self.band_item = self.canvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                                          outline='#3498db', dash=(4, 2), width=1)
+
+    def clear_selection(self):
+        """Снимает выделение, перекрашивая только ранее выделенные элементы"""
+        self.deselect(list(self.selection))
+
+    def select(self, gates):
+        """Добавляет элементы к выделению"""
+        for gate in gates:
+            if gate not in self.selection:
+                self.selection[gate] = None
+                gate.selected = True
+                self.renderer.restyle_gate(gate)
+
+    def deselect(self, gates):
+        """Убирает элементы из выделения"""
+        for gate in gates:
+            if self.selection.pop(gate, 0) is None:
+                gate.selected = False
+                self.renderer.restyle_gate(gate)
 
     def drag(self, event):
         """Обработка перетаскивания мыши"""
-        if self.drag_gate:
-            self.drag_gate.x = event.x - self.drag_offset[0]
-            self.drag_gate.y = event.y - self.drag_offset[1]
-            self.redraw()
+        gate = self.drag_gate
+        if gate:
+            x, y = self.view.to_world(event.x, event.y)
+            x -= self.drag_offset[0]
+            y -= self.drag_offset[1]
+            dx, dy = x - gate.x, y - gate.y
+            if dx or dy:
+                self.move_gates(self.drag_gates, dx, dy)
+                # Сдвиги одного перетаскивания складываются в одну запись журнала
+                self.history.push(MoveGates(self.drag_gates, dx, dy))
+        elif self.band_start:
+            self.canvas.coords(self.band_item, *self.band_start, event.x, event.y)
 
     def release(self, event):
         """Обработка отпускания кнопки мыши"""
+        if self.drag_gate:
+            self.history.close()
+            self.update_scrollbars()
         self.drag_gate = None
+        self.drag_gates = []
+        if self.band_start:
+            selected = self.spatial.query_rect(*self.view.to_world(*self.band_start),
+                                               *self.view.to_world(event.x, event.y))
+            self.canvas.delete(self.band_item)
+            self.band_start = None
+            self.band_item = None
+            self.select(selected)
+            if self.selection:
+                self.status.config(text=f"Выделено элементов: {len(self.selection)}",
+                                   fg='#3498db')
 
     def dblclick(self, event):
         """Обработка двойного клика"""
-        gate = self.find_gate(event.x, event.y)
+        gate = self.find_gate(*self.view.to_world(event.x, event.y))
         if gate:
             if gate.type == 'IN':
                 gate.value = not gate.value
-                self.redraw()
+                self.resimulate_input(gate)
                 self.status.config(text=f"Вход изменен: {'1' if gate.value else '0'}",
                                    fg='#9b59b6')
             elif gate.type == 'OUT':
@@ -522,115 +1752,533 @@ class ModernApp:
                 self.status.config(text=f"Элемент {gate.type}", fg='#3498db')
 
     def zoom(self, event):
-        """Обработка зума колесиком мыши"""
-        scale = 1.1 if event.delta > 0 else 0.9
-        self.canvas.scale("all", event.x, event.y, scale, scale)
+        """Обработка зума колесиком мыши: точка под курсором остаётся на месте"""
+        factor = ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP
+        if self.view.zoom_at(event.x, event.y, factor):
+            self.renderer.refresh()
+            self.update_scrollbars()
+
+    def fit_view(self):
+        """Масштаб и сдвиг, при которых вся схема помещается в окно"""
+        bounds = self.spatial.bounds()
+        if bounds is None:
+            return
+        x0, y0, x1, y1 = bounds
+        width, height = self.renderer.viewport()
+        scale = min(width / (x1 - x0 + 2 * GRID_SIZE), height / (y1 - y0 + 2 * GRID_SIZE))
+        self.view.scale = min(MAX_SCALE, max(MIN_SCALE, scale))
+        self.view.x0 = (x0 + x1) / 2 - width / 2 / self.view.scale
+        self.view.y0 = (y0 + y1) / 2 - height / 2 / self.view.scale
+        self.renderer.refresh()
+        self.update_scrollbars()
 
     def horizontal_scroll(self, event):
         """Горизонтальная прокрутка с Ctrl"""
-        self.canvas.xview_scroll(-1 if event.delta > 0 else 1, "units")
+        self.pan_view(GRID_SIZE * 2 if event.delta > 0 else -GRID_SIZE * 2, 0)
+
+    def pan_press(self, event):
+        """Начало перетаскивания вида средней кнопкой"""
+        self.pan_start = (event.x, event.y)
+
+    def pan_drag(self, event):
+        """Перетаскивание вида средней кнопкой"""
+        if self.pan_start:
+            dx, dy = event.x - self.pan_start[0], event.y - self.pan_start[1]
+            self.pan_start = (event.x, event.y)
+            self.pan_view(dx, dy)
+
+    def pan_view(self, dx, dy):
+        """Сдвиг вида на (dx, dy) пикселей"""
+        if dx or dy:
+            self.renderer.pan(dx, dy)
+            self.update_scrollbars()
+
+    def on_resize(self, event):
+        """Изменение размера холста: перерисовывается видимая область"""
+        self.renderer.refresh()
+        self.update_scrollbars()
+
+    def scroll_extent(self):
+        """Прокручиваемая область: схема, CANVAS_AREA и текущее окно"""
+        boxes = [CANVAS_AREA, self.renderer.view_rect()]
+        bounds = self.spatial.bounds()
+        if bounds is not None:
+            boxes.append(bounds)
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    def update_scrollbars(self):
+        """Положение и длина ползунков по видимой доле прокручиваемой области"""
+        extent = self.scroll_extent()
+        rect = self.renderer.view_rect()
+        for axis, bar in ((0, self.h_scroll), (1, self.v_scroll)):
+            low, size = extent[axis], extent[axis + 2] - extent[axis]
+            bar.set((rect[axis] - low) / size, (rect[axis + 2] - low) / size)
+
+    def scroll_view(self, axis, action, amount, unit=None):
+        """Команда полосы прокрутки: axis 0 — по горизонтали, 1 — по вертикали"""
+        extent = self.scroll_extent()
+        rect = self.renderer.view_rect()
+        if action == 'moveto':
+            shift = extent[axis] + float(amount) * (extent[axis + 2] - extent[axis]) - rect[axis]
+        else:
+            page = rect[axis + 2] - rect[axis]
+            shift = int(amount) * page * (0.9 if unit == 'pages' else 0.1)
+        delta = -shift * self.view.scale
+        self.pan_view(delta if axis == 0 else 0, delta if axis == 1 else 0)
+
+    def invalidate_netlist(self):
+        """Сброс кэша netlist после изменения топологии"""
+        if self.heat_job is not None:
+            self.jobs.cancel()
+        if self.renderer.heat:
+            self.clear_heatmap()
+        if self.fault_job is not None:
+            self.jobs.cancel()
+        if self.renderer.faults:
+            self.clear_faults()
+        if self.wave is not None:
+            # Отсчёты старой топологии к новым цепям не относятся
+            self.stop_wave_stream()
+            self.wave = None
+            self.wave_view.set_buffer(None, [], [])
+        self.netlist = None
+        self.sequential = None
+        self.optimized = None
+        if self.run_job is not None:
+            self.stop_run()
+
+    def get_netlist(self, report=True):
+        """Возвращает кэшированный netlist или None, если в схеме есть петля"""
+        if self.netlist is None:
+            try:
+                self.netlist = Netlist.from_circuit(self.gates, self.connections)
+            except CombinationalLoopError as e:
+                if report:
+                    self.report_loop(e)
+                return None
+        return self.netlist
+
+    def report_loop(self, error):
+        """Выделяет элементы комбинационной петли и сообщает о ней"""
+        loop = [self.gates[i] for i in error.loop]
+        self.clear_selection()
+        self.select(loop)
+        self.status.config(text="⚠ Комбинационная петля", fg='#e74c3c')
+        messagebox.showerror("Ошибка",
+                             f"{error}:\n" + " → ".join(g.type for g in loop + loop[:1]))
+
+    def resimulate_input(self, gate):
+        """Пересчёт только конуса fanout переключённого входа"""
+        netlist = self.get_netlist(report=False)
+        if netlist is None:
+            self.renderer.update_values([gate])
+        elif netlist.values is None:
+            # После изменения топологии нужен один полный прогон
+            netlist.simulate()
+            self.renderer.update_values(self.gates)
+        else:
+            changed = netlist.propagate({netlist.index[gate]: int(gate.value)})
+            self.renderer.update_values({netlist.gate_of(i): None for i in changed})
+        if netlist is not None:
+            self.record_wave(netlist.values)
 
     def calc(self):
         """Запуск симуляции схемы"""
-        # Очищаем входы всех элементов (кроме IN)
-        for gate in self.gates:
-            if gate.type != 'IN':
-                gate.inputs = []
+        netlist = self.get_netlist()
+        if netlist is None:
+            return
 
-        # Передаем значения по соединениям
-        for conn in self.connections:
-            value = conn.src.compute()
-            conn.dst.inputs.append(value)
+        optimized = self.get_optimized() if self.optimize_var.get() else None
+        with monitor.timed('calc', gates=len(self.gates)):
+            if optimized is not None:
+                values = optimized.simulate()
+                # Значения мёртвых элементов не вычислялись: следующее
+                # переключение входа сделает полный прогон исходного netlist
+                netlist.values = None
+            else:
+                values = netlist.simulate()
+            self.renderer.update_values(self.gates)
+        self.record_wave(values)
+        self.status.config(text="✅ Симуляция завершена", fg='#2ecc71')
 
-        # Вычисляем значения выходов
-        for gate in self.gates:
-            if gate.type == 'OUT':
-                gate.value = gate.compute()
+    def get_optimized(self):
+        """Оптимизированный netlist, построенный один раз на топологию"""
+        if self.optimized is None:
+            netlist = self.get_netlist()
+            if netlist is None:
+                return None
+            self.optimized = optimize(netlist)
+        return self.optimized
+
+    def sim_netlist(self):
+        """Netlist для симуляции: оптимизированный, если включена оптимизация"""
+        if self.optimize_var.get():
+            optimized = self.get_optimized()
+            return optimized and optimized.netlist
+        return self.get_netlist()
+
+    def toggle_optimize(self):
+        """Включение оптимизации с отчётом о числе элементов"""
+        if not self.optimize_var.get():
+            self.status.config(text="⚙ Оптимизация выключена", fg=COLORS['text'])
+            return
+        optimized = self.get_optimized()
+        if optimized is None:
+            self.optimize_var.set(False)
+            return
+        before, after = len(optimized.source.types), len(optimized.netlist.types)
+        self.status.config(text=f"⚙ Элементов: {before} → {after}", fg='#2ecc71')
+        messagebox.showinfo("Оптимизация netlist", optimized.report())
+
+    def get_sequential(self):
+        """Потактовый симулятор, скомпилированный один раз на топологию"""
+        netlist = self.get_netlist()
+        if netlist is None:
+            return None
+        if self.sequential is None:
+            self.sequential = SequentialSimulator(netlist)
+        return self.sequential
+
+    def sync_state(self, inputs, state, record=True):
+        """Переносит состояние потактовой симуляции на холст (и в осциллограммы)"""
+        netlist = self.sequential.netlist
+        values = self.sequential.values(inputs, state)
+        changed = [gate for gate, value in zip(netlist.gates, values) if gate.value != bool(value)]
+        for gate in changed:
+            gate.value = not gate.value
+        if netlist.pins:
+            netlist.store_values(netlist.pins, values)
+            changed += [netlist.gates[i] for i in netlist.blocks]
+        netlist.values = values
+        self.renderer.update_values(changed)
+        if record:
+            self.record_wave(values)
+
+    def step_cycle(self):
+        """Один такт с обновлением отображения"""
+        sim = self.get_sequential()
+        if sim is None or self.run_job is not None:
+            return
+        gates = sim.netlist.gates
+        inputs = [gates[i].value for i in sim.netlist.inputs]
+        state = sim.run(1, inputs, [gates[i].value for i in sim.netlist.state_nodes])
+        self.sync_state(inputs, state)
+        self.cycle += 1
+        self.status.config(text=f"⏭ Такт {self.cycle}", fg='#2ecc71')
+
+    def toggle_run(self):
+        """Запуск или остановка фонового прогона на заданное число тактов"""
+        if self.run_job is not None:
+            self.stop_run()
+            return
+        try:
+            cycles = int(self.cycles_entry.get())
+            sync = int(self.sync_entry.get() or 0)
+        except ValueError:
+            self.status.config(text="⚠ Число тактов должно быть целым", fg='#e74c3c')
+            return
+        sim = self.get_sequential()
+        if sim is None or cycles <= 0:
+            return
 
-        self.redraw()
-        self.status.config(text="✅ Симуляция завершена", fg='#2ecc71')
+        gates = sim.netlist.gates
+        self.run_sim = sim
+        self.run_inputs = [gates[i].value for i in sim.netlist.inputs]
+        self.run_state = [gates[i].value for i in sim.netlist.state_nodes]
+        self.run_done = 0
+        self.run_sync = max(0, sync)  # 0 — обновлять только в конце
+        self.run_synced = 0  # такт, на котором холст последний раз обновлён
+        self.run_started = time.perf_counter()
+        # Открыта панель осциллограмм: задача записывает каждый такт в её буфер
+        recorder = self.wave_buffer() if self.wave_view is not None else None
+        self.run_button.config(text="⏹ Стоп")
+        self.run_job = BackgroundJob(sim.run_steps, cycles, self.run_inputs, self.run_state,
+                                     self.run_sync, recorder, RUN_SLICE, name='run')
+        self.jobs.run(self.run_job, "Прогон тактов", self.run_result, self.finish_run)
+
+    def run_result(self, result):
+        """Порция тактов фонового прогона: холст обновляется на тактах, кратных sync"""
+        self.run_done, self.run_state = result
+        if self.run_sync and self.run_done % self.run_sync == 0:
+            self.sync_state(self.run_inputs, self.run_state, record=False)
+            self.run_synced = self.run_done
+        if self.wave_view is not None:
+            self.wave_view.refresh()
+        self.status.config(text=f"⏩ Выполнено тактов: {self.run_done}", fg='#ffcc00')
+
+    def stop_run(self):
+        """Отмена фонового прогона"""
+        if self.run_job is not None:
+            self.jobs.cancel()
+
+    def finish_run(self, job):
+        """Завершение прогона с выводом пропускной способности"""
+        self.run_job = None
+        # После правки схемы состояние старого симулятора на холст не переносится
+        if self.sequential is self.run_sim and self.run_synced != self.run_done:
+            self.sync_state(self.run_inputs, self.run_state, record=False)
+        self.run_sim = None
+        self.cycle += self.run_done
+        elapsed = time.perf_counter() - self.run_started
+        self.run_button.config(text="⏩ Пуск")
+        if job.error is not None:
+            self.status.config(text=f"⚠ Ошибка прогона: {job.error}", fg='#e74c3c')
+            return
+        self.status.config(text=f"{'⏹' if job.cancelled else '✓'} {self.run_done} тактов, "
+                                f"{self.run_done / max(elapsed, 1e-9):,.0f} тактов/с".replace(',', ' '),
+                           fg='#2ecc71')
+
+    def toggle_heatmap(self):
+        """Раскраска элементов по вероятности единицы на случайных наборах входов"""
+        if self.heat_job is not None:
+            self.jobs.cancel()
+            return
+        if self.renderer.heat:
+            self.clear_heatmap()
+            self.status.config(text="🌡 Тепловая карта скрыта", fg=COLORS['text'])
+            return
+        netlist = self.get_netlist()
+        if netlist is None:
+            return
+        vectors = simpledialog.askinteger("Тепловая карта", "Случайных наборов входов:",
+                                          initialvalue=HEAT_VECTORS, minvalue=1, parent=self.root)
+        if not vectors:
+            return
+        # Карта раскрашивается после каждой пачки наборов, не дожидаясь конца
+        self.heat_gates = self.gates
+        self.heat_result = None
+        self.heat_job = BackgroundJob(heat_steps, netlist, vectors, name='heatmap')
+        self.jobs.run(self.heat_job, f"Тепловая карта, {vectors} наборов", self.heat_update,
+                      self.finish_heatmap)
+
+    def heat_update(self, result):
+        """Перекрашивает элементы по промежуточной статистике"""
+        self.heat_result = result
+        _, probability, toggled, _, _ = result
+        self.renderer.heat = {gate: (probability[i], toggled[i])
+                              for i, gate in enumerate(self.heat_gates)}
+        for gate in self.heat_gates:
+            self.renderer.restyle_gate(gate)
+
+    def finish_heatmap(self, job):
+        """Итог тепловой карты в строке состояния"""
+        self.heat_job = None
+        if job.error is not None:
+            self.status.config(text=f"⚠ Ошибка стимуляции: {job.error}", fg='#e74c3c')
+            return
+        if self.heat_result is None:
+            self.status.config(text="⏹ Тепловая карта отменена", fg=COLORS['text'])
+            return
+        done, _, _, uncovered, seconds = self.heat_result
+        text = f"{'⏹' if job.cancelled else '🌡'} {done} наборов за {seconds:.2f} с"
+        if uncovered:
+            text += "; постоянные выходы: " + ", ".join(f"OUT{k + 1}" for k in uncovered)
+        self.status.config(text=text, fg='#e74c3c' if uncovered else '#2ecc71')
+
+    def clear_heatmap(self):
+        """Возвращает элементам обычные цвета"""
+        heat, self.renderer.heat = self.renderer.heat, {}
+        for gate in heat:
+            self.renderer.restyle_gate(gate)
+
+    def toggle_faults(self):
+        """Покрытие неисправностей stuck-at с раскраской элементов по обнаруженным"""
+        if self.fault_job is not None:
+            self.jobs.cancel()
+            return
+        if self.renderer.faults:
+            self.clear_faults()
+            self.status.config(text="🎯 Раскраска неисправностей скрыта", fg=COLORS['text'])
+            return
+        netlist = self.get_netlist()
+        if netlist is None:
+            return
+        vectors = simpledialog.askinteger("Неисправности",
+                                          "Случайных наборов входов (0 — вся таблица истинности):",
+                                          initialvalue=0 if len(netlist.inputs) <= TABLE_INPUTS
+                                          else FAULT_VECTORS, minvalue=0, parent=self.root)
+        if vectors is None:
+            return
+        if self.renderer.heat:
+            self.clear_heatmap()
+        self.fault_netlist = netlist
+        self.fault_result = None
+        self.fault_job = BackgroundJob(fault_job_steps, netlist, vectors, name='faults')
+        self.jobs.run(self.fault_job, "Неисправности, " + (f"{vectors} наборов" if vectors
+                                                           else "вся таблица"),
+                      self.faults_update, self.finish_faults)
+
+    def faults_update(self, result):
+        """Перекрашивает элементы по обнаруженным на этот момент неисправностям"""
+        self.fault_result = result
+        faults = {}
+        for i, (found0, found1) in result[1].items():
+            # Выходы блока (узлы PIN) сводятся к элементу блока: он зелёный, лишь если
+            # обнаружены неисправности всех его выходов
+            gate = self.fault_netlist.gate_of(i)
+            old0, old1 = faults.get(gate, (True, True))
+            faults[gate] = (old0 and found0, old1 and found1)
+        self.renderer.faults = faults
+        for gate in self.renderer.faults:
+            self.renderer.restyle_gate(gate)
+
+    def finish_faults(self, job):
+        """Итог покрытия в строке состояния и окно необнаруженных неисправностей"""
+        self.fault_job = None
+        if job.error is not None:
+            self.status.config(text=f"⚠ Ошибка моделирования: {job.error}", fg='#e74c3c')
+            return
+        if self.fault_result is None:
+            self.status.config(text="⏹ Моделирование неисправностей отменено", fg=COLORS['text'])
+            return
+        done, _, coverage, undetected, total, seconds = self.fault_result
+        self.status.config(text=f"{'⏹' if job.cancelled else '🎯'} покрытие {100 * coverage:.2f}%, "
+                                f"{done} наборов за {seconds:.2f} с",
+                           fg='#e74c3c' if undetected else '#2ecc71')
+        # После отмены (в том числе правкой схемы) список неполон и окно не открывается
+        if not undetected or job.cancelled:
+            return
+        names = net_names(self.fault_netlist)
+        lines = [f"Не обнаружено {len(undetected)} из {total} неисправностей", ""]
+        lines += [f"{names[i]} s-a-{value}" for i, value in undetected[:FAULT_SHOWN]]
+        if len(undetected) > FAULT_SHOWN:
+            lines.append(f"... ещё {len(undetected) - FAULT_SHOWN}")
+        win = tk.Toplevel(self.root)
+        win.title("🎯 Необнаруженные неисправности")
+        win.geometry("420x360")
+        text = tk.Text(win, bg=COLORS['canvas'], fg=COLORS['text_dark'], font=('Consolas', 10),
+                       relief=tk.FLAT)
+        text.insert('1.0', '\n'.join(lines))
+        text.config(state=tk.DISABLED)
+        text.pack(fill=tk.BOTH, expand=True)
+
+    def clear_faults(self):
+        """Возвращает элементам обычные цвета после раскраски неисправностей"""
+        faults, self.renderer.faults = self.renderer.faults, {}
+        for gate in faults:
+            self.renderer.restyle_gate(gate)
+
+    def toggle_waveforms(self):
+        """Показывает или скрывает панель осциллограмм; запись идёт, пока она открыта"""
+        if self.wave_view is not None:
+            self.stop_wave_stream()
+            self.wave_view.frame.destroy()
+            self.wave_view = None
+            self.wave = None
+            self.status.config(text="〰 Запись осциллограмм остановлена", fg=COLORS['text'])
+            return
+        self.wave_view = WaveformView(self.canvas_frame, self.export_vcd,
+                                      self.toggle_wave_stream, self.pick_wave_signals)
+        self.wave_view.frame.grid(row=0, column=2, rowspan=2, sticky='ns')
+        netlist = self.get_netlist(report=False)
+        if netlist is not None and netlist.values is not None:
+            self.record_wave(netlist.values)
+        self.status.config(text="〰 Запись осциллограмм: каждый шаг симуляции", fg='#2ecc71')
+
+    def wave_signals(self, netlist):
+        """Сигналы панели: выделенные элементы или входы, выходы и состояние"""
+        nets = sorted(netlist.index[gate] for gate in self.selection if gate in netlist.index)
+        return nets or netlist.inputs + netlist.outputs + netlist.state_nodes
+
+    def wave_buffer(self):
+        """Буфер отсчётов текущей топологии; создаётся при первой записи"""
+        if self.wave is None:
+            netlist = self.get_netlist(report=False)
+            self.wave = WaveformBuffer(len(netlist.types))
+            self.wave_view.set_buffer(self.wave, net_names(netlist), self.wave_signals(netlist))
+        return self.wave
+
+    def record_wave(self, values):
+        """Добавляет отсчёт всех цепей, если открыта панель осциллограмм"""
+        # Во время фонового прогона в буфер пишет только его задача
+        if self.wave_view is None or values is None or self.run_job is not None:
+            return
+        self.wave_buffer().record(values)
+        self.wave_view.refresh()
+
+    def pick_wave_signals(self):
+        """Показывает в панели выделенные элементы (без выделения — входы и выходы)"""
+        netlist = self.get_netlist(report=False)
+        if netlist is None or self.wave is None:
+            return
+        self.wave_view.nets = self.wave_signals(netlist)
+        self.wave_view.refresh()
+
+    def export_vcd(self):
+        """Сохраняет отсчёты из буфера в VCD"""
+        if self.wave is None or not self.wave.total:
+            messagebox.showinfo("Информация", "Нет записанных отсчётов")
+            return
+        path = filedialog.asksaveasfilename(title="Экспорт в VCD", defaultextension='.vcd',
+                                            filetypes=[('Value Change Dump', '*.vcd')])
+        if not path:
+            return
+        try:
+            self.wave.export_vcd(path, self.wave_view.names)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить VCD:\n{e}")
+            return
+        self.status.config(text=f"💾 VCD: {self.wave.total - self.wave.first} отсчётов",
+                           fg='#9b59b6')
+
+    def toggle_wave_stream(self):
+        """Потоковая запись следующих отсчётов в VCD, без ограничения буфером"""
+        if self.wave is not None and self.wave.stream is not None:
+            self.stop_wave_stream()
+            return
+        netlist = self.get_netlist(report=False)
+        if netlist is None:
+            return
+        path = filedialog.asksaveasfilename(title="Поток в VCD", defaultextension='.vcd',
+                                            filetypes=[('Value Change Dump', '*.vcd')])
+        if not path:
+            return
+        try:
+            stream = VCDWriter(path, net_names(netlist))
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть файл:\n{e}")
+            return
+        self.wave_buffer().stream = stream
+        self.wave_view.stream_button.config(text="⏹ Поток")
+        self.status.config(text=f"⏺ Отсчёты пишутся в {os.path.basename(path)}", fg='#e74c3c')
+
+    def stop_wave_stream(self):
+        """Закрывает файл потоковой записи VCD"""
+        if self.wave is not None and self.wave.stream is not None:
+            self.wave.stream.close()
+            self.wave.stream = None
+            self.wave_view.stream_button.config(text="⏺ Поток")
+            self.status.config(text="⏹ Поток VCD закрыт", fg='#9b59b6')
 
     def show_table(self):
         """Показ таблицы истинности"""
         ins = [g for g in self.gates if g.type == 'IN']
-        outs = [g for g in self.gates if g.type == 'OUT']
 
         if not ins:
             messagebox.showinfo("Информация", "Добавьте входные элементы (IN)")
             return
 
-        if len(ins) > 8:
-            messagebox.showwarning("Предупреждение",
-                                   "Рекомендуется не более 8 входов для лучшей читаемости")
-
-        # Создаем окно таблицы
-        table_win = tk.Toplevel(self.root)
-        table_win.title("📊 Таблица истинности")
-        table_win.geometry("800x500")
-        table_win.configure(bg=COLORS['bg'])
-
-        # Создаем Treeview с полосами прокрутки
-        frame = tk.Frame(table_win, bg=COLORS['bg'])
-        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-        # Заголовки
-        headers = [f"IN{i + 1}" for i in range(len(ins))] + [f"OUT{i + 1}" for i in range(len(outs))]
-
-        tree = ttk.Treeview(frame, columns=headers, show='headings', height=20)
-
-        # Настраиваем заголовки
-        for header in headers:
-            tree.heading(header, text=header)
-            tree.column(header, width=80, anchor='center')
-
-        # Добавляем полосы прокрутки
-        v_scroll = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
-        h_scroll = ttk.Scrollbar(frame, orient='horizontal', command=tree.xview)
-        tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-
-        tree.grid(row=0, column=0, sticky='nsew')
-        v_scroll.grid(row=0, column=1, sticky='ns')
-        h_scroll.grid(row=1, column=0, sticky='ew')
-
-        frame.grid_rowconfigure(0, weight=1)
-        frame.grid_columnconfigure(0, weight=1)
-
-        # Генерируем все комбинации
-        total_rows = 2 ** len(ins)
-        progress_step = max(1, total_rows // 20)  # Обновляем прогресс каждые 5%
-
-        for i, bits in enumerate(itertools.product([False, True], repeat=len(ins))):
-            # Устанавливаем значения входов
-            for gate, val in zip(ins, bits):
-                gate.value = val
-
-            # Запускаем симуляцию
-            self.calc()
-
-            # Формируем строку
-            row_values = [str(int(v)) for v in bits] + \
-                         [str(int(g.value)) for g in outs]
-
-            # Добавляем строку в таблицу
-            tree.insert('', 'end', values=row_values)
-
-            # Обновляем прогресс для больших таблиц
-            if total_rows > 100 and i % progress_step == 0:
-                table_win.update()
+        netlist = self.sim_netlist()
+        if netlist is None:
+            return
 
-        # Информация о таблице
-        info_label = tk.Label(table_win,
-                              text=f"Всего строк: {total_rows} | Входов: {len(ins)} | Выходов: {len(outs)}",
-                              bg=COLORS['bg'], fg=COLORS['text'])
-        info_label.pack(pady=(0, 10))
+        TruthTableView(self.root, netlist)
 
     def clear(self):
         """Очистка всей схемы"""
         if messagebox.askyesno("Подтверждение", "Удалить все элементы и соединения?"):
-            self.gates = []
-            self.connections = []
+            self.history.push(RemoveItems(list(self.graph.gates.items()),
+                                          list(self.graph.connections.items())))
+            # Флаги selected сбрасываются: после отмены очистки элементы вернутся невыделенными
+            self.clear_selection()
+            self.graph.clear()
+            self.drag_gate = None
+            self.drag_gates = []
+            self.spatial.clear()
             self.connect_mode = False
             self.connect_start = None
+            self.invalidate_netlist()
             self.redraw()
             self.mode_label.config(text="Режим: Выбор")
             self.status.config(text="✓ Схема очищена", fg='#6bbf59')
@@ -652,27 +2300,186 @@ class ModernApp:
         self.status.config(text="Режим соединения отменен", fg='#e74c3c')
 
     def delete_selected(self):
-        """Удаление выбранного элемента"""
-        for gate in self.gates[:]:  # Используем копию списка для безопасного удаления
-            if gate.selected:
-                # Удаляем все соединения с этим элементом
-                self.connections = [c for c in self.connections
-                                    if c.src != gate and c.dst != gate]
-                self.gates.remove(gate)
-                self.status.config(text=f"✓ Удален элемент {gate.type}", fg='#e74c3c')
-                break
-        self.redraw()
+        """Удаление выделенных элементов"""
+        selected = list(self.selection)
+        if not selected:
+            return
+        self.delete_gates(selected)
+        if len(selected) == 1:
+            self.status.config(text=f"✓ Удален элемент {selected[0].type}", fg='#e74c3c')
+        else:
+            self.status.config(text=f"✓ Удалено элементов: {len(selected)}", fg='#e74c3c')
+
+    def delete_gates(self, gates):
+        """Удаляет элементы вместе со всеми их соединениями одной записью журнала"""
+        self.apply(RemoveItems(self.graph.entries(gates), self.graph.incident(gates)))
+
+    def apply(self, command):
+        """Выполняет правку и записывает её в журнал"""
+        command.redo(self)
+        self.history.push(command)
+
+    def copy_selected(self):
+        """Копирует выделенные элементы и соединения между ними в буфер"""
+        selected = list(self.selection)
+        if not selected:
+            return
+        self.clipboard = copy_circuit(selected,
+                                      [conn for _, conn in self.graph.incident(selected)])
+        self.paste_count = 0
+        self.status.config(text=f"📋 Скопировано элементов: {len(selected)}", fg='#3498db')
+
+    def paste(self):
+        """Вставляет копию буфера со сдвигом и выделяет её"""
+        if self.clipboard is None:
+            return
+        # Каждая вставка — новые объекты: буфер можно вставлять много раз
+        gates, connections = copy_circuit(*self.clipboard)
+        self.paste_count += 1
+        offset = PASTE_OFFSET * self.paste_count
+        for gate in gates:
+            gate.x += offset
+            gate.y += offset
+            gate.selected = False
+        self.apply(AddItems([(self.graph.new_id(), gate) for gate in gates],
+                            [(self.graph.new_id(), conn) for conn in connections]))
+        self.clear_selection()
+        self.select(gates)
+        self.status.config(text=f"📋 Вставлено элементов: {len(gates)}", fg='#6bbf59')
+
+    def insert_items(self, gates, connections):
+        """Возвращает элементы и соединения в схему под их прежними id"""
+        self.graph.insert(gates, connections)
+        for _, gate in gates:
+            self.spatial.insert(gate)
+            self.renderer.add_gate(gate)
+        for _, conn in connections:
+            self.renderer.add_wire(conn)
+        if self.renderer.overview:
+            self.renderer.refresh()
+        self.invalidate_netlist()
+        self.update_scrollbars()
+
+    def remove_items(self, gates, connections):
+        """Убирает элементы и соединения из схемы, индекса и с холста"""
+        for _, conn in connections:
+            self.renderer.remove_wire(conn)
+        for _, gate in gates:
+            self.spatial.remove(gate)
+            self.renderer.remove_gate(gate)
+        self.graph.remove(gates, connections)
+        removed = {gate for _, gate in gates}
+        for gate in removed:
+            if self.selection.pop(gate, 0) is None:
+                gate.selected = False
+        if self.drag_gate in removed:
+            self.drag_gate = None
+            self.drag_gates = []
+        if self.connect_start is not None and self.connect_start[0] in removed:
+            self.cancel_connection()
+        if self.renderer.overview:
+            self.renderer.refresh()
+        self.invalidate_netlist()
+
+    def move_gates(self, gates, dx, dy):
+        """Сдвигает элементы: индекс и холст обновляются только для них и их проводов"""
+        for gate in gates:
+            gate.x += dx
+            gate.y += dy
+            self.spatial.update(gate)
+        self.renderer.move_gates(gates, dx, dy)
+
+    def undo(self):
+        """Отмена последней правки схемы"""
+        if self.history.undo(self):
+            self.status.config(text="↶ Правка отменена", fg='#6bbf59')
+        else:
+            self.status.config(text="⚠ Нечего отменять", fg='#e74c3c')
+
+    def redo(self):
+        """Повтор отменённой правки схемы"""
+        if self.history.redo(self):
+            self.status.config(text="↷ Правка повторена", fg='#6bbf59')
+        else:
+            self.status.config(text="⚠ Нечего повторять", fg='#e74c3c')
 
     def save_circuit(self):
-        """Сохранение схемы (заглушка)"""
-        self.status.config(text="💾 Функция сохранения в разработке", fg='#9b59b6')
+        """Сохранение схемы в двоичный формат или экспорт в JSON"""
+        path = filedialog.asksaveasfilename(title="Сохранить схему", defaultextension='.lcb',
+                                            filetypes=CIRCUIT_FILETYPES)
+        if not path:
+            return
+        try:
+            circuit_io.save_circuit(path, self.gates, self.connections, self.blocks.values())
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить схему:\n{e}")
+            return
+        self.status.config(text=f"💾 Схема сохранена: {len(self.gates)} элементов", fg='#9b59b6')
 
     def load_circuit(self):
-        """Загрузка схемы (заглушка)"""
-        self.status.config(text="📂 Функция загрузки в разработке", fg='#9b59b6')
+        """Загрузка схемы из файла или импорт netlist в фоне"""
+        path = filedialog.askopenfilename(title="Загрузить схему", filetypes=IMPORT_FILETYPES)
+        if not path:
+            return
+        self.loaded = None
+        job = BackgroundJob(load_steps, path, name='load')
+        self.jobs.run(job, f"Загрузка {os.path.basename(path)}", self.load_result,
+                      lambda job: self.finish_load(job, path))
+
+    def load_result(self, result):
+        """Запоминает загруженную схему (промежуточные шаги импорта — None)"""
+        if result is not None:
+            self.loaded = result
+
+    def finish_load(self, job, path):
+        """Подставляет загруженную схему; импортированный netlist показывается целиком"""
+        if job.error is not None:
+            if not isinstance(job.error, (OSError, ValueError, KeyError, IndexError,
+                                          CombinationalLoopError)):
+                raise job.error
+            messagebox.showerror("Ошибка", f"Не удалось загрузить схему:\n{job.error}")
+            return
+        if self.loaded is None:
+            self.status.config(text="⏹ Загрузка отменена", fg=COLORS['text'])
+            return
+        gates, connections, library = self.loaded
+        self.loaded = None
+        renamed = circuit_io.merge_blocks(self.blocks, library, gates)
+        self.refresh_blocks()
+        self.set_circuit(gates, connections)
+        if netlist_import.is_structural(path):
+            self.fit_view()
+        text = f"📂 Загружено элементов: {len(gates)}"
+        if renamed:
+            text += "; блоки переименованы: " + ", ".join(f"{old} → {new}" for old, new in renamed)
+        self.status.config(text=text, fg='#9b59b6')
+
+    def set_circuit(self, gates, connections):
+        """Заменяет схему целиком с одной перерисовкой"""
+        self.clear_selection()
+        self.graph.clear()
+        for gate in gates:
+            self.graph.add_gate(gate)
+        for conn in connections:
+            self.graph.add_connection(conn)
+        self.connect_mode = False
+        self.connect_start = None
+        self.drag_gate = None
+        self.drag_gates = []
+        self.history.clear()
+        self.spatial.clear()
+        for gate in gates:
+            self.spatial.insert(gate)
+        self.invalidate_netlist()
+        self.redraw()
+        self.mode_label.config(text="Режим: Выбор")
 
 
 if __name__ == "__main__":
+    # Запись всех замеров сессии в файл для последующего разбора
+    if os.environ.get('LCS_PERF_LOG'):
+        monitor.log_to(os.environ['LCS_PERF_LOG'])
+
     root = tk.Tk()
     app = ModernApp(root)
     root.mainloop()
\ No newline at end of file
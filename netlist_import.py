@@ -0,0 +1,512 @@
+"""Импорт структурных netlist: BLIF и подмножество вентильного Verilog.
+
+Файл разбирается потоково, строка за строкой: в памяти держатся только
+массивы типов и рёбер (как в двоичном формате .lcb), словарь имён цепей и
+текущий оператор, поэтому эталонные схемы на сотни тысяч элементов
+(ISCAS-85/89, EPFL) читаются без копии текста в памяти.
+
+BLIF: .model, .inputs, .outputs, .names с покрытием, .latch, .end.
+Покрытие, совпадающее с AND, OR, NAND, NOR, NOT, XOR, буфером или
+константой, становится одним элементом; остальные раскладываются на
+инверторы входов, AND на куб и OR (NOR для покрытия нулей).
+
+Verilog: один модуль; объявления input/output/wire, в том числе шины
+[msb:lsb] и заголовок в стиле ANSI; примитивы and, or, nand, nor, xor,
+xnor, not, buf; триггеры dff (выход, вход) или (такт, выход, вход);
+assign с ~ ! & | ^ ~^, скобками и константами 1'b0/1'b1.
+
+Буфер — AND с одним входом, константа 1 — AND без входов, константа 0 —
+OR без входов: так их вычисляет ядро codegen. XNOR — XOR и NOT.
+Элементы расставляются по логическим уровням, а слишком высокие уровни
+разбиваются на несколько столбцов, чтобы схема была примерно в пропорциях
+окна.
+"""
+import itertools
+import math
+import os
+import re
+from array import array
+
+from circuit_core import Netlist, level_layout
+from circuit_io import GATE_CODES, CircuitData
+
+STRUCTURAL_EXTENSIONS = ('.blif', '.v')
+PROGRESS_LINES = 4096  # строк между отчётами о ходе разбора
+LAYOUT_DX, LAYOUT_DY = 140, 80  # шаг столбцов и строк расстановки
+LAYOUT_ASPECT = 1.5  # желаемое отношение ширины схемы к высоте
+LAYOUT_MIN_ROWS = 32  # уровни не выше стольких элементов не разбиваются
+
+VERILOG_GATES = {'and': 'AND', 'or': 'OR', 'nand': 'NAND', 'nor': 'NOR', 'xor': 'XOR',
+                 'xnor': 'XNOR', 'not': 'NOT', 'buf': 'AND'}
+VERILOG_OPERATORS = set("()[],:;=~!&|^#.") | {'~^', '^~'}
+VERILOG_TOKEN = re.compile(r"\\\S+|[A-Za-z_][\w$]*(?:\[\d+\])?"
+                           r"|\d+'[bB][01]+|\d+|~\^|\^~|[()\[\],:;=~!&|^#.]")
+VERILOG_COMMENT = re.compile(r"//|/\*")
+VERILOG_INDEX = re.compile(r"\s*\[\s*(\d+)\s*\]")  # «a [ 3 ]» -> «a[3]»
+
+
+def is_structural(path):
+    """BLIF или Verilog ли файл (по расширению)"""
+    return path.lower().endswith(STRUCTURAL_EXTENSIONS)
+
+
+class NetBuilder:
+    """Схема по именам цепей: типы узлов и рёбра в упакованном виде.
+
+    Узел цепи заводится при первом упоминании, а тип получает, когда
+    встречается её источник, поэтому ссылки вперёд не требуют второго
+    прохода по файлу.
+    """
+
+    def __init__(self):
+        self.types = []  # тип узла; None — цепь упомянута, но источник ещё не встречен
+        self.edges = array('I')  # src0, dst0, src1, dst1, ...
+        self.nets = {}  # имя цепи -> узел
+        self.outputs = []  # имена выходов в порядке объявления
+        self.ones = []  # триггеры с начальным значением 1
+        self.inverted = {}  # узел -> общий инвертор его значения
+        self.constants = {}  # 0/1 -> узел константы
+
+    def net(self, name):
+        """Узел цепи name"""
+        node = self.nets.get(name)
+        if node is None:
+            node = self.nets[name] = len(self.types)
+            self.types.append(None)
+        return node
+
+    def node(self, typ, srcs):
+        """Новый безымянный элемент"""
+        node = len(self.types)
+        self.types.append(typ)
+        for src in srcs:
+            self.edges.extend((src, node))
+        return node
+
+    def define(self, name, typ, srcs):
+        """Цепь name — выход элемента typ с входами srcs"""
+        node = self.net(name)
+        if self.types[node] is not None:
+            raise ValueError(f"у цепи {name} несколько источников")
+        self.types[node] = typ
+        for src in srcs:
+            self.edges.extend((src, node))
+        return node
+
+    def invert(self, src):
+        """Инвертор значения узла src, общий для всех потребителей"""
+        node = self.inverted.get(src)
+        if node is None:
+            node = self.inverted[src] = self.node('NOT', [src])
+        return node
+
+    def constant(self, value):
+        """Узел константы 0 или 1"""
+        node = self.constants.get(value)
+        if node is None:
+            node = self.constants[value] = self.node('AND' if value else 'OR', [])
+        return node
+
+    def input(self, name):
+        self.define(name, 'IN', [])
+
+    def output(self, name):
+        self.outputs.append(name)
+
+    def finish(self):
+        """CircuitData с выходами OUT и расстановкой по уровням"""
+        for name in self.outputs:
+            self.node('OUT', [self.net(name)])
+        undefined = [name for name, node in self.nets.items() if self.types[node] is None]
+        if undefined:
+            more = f" (и ещё {len(undefined) - 1})" if len(undefined) > 1 else ""
+            raise ValueError(f"у цепи {undefined[0]} нет источника{more}")
+
+        netlist = Netlist.from_edges(self.types, self.edges)
+        rows = max(LAYOUT_MIN_ROWS,
+                   int(math.sqrt(len(self.types) * LAYOUT_DX / (LAYOUT_ASPECT * LAYOUT_DY))))
+        coords = array('i', itertools.chain.from_iterable(
+            level_layout(netlist, dx=LAYOUT_DX, dy=LAYOUT_DY, max_rows=rows)))
+        codes = bytes(GATE_CODES[typ] for typ in self.types)
+        values = sum(1 << node for node in self.ones)
+        return CircuitData(codes, coords, values, self.edges)
+
+
+def add_cover(builder, inputs, output, rows):
+    """Элементы для .names: rows — [(шаблон входов, значение выхода)]"""
+    srcs = [builder.net(name) for name in inputs]
+    if not rows:
+        return builder.define(output, 'OR', [])
+    value = rows[0][1]
+    if any(bit != value for _, bit in rows):
+        raise ValueError(f"в покрытии {output} смешаны строки для 0 и 1")
+    if any(not pattern.strip('-') for pattern, _ in rows):
+        # Куб без литералов покрывает все наборы: выход постоянный
+        return builder.define(output, 'AND' if value == '1' else 'OR', [])
+
+    literals = [[(src, c) for src, c in zip(srcs, pattern) if c != '-'] for pattern, _ in rows]
+    polarity = {c for cube in literals for _, c in cube}
+    if len(polarity) == 1:
+        (c,) = polarity
+        if len(rows) == 1:
+            cube = [src for src, _ in literals[0]]
+            if len(cube) == 1:
+                return builder.define(output, 'AND' if c == value else 'NOT', cube)
+            typ = {('1', '1'): 'AND', ('0', '1'): 'NOR', ('1', '0'): 'NAND', ('0', '0'): 'OR'}
+            return builder.define(output, typ[c, value], cube)
+        single = [cube[0][0] for cube in literals if len(cube) == 1]
+        if len(single) == len(rows) and len(set(single)) == len(single):
+            typ = {('1', '1'): 'OR', ('0', '1'): 'NAND', ('1', '0'): 'NOR', ('0', '0'): 'AND'}
+            return builder.define(output, typ[c, value], single)
+
+    patterns = {pattern for pattern, _ in rows}
+    if (len(srcs) >= 2 and '-' not in ''.join(patterns) and len(patterns) == len(rows)
+            == 1 << (len(srcs) - 1)):
+        parity = {pattern.count('1') % 2 for pattern in patterns}
+        if len(parity) == 1:
+            # Все наборы одной чётности: XOR или XNOR входов
+            if parity == {int(value)}:
+                return builder.define(output, 'XOR', srcs)
+            return builder.define(output, 'NOT', [builder.node('XOR', srcs)])
+
+    terms = []
+    for cube in literals:
+        cube = [src if c == '1' else builder.invert(src) for src, c in cube]
+        if len(rows) == 1:
+            return builder.define(output, 'AND' if value == '1' else 'NAND', cube)
+        terms.append(cube[0] if len(cube) == 1 else builder.node('AND', cube))
+    return builder.define(output, 'OR' if value == '1' else 'NOR', terms)
+
+
+def blif_lines(lines):
+    """(первая строка, последняя строка, слова) логических строк BLIF без комментариев и переносов"""
+    pending = []
+    start = None
+    for lineno, line in enumerate(lines, 1):
+        line = line.split('#', 1)[0].rstrip()
+        if start is None:
+            start = lineno
+        if line.endswith('\\'):
+            pending.append(line[:-1])
+            continue
+        pending.append(line)
+        words = ' '.join(pending).split()
+        pending = []
+        if words:
+            yield start, lineno, words
+        start = None
+
+
+def parse_blif(lines, builder):
+    """Разбор BLIF в builder; выдаёт номер строки каждые PROGRESS_LINES строк"""
+    cover = None  # (входы, выход, строки) текущего .names
+    reported = 0
+    for start, lineno, words in blif_lines(lines):
+        if lineno - reported >= PROGRESS_LINES:
+            reported = lineno
+            yield lineno
+        keyword = words[0]
+        if not keyword.startswith('.'):
+            if cover is None:
+                raise ValueError(f"строка {start}: строка покрытия вне .names")
+            pattern, bit = (words[0], words[1]) if len(words) == 2 else ('', words[0])
+            if len(words) > 2 or len(pattern) != len(cover[0]) or pattern.strip('01-') or \
+                    bit not in ('0', '1'):
+                raise ValueError(f"строка {start}: неверная строка покрытия {' '.join(words)!r}")
+            cover[2].append((pattern, bit))
+            continue
+
+        if cover is not None:
+            add_cover(builder, *cover)
+            cover = None
+        if keyword == '.inputs':
+            for name in words[1:]:
+                builder.input(name)
+        elif keyword == '.outputs':
+            for name in words[1:]:
+                builder.output(name)
+        elif keyword == '.names':
+            if len(words) < 2:
+                raise ValueError(f"строка {start}: у .names нет выхода")
+            cover = (words[1:-1], words[-1], [])
+        elif keyword == '.latch':
+            if len(words) < 3:
+                raise ValueError(f"строка {start}: у .latch нет входа или выхода")
+            node = builder.define(words[2], 'DFF', [builder.net(words[1])])
+            if len(words) in (4, 6) and words[-1] == '1':
+                builder.ones.append(node)
+        elif keyword in ('.end', '.exdc'):
+            break
+        elif keyword in ('.subckt', '.gate', '.mlatch', '.search'):
+            raise ValueError(f"строка {start}: {keyword} не поддерживается (нужен плоский BLIF)")
+        # Остальные директивы (.model, .clock, задержки) на логику не влияют
+    if cover is not None:
+        add_cover(builder, *cover)
+
+
+def verilog_tokens(line, comment):
+    """Лексемы строки Verilog и признак незакрытого комментария /* */"""
+    tokens = []
+    while line:
+        if comment:
+            end = line.find('*/')
+            if end < 0:
+                break
+            comment = False
+            line = line[end + 2:]
+        match = VERILOG_COMMENT.search(line)
+        code = line if match is None else line[:match.start()]
+        comment = match is not None and match.group() == '/*'
+        line = line[match.end():] if comment else ''
+        if '[' in code:
+            code = VERILOG_INDEX.sub(r"[\1]", code)
+        found = VERILOG_TOKEN.findall(code)
+        if len(''.join(found)) != len(''.join(code.split())):
+            # Лексемы покрыли не всё: остаток после их вырезания — непонятные символы
+            raise ValueError(f"непонятный символ {VERILOG_TOKEN.sub(' ', code).split()[0]!r}")
+        if '\\' in code:  # \имя — экранированный идентификатор
+            found = [token[1:] if token[0] == '\\' else token for token in found]
+        tokens += found
+    return tokens, comment
+
+
+def split_commas(tokens):
+    """Части списка, разделённые запятыми верхнего уровня (вне скобок)"""
+    parts = [[]]
+    depth = 0
+    for token in tokens:
+        if token in ('(', '['):
+            depth += 1
+        elif token in (')', ']'):
+            depth -= 1
+        if token == ',' and not depth:
+            parts.append([])
+        else:
+            parts[-1].append(token)
+    return [part for part in parts if part]
+
+
+def declared_names(tokens):
+    """Имена из объявления: с диапазоном [msb:lsb] — по имени на разряд, младший первым"""
+    bus = None
+    if tokens and tokens[0] == '[':
+        try:
+            close = tokens.index(']')
+            msb, lsb = int(tokens[1]), int(tokens[3])
+        except (ValueError, IndexError):
+            raise ValueError("неверный диапазон шины") from None
+        bus = range(min(msb, lsb), max(msb, lsb) + 1)
+        tokens = tokens[close + 1:]
+    names = [part[-1] for part in split_commas(tokens)]
+    if bus is None:
+        return names
+    return [f"{name}[{i}]" for name in names for i in bus]
+
+
+class ExpressionParser:
+    """Выражение assign в дерево: ('net', имя), ('const', 0/1), ('NOT', x), (оп, [x, ...])"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("выражение оборвано")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        tree = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"лишнее в выражении: {self.peek()!r}")
+        return tree
+
+    def parse_or(self):
+        terms = [self.parse_xor()]
+        while self.peek() == '|':
+            self.take()
+            terms.append(self.parse_xor())
+        return terms[0] if len(terms) == 1 else ('OR', terms)
+
+    def parse_xor(self):
+        tree = self.parse_and()
+        while self.peek() in ('^', '~^', '^~'):
+            op = 'XOR' if self.take() == '^' else 'XNOR'
+            rhs = self.parse_and()
+            if op == 'XOR' and tree[0] == 'XOR':
+                tree = ('XOR', tree[1] + [rhs])
+            else:
+                tree = (op, [tree, rhs])
+        return tree
+
+    def parse_and(self):
+        terms = [self.parse_unary()]
+        while self.peek() == '&':
+            self.take()
+            terms.append(self.parse_unary())
+        return terms[0] if len(terms) == 1 else ('AND', terms)
+
+    def parse_unary(self):
+        token = self.take()
+        if token in ('~', '!'):
+            return ('NOT', self.parse_unary())
+        if token == '(':
+            tree = self.parse_or()
+            if self.take() != ')':
+                raise ValueError("нет закрывающей скобки")
+            return tree
+        if "'" in token or token.isdigit():
+            value = int(token.split("'")[-1].lstrip('bB') or '0', 2) if "'" in token else int(token)
+            if value not in (0, 1):
+                raise ValueError(f"поддерживаются только однобитные константы: {token}")
+            return ('const', value)
+        if token in VERILOG_OPERATORS:
+            raise ValueError(f"неожиданное {token!r} в выражении")
+        return ('net', token)
+
+
+def expression_gate(builder, tree):
+    """(тип, входы) элемента, вычисляющего дерево выражения"""
+    kind, arg = tree
+    if kind == 'net':
+        return 'AND', [builder.net(arg)]
+    if kind == 'const':
+        return ('AND' if arg else 'OR'), []
+    if kind == 'NOT':
+        inner, children = arg
+        if inner in ('AND', 'OR'):
+            return 'N' + inner, [expression_node(builder, child) for child in children]
+        return 'NOT', [expression_node(builder, arg)]
+    if kind == 'XNOR':
+        return 'NOT', [builder.node('XOR', [expression_node(builder, child) for child in arg])]
+    return kind, [expression_node(builder, child) for child in arg]
+
+
+def expression_node(builder, tree):
+    """Узел со значением дерева; цепи, константы и инверторы цепей переиспользуются"""
+    kind, arg = tree
+    if kind == 'net':
+        return builder.net(arg)
+    if kind == 'const':
+        return builder.constant(arg)
+    if kind == 'NOT' and arg[0] in ('net', 'const'):
+        return builder.invert(expression_node(builder, arg))
+    return builder.node(*expression_gate(builder, tree))
+
+
+def verilog_statement(builder, tokens):
+    """Один оператор Verilog (без ';')"""
+    head = tokens[0]
+    if head == 'module':
+        # Заголовок в стиле ANSI: module m(input a, b, output [1:0] y)
+        if 'input' in tokens or 'output' in tokens:
+            body = tokens[tokens.index('(') + 1:len(tokens) - tokens[::-1].index(')') - 1]
+            direction = None
+            for part in split_commas(body):
+                if part[0] in ('input', 'output'):
+                    direction = part[0]
+                    part = part[1:]
+                if direction is not None:
+                    verilog_statement(builder, [direction] + part)
+        return
+    if head in ('input', 'output', 'wire'):
+        names = declared_names([token for token in tokens[1:] if token not in ('wire', 'reg')])
+        if head == 'input':
+            for name in names:
+                builder.input(name)
+        elif head == 'output':
+            for name in names:
+                builder.output(name)
+        return
+    if head == 'assign':
+        for part in split_commas(tokens[1:]):
+            if len(part) < 3 or part[1] != '=':
+                raise ValueError("ожидается assign цепь = выражение")
+            builder.define(part[0], *expression_gate(builder, ExpressionParser(part[2:]).parse()))
+        return
+
+    cell = head.lower()
+    if cell not in VERILOG_GATES and cell != 'dff':
+        raise ValueError(f"не поддерживается: {head}")
+    for part in split_commas(tokens[1:]):
+        if '(' not in part or part[-1] != ')':
+            raise ValueError(f"ожидается {head} имя(выход, входы)")
+        ports = [port[0] if len(port) == 1 else None
+                 for port in split_commas(part[part.index('(') + 1:-1])]
+        if None in ports or len(ports) < 2:
+            raise ValueError(f"у {head} порты должны быть цепями, выход первым")
+        if cell == 'dff':
+            if len(ports) > 3:
+                raise ValueError("dff: ожидается (выход, вход) или (такт, выход, вход)")
+            builder.define(ports[-2], 'DFF', [builder.net(ports[-1])])
+        else:
+            typ = VERILOG_GATES[cell]
+            srcs = [builder.net(name) for name in ports[1:]]
+            if typ == 'XNOR':
+                builder.define(ports[0], 'NOT', [builder.node('XOR', srcs)])
+            else:
+                builder.define(ports[0], typ, srcs)
+
+
+def parse_verilog(lines, builder):
+    """Разбор Verilog в builder; выдаёт номер строки каждые PROGRESS_LINES строк"""
+    statement = []
+    comment = False
+    start = None
+    for lineno, line in enumerate(lines, 1):
+        if lineno % PROGRESS_LINES == 0:
+            yield lineno
+        try:
+            tokens, comment = verilog_tokens(line, comment)
+        except ValueError as e:
+            raise ValueError(f"строка {lineno}: {e}") from None
+        for token in tokens:
+            if token == 'endmodule' and not statement:
+                return
+            if start is None:
+                start = lineno
+            if token != ';':
+                statement.append(token)
+                continue
+            if statement:
+                try:
+                    verilog_statement(builder, statement)
+                except ValueError as e:
+                    raise ValueError(f"строка {start}: {e}") from None
+            statement = []
+            start = None
+    if statement:
+        raise ValueError(f"строка {start}: оператор не закончен ';'")
+
+
+def import_steps(path):
+    """Разбор файла по шагам для фоновой задачи.
+
+    Выдаёт (доля прочитанного, None), в конце — (1.0, CircuitData).
+    """
+    parse = parse_verilog if path.lower().endswith('.v') else parse_blif
+    size = max(1, os.path.getsize(path))
+    builder = NetBuilder()
+    read = [0]
+
+    def lines(f):
+        for raw in f:
+            read[0] += len(raw)
+            yield raw.decode('utf-8', errors='replace')
+
+    with open(path, 'rb') as f:
+        for _ in parse(lines(f), builder):
+            yield min(0.9, 0.9 * read[0] / size), None
+    yield 1.0, builder.finish()
+
+
+def read_structural(path):
+    """Схема из BLIF или Verilog в виде CircuitData"""
+    for _, data in import_steps(path):
+        pass
+    return data
@@ -0,0 +1,281 @@
+"""Оптимизация netlist перед симуляцией.
+
+Схема переписывается на литералах: литерал — номер узла * 2 + признак
+инверсии, поэтому NOT, NAND и NOR не порождают отдельных узлов, а двойное
+отрицание исчезает само. По ходу обхода в топологическом порядке:
+
+- константы сворачиваются (x & 0 = 0, x | 1 = 1, x ^ 1 = ¬x, x & ¬x = 0);
+- одинаковые входы схлопываются, у XOR взаимно уничтожаются;
+- узлы хешируются по (вид, отсортированные литералы), так что структурно
+  одинаковые элементы сливаются в один;
+- в новый netlist попадают только узлы, от которых зависят OUT и входы
+  регистров; инверсия, если возможно, переносится в тип (AND -> NAND).
+
+Экземпляры блоков (BLK и их PIN) не раскрываются: они остаются
+непрозрачными узлами со входами по порядку портов и тоже сливаются, если
+у двух экземпляров одного определения одинаковые входы.
+
+Порядок IN, OUT, регистров и тактовых генераторов сохраняется, поэтому
+оптимизированный netlist принимает те же векторы входов и состояния и
+выдаёт выходы в том же порядке. Нарисованная схема не меняется.
+"""
+import time
+
+from circuit_core import REGISTER_TYPES, SOURCE_TYPES, Netlist
+from perf import monitor
+
+FALSE_LIT, TRUE_LIT = -2, -1  # литералы-константы: lit ^ 1 — отрицание и для них
+FLIPPED = {'AND': 'NAND', 'OR': 'NOR'}
+
+
+class Optimized:
+    """Результат оптимизации: новый netlist и привязка исходных элементов к нему"""
+
+    def __init__(self, source, netlist, taps, stats):
+        self.source = source
+        self.netlist = netlist
+        self.taps = taps  # для исходного элемента: (индекс в netlist, инверсия) или (None, константа)
+        self.stats = stats
+
+    def expand(self, values, mask=1):
+        """Значения исходных элементов по значениям оптимизированного netlist.
+
+        Удалённые как мёртвые элементы получают 0: на выходы они не влияют.
+        """
+        return [values[i] ^ (mask if invert else 0) if i is not None else (mask if invert else 0)
+                for i, invert in self.taps]
+
+    def simulate(self):
+        """Прогон по оптимизированному netlist с записью значений в исходные Gate"""
+        source = self.source
+        gates = source.gates
+        inputs = [int(gates[i].value) for i in source.inputs]
+        state = [int(gates[i].value) for i in source.state_nodes]
+        values = self.expand(self.netlist.evaluate(inputs, 1, state))
+        for gate, value in zip(gates, values):
+            gate.value = bool(value)
+        if source.pins:
+            source.store_values(source.pins, values)
+        return values
+
+    def report(self):
+        """Текстовый отчёт: число элементов до и после и что было убрано"""
+        stats = self.stats
+        lines = [f"Элементов: {len(self.source.types)} → {len(self.netlist.types)}",
+                 f"Логических: {stats['logic_before']} → {stats['logic_after']}"]
+        labels = [('const', "свёрнуто в константы"),
+                  ('absorbed', "убрано инверсий и вырожденных элементов"),
+                  ('merged', "слито одинаковых"),
+                  ('dead', "удалено мёртвых")]
+        lines += [f"  {label}: {stats[key]}" for key, label in labels if stats[key]]
+        return '\n'.join(lines)
+
+
+class Optimizer:
+    """Построение оптимизированного netlist; см. optimize()"""
+
+    def __init__(self, netlist):
+        self.source = netlist
+        self.kinds = []  # вид узла: тип исходного источника или AND/OR/XOR
+        self.args = []  # литералы входов узла
+        self.extra = []  # определение блока для BLK, номер выхода для PIN
+        self.table = {}  # структурный хеш: (вид, литералы, extra) -> узел
+        self.literal = [FALSE_LIT] * len(netlist.types)
+        self.stats = dict.fromkeys(('const', 'absorbed', 'merged', 'dead', 'kept'), 0)
+        self.hit = False  # последний вызов node() нашёл готовый узел
+
+    def node(self, kind, args, extra=None):
+        """Узел с хешированием; возвращает положительный литерал"""
+        key = (kind, args, extra)
+        node = self.table.get(key)
+        self.hit = node is not None
+        if node is None:
+            node = self.table[key] = len(self.kinds)
+            self.kinds.append(kind)
+            self.args.append(args)
+            self.extra.append(extra)
+        return node * 2
+
+    def and_or(self, kind, lits):
+        """AND или OR над литералами с упрощениями"""
+        absorbing = FALSE_LIT if kind == 'AND' else TRUE_LIT
+        args = set()
+        for lit in lits:
+            if lit == absorbing or lit ^ 1 in args:
+                return absorbing
+            if lit != absorbing ^ 1:
+                args.add(lit)
+        if not args:
+            return absorbing ^ 1
+        if len(args) == 1:
+            return args.pop()
+        return self.node(kind, tuple(sorted(args)))
+
+    def xor(self, lits):
+        """XOR над литералами: константы и инверсии выносятся в признак результата"""
+        invert = 0
+        args = set()
+        for lit in lits:
+            invert ^= lit & 1
+            if lit >= 0:
+                args ^= {lit & ~1}
+        if not args:
+            return FALSE_LIT ^ invert
+        if len(args) == 1:
+            return args.pop() ^ invert
+        return self.node('XOR', tuple(sorted(args))) ^ invert
+
+    def gate_literal(self, i):
+        """Литерал комбинационного элемента i по литералам его источников"""
+        typ = self.source.types[i]
+        lits = [self.literal[src] for src in self.source.fanin[i]]
+        if typ == 'OUT':
+            return lits[0] if lits else FALSE_LIT
+        if typ == 'NOT':
+            return lits[0] ^ 1 if lits else TRUE_LIT
+        if typ in ('AND', 'NAND'):
+            return self.and_or('AND', lits) ^ (typ == 'NAND')
+        if typ in ('OR', 'NOR'):
+            return self.and_or('OR', lits) ^ (typ == 'NOR')
+        if typ == 'XOR':
+            return self.xor(lits)
+        if typ == 'BLK':
+            source = self.source
+            args = tuple(FALSE_LIT if src is None else self.literal[src]
+                         for src in source.block_args[i])
+            return self.node('BLK', args, source.blocks[i])
+        if typ == 'PIN':
+            return self.node('PIN', (lits[0],), self.source.pins[i])
+        return FALSE_LIT
+
+    def run(self):
+        """Переписывает элементы в топологическом порядке и строит netlist"""
+        source = self.source
+        types = source.types
+        # Источники — в исходном порядке, чтобы сохранить порядок входов и состояния
+        for i, typ in enumerate(types):
+            if typ in SOURCE_TYPES:
+                self.literal[i] = self.node(typ, (i,))
+        for i in source.order:
+            if types[i] not in SOURCE_TYPES:
+                before = len(self.kinds)
+                self.hit = False
+                lit = self.literal[i] = self.gate_literal(i)
+                if types[i] == 'OUT':
+                    continue
+                if lit < 0:
+                    self.stats['const'] += 1
+                elif len(self.kinds) > before:
+                    self.stats['kept'] += 1
+                elif self.hit:
+                    self.stats['merged'] += 1
+                else:
+                    self.stats['absorbed'] += 1
+        return self.emit()
+
+    def emit(self):
+        """Новый netlist из живых узлов"""
+        source = self.source
+        types, fanin = source.types, source.fanin
+        roots = [self.literal[i] for i in source.outputs]
+        roots += [self.literal[src] for i in source.registers for src in fanin[i]]
+
+        # Живые узлы и полярности, в которых они используются
+        positive = [False] * len(self.kinds)
+        negative = [False] * len(self.kinds)
+        stack = [lit for lit in roots if lit >= 0]
+        live = [False] * len(self.kinds)
+        for node, kind in enumerate(self.kinds):
+            if kind in SOURCE_TYPES:
+                live[node] = positive[node] = True
+        while stack:
+            lit = stack.pop()
+            node = lit >> 1
+            (negative if lit & 1 else positive)[node] = True
+            if not live[node]:
+                live[node] = True
+                stack.extend(lit for lit in self.args[node] if lit >= 0)
+
+        new_types = []
+        new_fanin = []
+        blocks, pins, block_args = {}, {}, {}
+        index = [None] * len(self.kinds)  # узел -> (индекс, инверсия)
+        extra = {}  # NOT и константы, созданные при материализации
+
+        def add(typ, srcs):
+            new_types.append(typ)
+            new_fanin.append(srcs)
+            return len(new_types) - 1
+
+        def use(lit):
+            """Индекс элемента, выдающего значение литерала"""
+            if lit < 0:
+                if lit not in extra:
+                    extra[lit] = add('AND' if lit == TRUE_LIT else 'OR', [])
+                return extra[lit]
+            i, invert = index[lit >> 1]
+            if invert == lit & 1:
+                return i
+            if i not in extra:
+                extra[i] = add('NOT', [i])
+            return extra[i]
+
+        for node, kind in enumerate(self.kinds):
+            if not live[node]:
+                continue
+            if kind in SOURCE_TYPES:
+                index[node] = (add(kind, []), 0)
+                continue
+            if kind == 'BLK':
+                srcs = [use(lit) for lit in self.args[node]]
+                i = add('BLK', srcs)
+                blocks[i], block_args[i] = self.extra[node], srcs
+                index[node] = (i, 0)
+                continue
+            if kind == 'PIN':
+                i = add('PIN', [use(self.args[node][0])])
+                pins[i] = self.extra[node]
+                index[node] = (i, 0)
+                continue
+            flip = negative[node] and not positive[node] and kind in FLIPPED
+            srcs = [use(lit) for lit in self.args[node]]
+            index[node] = (add(FLIPPED[kind] if flip else kind, srcs), int(flip))
+
+        for node, kind in enumerate(self.kinds):
+            if kind in REGISTER_TYPES:
+                new_fanin[index[node][0]] = [use(self.literal[src])
+                                             for src in fanin[self.args[node][0]]]
+        out_index = []
+        for i in source.outputs:
+            lit = self.literal[i]
+            out_index.append(add('OUT', [] if lit == FALSE_LIT else [use(lit)]))
+
+        taps = []
+        for lit in self.literal:
+            if lit < 0:
+                taps.append((None, lit & 1))
+            elif index[lit >> 1] is None:
+                taps.append((None, 0))
+            else:
+                i, invert = index[lit >> 1]
+                taps.append((i, invert ^ (lit & 1)))
+        for i, k in zip(source.outputs, out_index):
+            taps[i] = (k, 0)
+
+        self.stats['dead'] = sum(1 for node, kind in enumerate(self.kinds)
+                                 if not live[node] and kind not in SOURCE_TYPES)
+        self.stats['kept'] -= self.stats['dead']
+        logic = ('IN', 'OUT', 'PIN') + SOURCE_TYPES
+        self.stats['logic_before'] = sum(1 for typ in types if typ not in logic)
+        self.stats['logic_after'] = sum(1 for typ in new_types if typ not in logic)
+        netlist = Netlist(new_types, new_fanin, blocks=blocks, pins=pins, block_args=block_args)
+        return Optimized(source, netlist, taps, self.stats)
+
+
+def optimize(netlist):
+    """Оптимизированная копия netlist для симуляции (см. описание модуля)"""
+    start = time.perf_counter()
+    optimized = Optimizer(netlist).run()
+    monitor.record('optimize', time.perf_counter() - start,
+                   gates=len(netlist.types), removed=len(netlist.types) - len(optimized.netlist.types))
+    return optimized
@@ -0,0 +1,90 @@
+"""Счётчики производительности горячих путей и хуки для профилирования.
+
+Горячие пути сообщают о себе через monitor.record/monitor.timed:
+
+    compute     вычисление элементов netlist (data: evaluations — число
+                вычисленных элементов, lanes — бит на слово)
+    calc        полный прогон симуляции из интерфейса
+    redraw      обновление холста (data: kind — rebuild/move/values)
+    show_table  вычисление строк таблицы истинности (data: rows)
+
+Подписаться на события можно через monitor.add_hook(событие, callback),
+callback(event, seconds, data); событие '*' означает все события.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+FRAME_BUDGET = 1 / 60  # бюджет кадра интерфейса, секунды
+
+
+class PerfMonitor:
+    """Последние замеры, накопленная статистика и подписчики на события"""
+
+    def __init__(self):
+        self.last = {}  # событие -> (секунды, данные) последнего замера
+        self.stats = {}  # событие -> {'calls', 'seconds', 'over_budget', суммы числовых данных}
+        self.hooks = {}  # событие -> [callback]
+
+    def add_hook(self, event, callback):
+        """Подписывает callback(event, seconds, data) на событие"""
+        self.hooks.setdefault(event, []).append(callback)
+
+    def remove_hook(self, event, callback):
+        """Отписывает callback от события"""
+        if callback in self.hooks.get(event, ()):
+            self.hooks[event].remove(callback)
+
+    def record(self, event, seconds, **data):
+        """Регистрирует замер события"""
+        self.last[event] = (seconds, data)
+        stat = self.stats.get(event)
+        if stat is None:
+            stat = self.stats[event] = {'calls': 0, 'seconds': 0.0, 'over_budget': 0}
+        stat['calls'] += 1
+        stat['seconds'] += seconds
+        if seconds > FRAME_BUDGET:
+            stat['over_budget'] += 1
+        for key, value in data.items():
+            if isinstance(value, (int, float)):
+                stat[key] = stat.get(key, 0) + value
+
+        if self.hooks:
+            for callback in self.hooks.get(event, []) + self.hooks.get('*', []):
+                callback(event, seconds, data)
+
+    @contextmanager
+    def timed(self, event, **data):
+        """Замеряет время блока; в возвращаемый словарь можно дописать данные"""
+        start = time.perf_counter()
+        try:
+            yield data
+        finally:
+            self.record(event, time.perf_counter() - start, **data)
+
+    def rate(self, event, key):
+        """Накопленная скорость key/с по событию (например, строк в секунду)"""
+        stat = self.stats.get(event)
+        if not stat or not stat['seconds']:
+            return 0.0
+        return stat.get(key, 0) / stat['seconds']
+
+    def reset(self):
+        """Сбрасывает накопленные замеры"""
+        self.last.clear()
+        self.stats.clear()
+
+    def log_to(self, path):
+        """Пишет все события в файл JSON Lines для разбора пользовательских сессий"""
+        log = open(path, 'a', encoding='utf-8')
+
+        def write(event, seconds, data):
+            log.write(json.dumps({'t': time.time(), 'event': event, 'seconds': seconds,
+                                  **data}, ensure_ascii=False) + '\n')
+            log.flush()
+
+        self.add_hook('*', write)
+        return write
+
+
+monitor = PerfMonitor()
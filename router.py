@@ -0,0 +1,185 @@
+"""Ортогональная трассировка проводов по сетке холста.
+
+Провод идёт от выхода вправо до ближайшего узла сетки, дальше — по узлам
+сетки с шагом grid (той же, что рисуется на холсте), и в конце — к входу
+слева. Путь по узлам ищется A*: шаг стоит 1, поворот — BEND_COST, узел,
+через который уже проходит другой провод, — CROSS_COST, узел внутри
+корпуса элемента (их находит пространственный индекс) — BODY_COST, так что
+провод идёт сквозь элемент, только если обхода рядом нет: поиск не
+тратит время на доказательство, что пути нет. Очень длинные провода и
+провода, для которых путь не нашёлся за ROUTE_LIMIT шагов, идут
+Z-образно, без обхода препятствий.
+
+Трассы кэшируются по соединению вместе с обратным индексом «ячейка сетки
+-> провода», поэтому при перетаскивании элемента перекладываются только
+его провода и провода, трасса которых проходит через новое место элемента.
+"""
+import heapq
+import math
+
+from perf import monitor
+
+BEND_COST = 3  # цена поворота в шагах сетки
+CROSS_COST = 4  # цена узла, занятого другим проводом
+BODY_COST = 40  # цена узла внутри корпуса элемента: сквозь корпус — только если обхода нет
+ROUTE_MARGIN = 8  # на сколько узлов поиск может выйти за габарит концов провода
+ROUTE_LIMIT = 5000  # раскрытых узлов на провод, дальше — трасса без обхода препятствий
+ROUTE_SPAN = 40  # провода длиннее стольких шагов сетки идут без обхода препятствий
+GREEDY = 3  # вес эвристики A*: трасса чуть длиннее оптимальной, зато поиск в разы короче
+DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def simplify(points):
+    """Ломаная без повторов и промежуточных точек на прямых участках"""
+    result = []
+    for point in points:
+        if result and point == result[-1]:
+            continue
+        if len(result) >= 2:
+            (x0, y0), (x1, y1) = result[-2], result[-1]
+            if (x0 == x1 == point[0]) or (y0 == y1 == point[1]):
+                result[-1] = point
+                continue
+        result.append(point)
+    return result
+
+
+class Router:
+    """Кэш ортогональных трасс соединений"""
+
+    def __init__(self, spatial, grid=20):
+        self.spatial = spatial
+        self.grid = grid
+        self.routes = {}  # Connection -> [(x, y), ...] в мировых координатах
+        self.cells = {}  # (gx, gy) -> {Connection: None}, чьи трассы проходят через ячейку
+        self.owned = {}  # Connection -> ячейки его трассы
+
+    def path(self, conn):
+        """Трасса соединения: из кэша или проложенная заново"""
+        route = self.routes.get(conn)
+        if route is None:
+            route, searched = self.route(conn)
+            self.routes[conn] = route
+            # Z-трассы и так идут сквозь препятствия: перекладывать их, когда на
+            # них кладут элемент, незачем, и в обратный индекс они не попадают
+            self.owned[conn] = cells = self.route_cells(route) if searched else ()
+            for cell in cells:
+                self.cells.setdefault(cell, {})[conn] = None
+        return route
+
+    def forget(self, conn):
+        """Сбрасывает трассу соединения (удаление или перекладка)"""
+        if self.routes.pop(conn, None) is None:
+            return
+        for cell in self.owned.pop(conn):
+            owners = self.cells.get(cell)
+            if owners is not None:
+                owners.pop(conn, None)
+                if not owners:
+                    del self.cells[cell]
+
+    def touched(self, x0, y0, x1, y1):
+        """Соединения, трасса которых проходит через узлы сетки внутри прямоугольника"""
+        g = self.grid
+        found = {}
+        for gx in range(math.ceil(x0 / g), math.floor(x1 / g) + 1):
+            for gy in range(math.ceil(y0 / g), math.floor(y1 / g) + 1):
+                found.update(self.cells.get((gx, gy), ()))
+        return list(found)
+
+    def clear(self):
+        """Сбрасывает все трассы"""
+        self.routes = {}
+        self.cells = {}
+        self.owned = {}
+
+    def route_cells(self, route):
+        """Ячейки сетки под всеми отрезками трассы"""
+        g = self.grid
+        cells = set()
+        for (xa, ya), (xb, yb) in zip(route, route[1:]):
+            for gx in range(math.floor(min(xa, xb) / g), math.floor(max(xa, xb) / g) + 1):
+                for gy in range(math.floor(min(ya, yb) / g), math.floor(max(ya, yb) / g) + 1):
+                    cells.add((gx, gy))
+        return cells
+
+    def route(self, conn):
+        """Трасса соединения и признак, что она найдена поиском с обходом препятствий"""
+        with monitor.timed('route'):
+            g = self.grid
+            ox, oy = conn.src.get_output_port(conn.src_pin)
+            ix, iy = conn.dst.get_input_port(conn.dst_pin)
+            start = (math.floor(ox / g) + 1, round(oy / g))
+            goal = (math.ceil(ix / g) - 1, round(iy / g))
+            cells = None
+            if abs(goal[0] - start[0]) + abs(goal[1] - start[1]) <= ROUTE_SPAN:
+                cells = self.search(start, goal)
+            searched = cells is not None
+            if not searched:
+                # Обхода не нашлось: Z-образная трасса прямо через препятствия
+                middle = (start[0] + goal[0]) // 2
+                cells = [start, (middle, start[1]), (middle, goal[1]), goal]
+            points = [(ox, oy), (start[0] * g, oy)]
+            points += [(gx * g, gy * g) for gx, gy in cells]
+            points += [(goal[0] * g, iy), (ix, iy)]
+            return simplify(points), searched
+
+    def search(self, start, goal):
+        """A* по узлам сетки от start до goal; список узлов или None"""
+        occupied = self.cells
+        x_lo = min(start[0], goal[0]) - ROUTE_MARGIN
+        x_hi = max(start[0], goal[0]) + ROUTE_MARGIN
+        y_lo = min(start[1], goal[1]) - ROUTE_MARGIN
+        y_hi = max(start[1], goal[1]) + ROUTE_MARGIN
+        blocked = self.obstacles(x_lo, y_lo, x_hi, y_hi)
+        blocked.discard(start)
+        blocked.discard(goal)
+        gx, gy = goal
+
+        # Состояние — узел; направление прихода хранится для цены поворота.
+        # При равной оценке первым раскрывается более глубокий узел (-cost)
+        best = {start: 0}
+        came = {start: None}
+        heading = {start: 0}
+        done = set()
+        heap = [(0, 0, start)]
+        while heap and len(done) < ROUTE_LIMIT:
+            _, cost, cell = heapq.heappop(heap)
+            if cell == goal:
+                path = []
+                while cell is not None:
+                    path.append(cell)
+                    cell = came[cell]
+                return path[::-1]
+            if cell in done:
+                continue
+            done.add(cell)
+            cost, d = -cost, heading[cell]
+            for nd, (dx, dy) in enumerate(DIRECTIONS):
+                nxt = (cell[0] + dx, cell[1] + dy)
+                if nxt in done or not (x_lo <= nxt[0] <= x_hi and y_lo <= nxt[1] <= y_hi):
+                    continue
+                step = cost + 1
+                if nd != d:
+                    step += BEND_COST
+                if nxt in blocked:
+                    step += BODY_COST
+                if nxt in occupied:
+                    step += CROSS_COST
+                if step < best.get(nxt, step + 1):
+                    best[nxt] = step
+                    came[nxt] = cell
+                    heading[nxt] = nd
+                    heapq.heappush(heap, (step + GREEDY * (abs(nxt[0] - gx) + abs(nxt[1] - gy)),
+                                          -step, nxt))
+        return None
+
+    def obstacles(self, x_lo, y_lo, x_hi, y_hi):
+        """Узлы сетки в диапазоне, лежащие внутри корпусов элементов"""
+        g = self.grid
+        blocked = set()
+        for gate in self.spatial.query_rect(x_lo * g, y_lo * g, x_hi * g, y_hi * g):
+            for bx in range(math.ceil(gate.x / g), math.floor((gate.x + gate.width) / g) + 1):
+                for by in range(math.ceil(gate.y / g), math.floor((gate.y + gate.height) / g) + 1):
+                    blocked.add((bx, by))
+        return blocked
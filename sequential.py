@@ -0,0 +1,109 @@
+"""Потактовая симуляция схем с D-триггерами, регистрами и тактовыми генераторами.
+
+Схема компилируется один раз: по levelized netlist генерируется функция
+Python, которая в цикле вычисляет только комбинационную логику, влияющую на
+входы регистров, и обновляет состояние — по локальной переменной на цепь.
+Холст во время прогона не трогается; значения всех цепей восстанавливаются
+одним вызовом Netlist.evaluate, когда нужно обновить отображение.
+"""
+import time
+
+from codegen import cone, node_code
+from perf import monitor
+from waveform import trace
+
+STEP_SECONDS = 0.05  # длительность порции тактов в run_steps, с
+
+
+class SequentialSimulator:
+    """Потактовый симулятор с предкомпилированным расписанием вычислений"""
+
+    def __init__(self, netlist):
+        self.netlist = netlist
+        self.source = self.generate()
+        namespace = {'blocks': netlist.blocks}
+        exec(compile(self.source, '<sequential>', 'exec'), namespace)
+        self.step = namespace['run']
+
+    def schedule(self):
+        """Комбинационные элементы, от которых зависят входы регистров, в порядке уровней"""
+        netlist = self.netlist
+        return cone(netlist, [src for i in netlist.registers for src in netlist.fanin[i]])
+
+    def generate(self):
+        """Исходный код функции run(cycles, inputs, state) -> state"""
+        netlist = self.netlist
+        lines = ['def run(cycles, inputs, state):']
+        for k, i in enumerate(netlist.inputs):
+            lines.append(f"    n{i} = inputs[{k}]")
+        for k, i in enumerate(netlist.state_nodes):
+            lines.append(f"    n{i} = state[{k}]")
+
+        lines.append('    for _ in range(cycles):')
+        for i in self.schedule():
+            lines += node_code(netlist, i, indent='        ')
+
+        targets, updates = [], []
+        for i in netlist.state_nodes:
+            typ, srcs = netlist.types[i], netlist.fanin[i]
+            d = f"n{srcs[0]}" if srcs else '0'
+            if typ == 'DFF':
+                update = d
+            elif typ == 'REG':
+                update = f"({d} if n{srcs[1]} else n{i})" if len(srcs) > 1 else d
+            else:
+                update = f"1 ^ n{i}"
+            targets.append(f"n{i}")
+            updates.append(update)
+        if targets:
+            lines.append(f"        {', '.join(targets)}, = {', '.join(updates)},")
+        else:
+            lines.append('        pass')
+
+        lines.append(f"    return [{', '.join(targets)}]")
+        return '\n'.join(lines) + '\n'
+
+    def run(self, cycles, inputs, state):
+        """Выполняет cycles тактов при неизменных входах; возвращает новое состояние"""
+        start = time.perf_counter()
+        state = self.step(cycles, [int(v) for v in inputs], [int(v) for v in state])
+        monitor.record('sequential', time.perf_counter() - start, cycles=cycles)
+        return state
+
+    def run_steps(self, cycles, inputs, state, sync=0, recorder=None, seconds=STEP_SECONDS):
+        """Прогон cycles тактов порциями около seconds для фоновой задачи.
+
+        После каждой порции выдаёт (доля готового, (тактов выполнено,
+        состояние)). Порции не переходят через такты, кратные sync, чтобы
+        отображение обновлялось ровно на них; с recorder (WaveformBuffer или
+        VCDWriter) записывается каждый такт.
+        """
+        done = 0
+        chunk = 1000
+        while done < cycles:
+            chunk = min(chunk, cycles - done)
+            if sync:
+                chunk = min(chunk, sync - done % sync)
+            start = time.perf_counter()
+            if recorder is not None:
+                state = trace(self.netlist, chunk, inputs, state, recorder)
+            else:
+                state = self.run(chunk, inputs, state)
+            elapsed = time.perf_counter() - start
+            done += chunk
+            yield done / cycles, (done, state)
+            # Следующая порция — под заданную длительность, но не больше чем вчетверо
+            chunk = max(1, min(chunk * 4, int(chunk * seconds / max(elapsed, 1e-6))))
+
+    def values(self, inputs, state):
+        """Значения всех цепей для отображения при заданном состоянии"""
+        return self.netlist.evaluate([int(v) for v in inputs], 1, [int(v) for v in state])
+
+
+def cycles_per_second(netlist, cycles=100000):
+    """Пропускная способность потактовой симуляции, тактов в секунду"""
+    sim = SequentialSimulator(netlist)
+    state = [0] * len(netlist.state_nodes)
+    start = time.perf_counter()
+    sim.run(cycles, [0] * len(netlist.inputs), state)
+    return cycles / (time.perf_counter() - start)
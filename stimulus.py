@@ -0,0 +1,207 @@
+"""Случайная (или заданная) стимуляция схем, слишком широких для перебора.
+
+Наборы входов упаковываются по битам: бит j слова входа p — значение входа
+p в наборе j. Пачка из BATCH наборов проходит через ядро codegen за один
+вызов, который возвращает слова всех элементов; по ним накапливается
+статистика на элемент:
+
+- вероятность единицы (доля наборов, где значение 1);
+- число переключений между соседними наборами (оценка активности);
+- было ли значение хоть раз 0 и хоть раз 1 (покрытие выходов).
+
+С NumPy слово — массив uint64 на BATCH / 64 элементов, без NumPy — большой
+int; ядро одно и то же. Состояние регистров и тактовых генераторов — 0.
+"""
+import csv
+import random
+import time
+
+from perf import monitor
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy — те же вычисления на больших int
+    np = None
+
+BATCH = 1 << 16  # наборов в одном проходе ядра
+
+
+def popcount(words):
+    """Число единиц: в int или в каждой строке двумерного массива uint64"""
+    if np is None:
+        return words.bit_count()
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(words.view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def lane_mask(count):
+    """Маска count наборов в формате слов текущего режима"""
+    if np is None:
+        return (1 << count) - 1
+    mask = np.full((count + 63) // 64, np.iinfo(np.uint64).max, dtype=np.uint64)
+    if count % 64:
+        mask[-1] = np.uint64((1 << count % 64) - 1)
+    return mask
+
+
+def random_words(n, count, rng):
+    """n случайных слов по count наборов"""
+    if np is None:
+        return [rng.getrandbits(count) for _ in range(n)]
+    mask = lane_mask(count)
+    return list(rng.integers(0, np.iinfo(np.uint64).max, size=(n, len(mask)),
+                             dtype=np.uint64, endpoint=True) & mask)
+
+
+def pack_vectors(vectors, n):
+    """Слова входов по наборам: строкам "0110", кортежам 0/1 или массиву (наборы × входы)"""
+    if np is not None:
+        bits = np.asarray([[c == '1' for c in v] if isinstance(v, str) else v for v in vectors]
+                          if not isinstance(vectors, np.ndarray) else vectors, dtype=bool)
+        if bits.ndim != 2 or bits.shape[1] != n:
+            raise ValueError(f"ожидается {n} значений входов в каждом наборе")
+        count = len(bits)
+        padded = np.zeros((-(-count // 64) * 64, n), dtype=bool)
+        padded[:count] = bits
+        packed = np.packbits(padded, axis=0, bitorder='little')
+        return list(np.ascontiguousarray(packed.T).view('<u8').astype(np.uint64))
+
+    rows = [v if isinstance(v, str) else ''.join('1' if b else '0' for b in v) for v in vectors]
+    if any(len(row) != n for row in rows):
+        raise ValueError(f"ожидается {n} значений входов в каждом наборе")
+    return [int(''.join(row[p] for row in reversed(rows)) or '0', 2) for p in range(n)]
+
+
+class Coverage:
+    """Накопленная статистика по элементам netlist"""
+
+    def __init__(self, netlist):
+        self.netlist = netlist
+        n = len(netlist.types)
+        self.vectors = 0
+        zeros = [0] * n if np is None else np.zeros(n, dtype=np.int64)
+        self.ones = zeros  # в скольких наборах значение было 1
+        self.toggles = zeros.copy()  # переключений между соседними наборами
+        self.last = None  # значения в последнем наборе предыдущей пачки
+        self.seconds = 0.0
+
+    def add(self, values, count):
+        """Учитывает пачку из count наборов: values — слова всех элементов"""
+        mask = lane_mask(count)
+        if np is None:
+            last = []
+            for i, word in enumerate(values):
+                word &= mask
+                self.ones[i] += word.bit_count()
+                # Пары соседних наборов: бит j и бит j + 1
+                self.toggles[i] += ((word ^ (word >> 1)) & (mask >> 1)).bit_count()
+                if self.last is not None:
+                    self.toggles[i] += self.last[i] ^ (word & 1)
+                last.append(word >> (count - 1) & 1)
+            self.last = last
+            self.vectors += count
+            return
+
+        # Все элементы разом: строка матрицы — слово одного элемента. Ядро не
+        # выходит за mask, поэтому слова уже без мусора в лишних битах
+        one = np.uint64(1)
+        words = np.empty((len(values), len(mask)), dtype=np.uint64)
+        for i, word in enumerate(values):
+            words[i] = word
+        self.ones += popcount(words)
+        # Набор j + 1 напротив набора j, в том числе через границу элементов массива
+        shifted = words >> one
+        shifted[:, :-1] |= words[:, 1:] << np.uint64(63)
+        top = np.uint64((count - 1) % 64)
+        pairs = mask.copy()
+        pairs[-1] ^= one << top
+        self.toggles += popcount((words ^ shifted) & pairs)
+        if self.last is not None:
+            self.toggles += (self.last ^ (words[:, 0] & one)).astype(np.int64)
+        self.last = (words[:, -1] >> top) & one
+        self.vectors += count
+
+    def probability(self):
+        """Вероятность единицы на элементе"""
+        return [ones / self.vectors if self.vectors else 0.0 for ones in self.ones]
+
+    def seen(self):
+        """(было 0, было 1) для каждого элемента"""
+        return [(ones < self.vectors, ones > 0) for ones in self.ones]
+
+    def uncovered_outputs(self):
+        """Номера OUT (с 0), которые ни разу не приняли одно из значений"""
+        return [k for k, i in enumerate(self.netlist.outputs)
+                if self.ones[i] in (0, self.vectors)]
+
+    def arrays(self):
+        """Статистика как массивы NumPy (или списки без NumPy)"""
+        seen = self.seen()
+        data = {'probability': self.probability(), 'toggles': self.toggles,
+                'ones': self.ones, 'seen0': [s[0] for s in seen], 'seen1': [s[1] for s in seen]}
+        if np is not None:
+            data = {key: np.asarray(value) for key, value in data.items()}
+        return data
+
+    def save(self, path):
+        """Экспорт статистики: .npz (нужен NumPy) или CSV по строке на элемент"""
+        data = self.arrays()
+        if path.lower().endswith('.npz'):
+            if np is None:
+                raise ValueError("для экспорта в .npz нужен NumPy")
+            np.savez(path, types=np.asarray(self.netlist.types), vectors=self.vectors, **data)
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['node', 'type'] + list(data))
+            for i, typ in enumerate(self.netlist.types):
+                writer.writerow([i, typ] + [round(float(data['probability'][i]), 6)] +
+                                [int(data[key][i]) for key in list(data)[1:]])
+
+
+def stimulus_steps(coverage, words_for, total, batch=BATCH):
+    """Прогон total наборов пачками в coverage; после каждой пачки выдаёт число готовых наборов.
+
+    Для фоновых задач: между пачками можно показать промежуточную статистику
+    или остановить прогон.
+    """
+    kernel = coverage.netlist.kernel(all_nodes=True)
+    start = time.perf_counter() - coverage.seconds
+    done = 0
+    while done < total:
+        count = min(batch, total - done)
+        values = kernel.evaluate(words_for(done, count), lane_mask(count))
+        coverage.add(values, count)
+        done += count
+        coverage.seconds = time.perf_counter() - start
+        yield done
+
+
+def run_stimulus(netlist, words_for, total, batch=BATCH, progress=None):
+    """Прогоняет total наборов пачками; words_for(start, count) даёт слова входов"""
+    coverage = Coverage(netlist)
+    for done in stimulus_steps(coverage, words_for, total, batch):
+        if progress is not None:
+            progress(done, total)
+    monitor.record('stimulus', coverage.seconds, vectors=total, gates=len(netlist.types))
+    return coverage
+
+
+def random_inputs(n, seed=None):
+    """words_for(start, count) для равномерно случайных наборов n входов"""
+    rng = random.Random(seed) if np is None else np.random.default_rng(seed)
+    return lambda start, count: random_words(n, count, rng)
+
+
+def simulate_random(netlist, vectors, seed=None, batch=BATCH, progress=None):
+    """Статистика по vectors равномерно случайным наборам входов"""
+    return run_stimulus(netlist, random_inputs(len(netlist.inputs), seed), vectors, batch,
+                        progress)
+
+
+def simulate_vectors(netlist, vectors, batch=BATCH, progress=None):
+    """Статистика по заданным наборам (строки "0110", кортежи 0/1 или массив NumPy)"""
+    n = len(netlist.inputs)
+    return run_stimulus(netlist, lambda start, count: pack_vectors(vectors[start:start + count], n),
+                        len(vectors), batch, progress)
@@ -0,0 +1,149 @@
+"""Наивная модель схем для тестов: вычисление по Gate и Connection напрямую.
+
+Не использует Netlist, левелизацию и codegen — с ней сверяются все
+быстрые пути. Регистры и тактовые генераторы равны 0, как в таблице
+истинности и стимуляции.
+"""
+import itertools
+
+from blocks import BlockDef
+from circuit_core import Connection, Gate
+from generators import (array_multiplier, carry_lookahead_adder, counter, parity_tree,
+                        random_dag, ripple_carry_adder)
+
+
+def gate_function(typ, args):
+    """Значение элемента typ по значениям его входов (0/1)"""
+    if typ == 'OUT':
+        return args[0] if args else 0
+    if typ == 'NOT':
+        return 1 - args[0] if args else 1
+    if typ in ('AND', 'NAND'):
+        value = int(all(args))
+    elif typ in ('OR', 'NOR'):
+        value = int(any(args))
+    elif typ == 'XOR':
+        value = sum(args) % 2
+    else:
+        raise ValueError(typ)
+    return 1 - value if typ in ('NAND', 'NOR') else value
+
+
+def naive_outputs(gates, connections, bits, stuck=None):
+    """Значения OUT (в порядке gates) при значениях bits на IN (в порядке gates).
+
+    stuck — (элемент, значение): выход элемента залип в значении.
+    """
+    sources = {gate: [] for gate in gates}
+    for conn in connections:
+        sources[conn.dst].append(conn.src)
+    inputs = dict(zip([gate for gate in gates if gate.type == 'IN'], bits))
+    values = {}
+
+    def value(gate):
+        if gate not in values:
+            if stuck is not None and gate is stuck[0]:
+                values[gate] = stuck[1]
+            elif gate.type == 'IN':
+                values[gate] = inputs[gate]
+            elif gate.type in ('DFF', 'REG', 'CLK'):
+                values[gate] = 0
+            else:
+                values[gate] = gate_function(gate.type, [value(src) for src in sources[gate]])
+        return values[gate]
+
+    return tuple(value(gate) for gate in gates if gate.type == 'OUT')
+
+
+def truth_table(gates, connections, stuck=None):
+    """Строки таблицы истинности; первый IN — старший бит номера строки"""
+    n = sum(gate.type == 'IN' for gate in gates)
+    return [naive_outputs(gates, connections, bits, stuck)
+            for bits in itertools.product((0, 1), repeat=n)]
+
+
+def degenerate_circuit():
+    """Элементы без входов, повторённые входы и константы — для свёртки в optimize"""
+    a, b = Gate('IN', 0, 0), Gate('IN', 0, 0)
+    gates = [a, b]
+    connections = []
+
+    def gate(typ, *srcs):
+        node = Gate(typ, 0, 0)
+        gates.append(node)
+        connections.extend(Connection(src, node) for src in srcs)
+        return node
+
+    one = gate('AND')
+    zero = gate('OR')
+    same = gate('XOR', a, a)
+    both = gate('NAND', a, a, b)
+    neg = gate('NOT', gate('NOT', b))
+    for node in (one, zero, same, both, neg, gate('NOR', zero, a), gate('AND', one, b),
+                 gate('XOR', one, both), gate('NOT'), gate('OR', neg, same)):
+        gate('OUT', node)
+    gate('OUT')
+    return gates, connections
+
+
+def small_circuits():
+    """[(имя, gates, connections)] — схемы с полной таблицей из не более 64 строк"""
+    circuits = [
+        ('ripple2', ripple_carry_adder(2)),
+        ('cla2', carry_lookahead_adder(2, group=2)),
+        ('mult3', array_multiplier(3)),
+        ('parity6', parity_tree(6)),
+        ('counter3', counter(3, enable=True)),
+        ('degenerate', degenerate_circuit()),
+    ]
+    circuits += [(f'random{seed}', random_dag(40, inputs=6, depth=6, seed=seed, outputs=5))
+                 for seed in range(8)]
+    return [(name, gates, connections) for name, (gates, connections) in circuits]
+
+
+class Builder:
+    """Схема из Gate и Connection с номерами портов"""
+
+    def __init__(self):
+        self.gates = []
+        self.connections = []
+
+    def gate(self, typ, *srcs, block=None):
+        """Элемент с входами srcs: элемент или (элемент, номер выхода)"""
+        node = Gate(typ, 0, 0)
+        if block is not None:
+            node.set_block(block)
+        self.gates.append(node)
+        for pin, src in enumerate(srcs):
+            src, src_pin = src if isinstance(src, tuple) else (src, 0)
+            self.connections.append(Connection(src, node, src_pin, pin))
+        return node
+
+
+def block_circuit():
+    """Двухразрядный сумматор из блоков «полный сумматор», собранных из блоков «полусумматор».
+
+    Возвращает (gates, connections, {имя: BlockDef}).
+    """
+    inner = Builder()
+    a, b = inner.gate('IN'), inner.gate('IN')
+    inner.gate('OUT', inner.gate('XOR', a, b))
+    inner.gate('OUT', inner.gate('AND', a, b))
+    half = BlockDef('half', inner.gates, inner.connections)
+
+    inner = Builder()
+    a, b, c = inner.gate('IN'), inner.gate('IN'), inner.gate('IN')
+    first = inner.gate('BLK', a, b, block=half)
+    second = inner.gate('BLK', first, c, block=half)
+    inner.gate('OUT', second)
+    inner.gate('OUT', inner.gate('OR', (first, 1), (second, 1)))
+    full = BlockDef('full', inner.gates, inner.connections)
+
+    top = Builder()
+    a0, a1, b0, b1, carry = (top.gate('IN') for _ in range(5))
+    low = top.gate('BLK', a0, b0, carry, block=full)
+    high = top.gate('BLK', a1, b1, (low, 1), block=full)
+    for src in (low, high, (high, 1)):
+        top.gate('OUT', src)
+    carry.value = True
+    return top.gates, top.connections, {'half': half, 'full': full}
@@ -0,0 +1,59 @@
+import pytest
+
+import bdd
+from bdd import ORDER_HEURISTICS, CircuitBDD, equivalent
+from circuit_core import Connection, Gate, Netlist
+from reference import small_circuits, truth_table
+
+CIRCUITS = small_circuits()
+
+
+def ones(rows, k):
+    """Номера строк, где выход k равен 1"""
+    return {row for row, outputs in enumerate(rows) if outputs[k]}
+
+
+def cube_rows(cube):
+    """Номера строк, покрытых кубом '01-'"""
+    rows = [0]
+    for char in cube:
+        rows = [row << 1 | bit for row in rows for bit in ((0, 1) if char == '-' else (int(char),))]
+    return set(rows)
+
+
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+@pytest.mark.parametrize('order', ORDER_HEURISTICS + ('best',))
+def test_sat_count_and_cubes(name, gates, connections, order):
+    rows = truth_table(gates, connections)
+    circuit = CircuitBDD(Netlist.from_circuit(gates, connections), order)
+    for k in range(len(rows[0])):
+        assert circuit.sat_count(k) == len(ones(rows, k))
+        cubes = [cube_rows(cube) for cube in circuit.cube_strings(k)]
+        assert sum(map(len, cubes)) == len(ones(rows, k))  # кубы не пересекаются
+        assert set().union(*cubes) == ones(rows, k)
+
+
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+def test_garbage_collection(monkeypatch, name, gates, connections):
+    # Сборка после каждого элемента: освобождённые узлы не должны попасть в ответ
+    monkeypatch.setattr(bdd, 'GC_THRESHOLD', 0)
+    rows = truth_table(gates, connections)
+    circuit = CircuitBDD(Netlist.from_circuit(gates, connections))
+    assert circuit.bdd.collections > 0
+    for k in range(len(rows[0])):
+        assert circuit.sat_count(k) == len(ones(rows, k))
+
+
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+def test_equivalent_counterexample(name, gates, connections):
+    netlist = Netlist.from_circuit(gates, connections)
+    assert equivalent(netlist, netlist) is None
+
+    # Инвертор перед последним выходом — контрпример есть в любой строке
+    out = [gate for gate in gates if gate.type == 'OUT'][-1]
+    inverter = Gate('NOT', 0, 0)
+    changed = [Connection(conn.src, inverter) if conn.dst is out else conn for conn in connections]
+    changed.append(Connection(inverter, out))
+    k, row = equivalent(netlist, Netlist.from_circuit(gates + [inverter], changed))
+    before = truth_table(gates, connections)[row]
+    assert before[k] != truth_table(gates + [inverter], changed)[row][k]
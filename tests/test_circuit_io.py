@@ -0,0 +1,78 @@
+import itertools
+import random
+
+import pytest
+
+from circuit_core import Netlist
+from circuit_io import load_circuit, merge_blocks, save_circuit
+from reference import block_circuit, small_circuits, truth_table
+
+CIRCUITS = [(name, gates, connections, {}) for name, gates, connections in small_circuits()]
+CIRCUITS.append(('blocks',) + block_circuit())
+
+
+def table(gates, connections):
+    netlist = Netlist.from_circuit(gates, connections)
+    return [tuple(values[i] for i in netlist.outputs)
+            for bits in itertools.product((0, 1), repeat=len(netlist.inputs))
+            for values in [netlist.evaluate(list(bits))]]
+
+
+def structure(gates, connections):
+    """Всё, что сохраняется в файл, в сравнимом виде; блоки — по имени и содержимому"""
+    index = {gate: i for i, gate in enumerate(gates)}
+
+    def block(definition):
+        if definition is None:
+            return None
+        return definition.name, structure(definition.gates, definition.connections)
+
+    return ([(g.type, g.x, g.y, g.value, block(g.block)) for g in gates],
+            [(index[c.src], index[c.dst], c.src_pin, c.dst_pin) for c in connections])
+
+
+@pytest.mark.parametrize('suffix', ['.lcb', '.json'])
+@pytest.mark.parametrize('name, gates, connections, library', CIRCUITS)
+def test_round_trip(tmp_path, suffix, name, gates, connections, library):
+    rnd = random.Random(name)
+    for gate in gates:
+        gate.value = gate.value or rnd.random() < 0.5
+        gate.x, gate.y = rnd.randrange(-500, 5000), rnd.randrange(-500, 5000)
+    path = str(tmp_path / ('circuit' + suffix))
+    save_circuit(path, gates, connections, library.values())
+    loaded = {}
+    copy = load_circuit(path, loaded)
+    assert structure(*copy) == structure(gates, connections)
+    assert sorted(loaded) == sorted(library)
+    assert table(*copy) == table(gates, connections)
+    if not library:
+        assert truth_table(*copy) == truth_table(gates, connections)
+
+
+def test_block_circuit_adds():
+    gates, connections, _ = block_circuit()
+    # Входы a0 a1 b0 b1 cin, выходы s0 s1 cout
+    for row, outputs in enumerate(table(gates, connections)):
+        a0, a1, b0, b1, carry = (row >> k & 1 for k in range(4, -1, -1))
+        total = a0 + 2 * a1 + b0 + 2 * b1 + carry
+        assert outputs == (total & 1, total >> 1 & 1, total >> 2)
+
+
+def test_merge_reuses_identical_blocks():
+    library = block_circuit()[2]
+    gates, connections, loaded = block_circuit()
+    assert merge_blocks(library, loaded, gates) == []
+    assert {gate.block for gate in gates if gate.block is not None} == {library['full']}
+    assert set(library) == {'half', 'full'}
+
+
+def test_merge_renames_clashing_blocks():
+    gates, connections, library = block_circuit()
+    full = library['full']
+    # Другая функция под именем half: вложенный half и использующий его full переименовываются
+    other, _, loaded = block_circuit()
+    loaded['half'].gates[2].type = 'OR'
+    renamed = merge_blocks(library, loaded, other)
+    assert renamed == [('half', 'half (2)'), ('full', 'full (2)')]
+    assert library['full'] is full and all(gate.block in (None, full) for gate in gates)
+    assert library['half (2)'] is loaded['half'] and library['full (2)'] is loaded['full']
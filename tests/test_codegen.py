@@ -0,0 +1,122 @@
+import itertools
+
+import pytest
+
+from blocks import BlockDef, copy_circuit
+from circuit_core import Connection, Gate, Netlist
+from codegen import compile_netlist
+from generators import counter
+from reference import block_circuit, small_circuits, truth_table
+
+CIRCUITS = small_circuits()
+
+
+def words_of(n):
+    """Слова входов, в которых бит j — строка j таблицы истинности"""
+    rows = list(itertools.product((0, 1), repeat=n))
+    return [sum(bits[k] << row for row, bits in enumerate(rows)) for k in range(n)]
+
+
+def unpack(words, rows):
+    """Слова по строкам таблицы -> кортежи значений"""
+    return [tuple(int(word) >> row & 1 for word in words) for row in range(rows)]
+
+
+def evaluate_table(netlist, state=()):
+    """Таблица всех узлов через Netlist.evaluate, строка за строкой"""
+    return [netlist.evaluate(list(bits), 1, state)
+            for bits in itertools.product((0, 1), repeat=len(netlist.inputs))]
+
+
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+def test_kernel_matches_reference(name, gates, connections):
+    expected = truth_table(gates, connections)
+    netlist = Netlist.from_circuit(gates, connections)
+    n = len(netlist.inputs)
+    rows = evaluate_table(netlist)
+    assert [tuple(values[i] for i in netlist.outputs) for values in rows] == expected
+
+    # Все строки одним битово-параллельным проходом скомпилированного ядра
+    mask = (1 << (1 << n)) - 1
+    assert unpack(netlist.table_block(0, n), 1 << n) == expected
+    assert unpack(netlist.kernel().evaluate(words_of(n), mask), 1 << n) == expected
+    # all_nodes — значения каждого узла, как в evaluate
+    words = netlist.kernel(all_nodes=True).evaluate(words_of(n), mask)
+    assert unpack(words, 1 << n) == [tuple(values) for values in rows]
+
+
+@pytest.mark.parametrize('enable', [False, True])
+def test_kernel_state(enable):
+    # Состояние регистров — входы ядра: все сочетания, а не только нулевое
+    netlist = Netlist.from_circuit(*counter(3, enable))
+    n = len(netlist.inputs)
+    kernel = netlist.kernel(all_nodes=True)
+    for state in itertools.product((0, 1), repeat=len(netlist.state_nodes)):
+        mask = (1 << (1 << n)) - 1
+        words = kernel.evaluate(words_of(n), mask, [mask if bit else 0 for bit in state])
+        assert unpack(words, 1 << n) == [tuple(v) for v in evaluate_table(netlist, state)]
+
+
+def test_cache_reuses_kernel():
+    name, gates, connections = CIRCUITS[0]
+    first = compile_netlist(Netlist.from_circuit(gates, connections))
+    # Та же топология, собранная заново, — то же скомпилированное ядро
+    again = compile_netlist(Netlist.from_circuit(*copy_circuit(gates, connections)))
+    assert again.function is first.function
+    assert compile_netlist(Netlist.from_circuit(gates, connections), cache=False).function \
+        is not first.function
+    other = compile_netlist(Netlist.from_circuit(*CIRCUITS[1][1:]))
+    assert other.key != first.key
+
+
+def test_cache_tells_wiring_apart():
+    # Одинаковые типы элементов, но инвертор подключён к разным входам
+    for src in range(2):
+        gates = [Gate('IN', 0, 0), Gate('IN', 0, 0), Gate('NOT', 0, 0), Gate('OUT', 0, 0)]
+        connections = [Connection(gates[src], gates[2]), Connection(gates[2], gates[3])]
+        kernel = Netlist.from_circuit(gates, connections).kernel()
+        assert unpack(kernel.evaluate(words_of(2), 0b1111), 4) == truth_table(gates, connections)
+
+
+def test_cache_with_other_blocks():
+    gates, connections, library = block_circuit()
+    netlist = Netlist.from_circuit(gates, connections)
+
+    # Те же связи, но в полусумматоре OR вместо AND: ядро общее, а блоки — свои
+    half_gates, half_connections = copy_circuit(library['half'].gates,
+                                                library['half'].connections)
+    for gate in half_gates:
+        if gate.type == 'AND':
+            gate.type = 'OR'
+    half = BlockDef('half', half_gates, half_connections)
+    full_gates, full_connections = copy_circuit(library['full'].gates,
+                                                library['full'].connections)
+    for gate in full_gates:
+        if gate.block is not None:
+            gate.set_block(half)
+    full = BlockDef('full', full_gates, full_connections)
+    other_gates, other_connections = copy_circuit(gates, connections)
+    for gate in other_gates:
+        if gate.block is not None:
+            gate.set_block(full)
+    other = Netlist.from_circuit(other_gates, other_connections)
+
+    kernel, other_kernel = netlist.kernel(), other.kernel()
+    assert other_kernel.function is kernel.function
+    n = len(netlist.inputs)
+    mask = (1 << (1 << n)) - 1
+    for net, k in ((netlist, kernel), (other, other_kernel)):
+        assert unpack(k.evaluate(words_of(n), mask), 1 << n) == \
+            [tuple(values[i] for i in net.outputs) for values in evaluate_table(net)]
+    assert kernel.evaluate(words_of(n), mask) != other_kernel.evaluate(words_of(n), mask)
+
+
+def test_numpy_words():
+    np = pytest.importorskip('numpy')
+    name, gates, connections = [circuit for circuit in CIRCUITS if circuit[0] == 'mult3'][0]
+    netlist = Netlist.from_circuit(gates, connections)
+    n = len(netlist.inputs)
+    # 64 строки таблицы в одном uint64 на вход
+    words = [np.array([word], dtype=np.uint64) for word in words_of(n)]
+    outputs = netlist.kernel().evaluate(words, np.uint64((1 << 64) - 1))
+    assert unpack([word[0] for word in outputs], 1 << n) == truth_table(gates, connections)
@@ -0,0 +1,99 @@
+import itertools
+
+import pytest
+
+import faults
+from blocks import BlockDef
+from circuit_core import Connection, Gate, Netlist
+from faults import simulate_faults_random, simulate_faults_table, simulate_faults_vectors
+from reference import naive_outputs, small_circuits, truth_table
+
+CIRCUITS = small_circuits()
+DETECTABLE = {}  # имя схемы -> detectable: перебор медленный, а схема проверяется дважды
+
+
+def detectable(name, gates, connections):
+    """Неисправности (номер элемента, значение), которые меняет хоть одна строка таблицы"""
+    if name in DETECTABLE:
+        return DETECTABLE[name]
+    good = truth_table(gates, connections)
+    DETECTABLE[name] = {(i, value) for i, gate in enumerate(gates) if gate.type != 'OUT'
+                        for value in (0, 1)
+                        if truth_table(gates, connections, (gate, value)) != good}
+    return DETECTABLE[name]
+
+
+@pytest.mark.parametrize('group', [faults.FAULT_GROUP, 7])
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+def test_table_matches_brute_force(monkeypatch, name, gates, connections, group):
+    # Маленькие группы проверяют упаковку в несколько групп и перепаковку
+    monkeypatch.setattr(faults, 'FAULT_GROUP', group)
+    simulation = simulate_faults_table(Netlist.from_circuit(gates, connections))
+    found = {simulation.faults[k] for k in simulation.detected}
+    assert found == detectable(name, gates, connections)
+    assert set(simulation.undetected()) == set(simulation.faults) - found
+    assert simulation.coverage() == len(found) / len(simulation.faults)
+    for i, (found0, found1) in simulation.node_status().items():
+        assert (found0, found1) == ((i, 0) in found, (i, 1) in found)
+
+
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+def test_first_detecting_vector(name, gates, connections):
+    netlist = Netlist.from_circuit(gates, connections)
+    vectors = list(itertools.product((0, 1), repeat=len(netlist.inputs)))[::-1]
+    simulation = simulate_faults_vectors(netlist, vectors)
+    for k, vector in simulation.detected.items():
+        i, value = simulation.faults[k]
+
+        def differs(bits):
+            return naive_outputs(gates, connections, bits, (gates[i], value)) != \
+                naive_outputs(gates, connections, bits)
+
+        assert differs(vectors[vector])
+        assert not any(differs(bits) for bits in vectors[:vector])
+
+
+def test_random_vectors():
+    name, gates, connections = [circuit for circuit in CIRCUITS if circuit[0] == 'mult3'][0]
+    netlist = Netlist.from_circuit(gates, connections)
+    first = simulate_faults_random(netlist, 200, seed=1)
+    assert first.coverage() == 1.0
+    # Прогон кончается, как только обнаружено всё наблюдаемое
+    assert first.vectors < 200
+    assert first.detected == simulate_faults_random(netlist, 200, seed=1).detected
+
+
+def test_sequential_stops_early():
+    name, gates, connections = [circuit for circuit in CIRCUITS if circuit[0] == 'counter3'][0]
+    netlist = Netlist.from_circuit(gates, connections)
+    simulation = simulate_faults_random(netlist, 1000, seed=1)
+    # Залипание регистра в 0 при нулевом состоянии ненаблюдаемо и не держит прогон до конца
+    assert not simulation.pending
+    assert simulation.vectors < 1000
+    assert simulation.unobservable >= len(netlist.state_nodes)
+
+
+def test_table_input_limit():
+    gates = [Gate('IN', 0, 0) for _ in range(faults.TABLE_INPUTS + 1)]
+    gates.append(Gate('OUT', 0, 0))
+    with pytest.raises(ValueError):
+        simulate_faults_table(Netlist.from_circuit(gates, [Connection(gates[0], gates[-1])]))
+
+
+def test_block_outputs():
+    a, b, s, c = Gate('IN', 0, 0), Gate('IN', 0, 0), Gate('XOR', 0, 0), Gate('AND', 0, 0)
+    inner = [a, b, s, c, Gate('OUT', 0, 0), Gate('OUT', 0, 0)]
+    half = BlockDef('half', inner, [Connection(a, s), Connection(b, s), Connection(a, c),
+                                    Connection(b, c), Connection(s, inner[4]),
+                                    Connection(c, inner[5])])
+    x, y, block = Gate('IN', 0, 0), Gate('IN', 0, 0), Gate('BLK', 0, 0)
+    block.block = half
+    block.pin_values = [False, False]
+    outs = [Gate('OUT', 0, 0), Gate('OUT', 0, 0)]
+    netlist = Netlist.from_circuit([x, y, block] + outs, [
+        Connection(x, block), Connection(y, block, 0, 1),
+        Connection(block, outs[0]), Connection(block, outs[1], 1, 0)])
+    simulation = simulate_faults_table(netlist)
+    # Оба выхода блока — отдельные места неисправностей, и обе наблюдаемы
+    assert {i for i, _ in simulation.faults} == {0, 1, 2} | set(netlist.pins)
+    assert simulation.coverage() == 1.0
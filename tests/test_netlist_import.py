@@ -0,0 +1,121 @@
+import itertools
+
+import pytest
+
+from netlist_import import read_structural
+from reference import truth_table
+
+# (строки .names над входами a b c, функция, тип элемента выхода или None)
+COVERS = [
+    ('and', ['11- 1'], lambda a, b, c: a & b, 'AND'),
+    ('nand', ['11- 0'], lambda a, b, c: 1 - (a & b), 'NAND'),
+    ('or', ['1-- 1', '-1- 1', '--1 1'], lambda a, b, c: a | b | c, 'OR'),
+    ('nor', ['00- 1'], lambda a, b, c: 1 - (a | b), 'NOR'),
+    ('nor_offset', ['1-- 0', '-1- 0'], lambda a, b, c: 1 - (a | b), 'NOR'),
+    ('not', ['0-- 1'], lambda a, b, c: 1 - a, 'NOT'),
+    ('buffer', ['-1- 1'], lambda a, b, c: b, 'AND'),
+    ('xor', ['10- 1', '01- 1'], lambda a, b, c: a ^ b, 'OR'),  # с '-' — общее покрытие
+    ('xor3', ['100 1', '010 1', '001 1', '111 1'], lambda a, b, c: a ^ b ^ c, 'XOR'),
+    ('xnor3', ['100 0', '010 0', '001 0', '111 0'], lambda a, b, c: 1 - (a ^ b ^ c), 'NOT'),
+    ('mixed_cube', ['10- 1'], lambda a, b, c: a & (1 - b), 'AND'),
+    ('mixed_cube_off', ['1-0 0'], lambda a, b, c: 1 - (a & (1 - c)), 'NAND'),
+    ('majority', ['11- 1', '1-1 1', '-11 1'], lambda a, b, c: int(a + b + c >= 2), 'OR'),
+    ('mux', ['1-1 1', '01- 1'], lambda a, b, c: c if a else b, 'OR'),
+    ('mux_offset', ['1-0 0', '00- 0'], lambda a, b, c: 1 - (1 - c if a else 1 - b), 'NOR'),
+    ('const1', ['--- 1'], lambda a, b, c: 1, 'AND'),
+    ('const0', [], lambda a, b, c: 0, 'OR'),
+]
+
+
+def load(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return read_structural(str(path)).to_circuit()
+
+
+def check(gates, connections, functions):
+    rows = truth_table(gates, connections)
+    expected = [tuple(f(*bits) for f in functions)
+                for bits in itertools.product((0, 1), repeat=3)]
+    assert rows == expected
+
+
+@pytest.mark.parametrize('name, rows, function, typ', COVERS)
+def test_blif_cover(tmp_path, name, rows, function, typ):
+    text = ".model t\n.inputs a b c\n.outputs y\n.names a b c y\n" + ''.join(
+        row + '\n' for row in rows) + ".end\n"
+    gates, connections = load(tmp_path, 't.blif', text)
+    check(gates, connections, [function])
+    driver = [conn.src for conn in connections if conn.dst.type == 'OUT'][0]
+    assert driver.type == typ
+
+
+def test_blif_syntax(tmp_path):
+    text = """# комментарий
+.model t
+.inputs a b \\
+  c
+.outputs y z
+.names a b t   # промежуточная цепь объявлена после использования
+11 1
+.names t c y
+1- 1
+-1 1
+.names c z
+0 1
+.end
+"""
+    gates, connections = load(tmp_path, 't.blif', text)
+    check(gates, connections, [lambda a, b, c: (a & b) | c, lambda a, b, c: 1 - c])
+
+
+@pytest.mark.parametrize('text, message', [
+    (".inputs a\n.outputs y\n.names a y\n1 1\n.names a y\n0 1\n", "несколько источников"),
+    (".inputs a\n.outputs y\n.names a b y\n11 1\n", "нет источника"),
+    (".inputs a\n.outputs y\n.names a y\n1 1\n0 0\n", "смешаны"),
+    (".inputs a\n.outputs y\n.names a y\n12 1\n", "неверная строка"),
+    (".inputs a\n.outputs y\n.subckt m x=a y=y\n", "не поддерживается"),
+])
+def test_blif_errors(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        load(tmp_path, 't.blif', text)
+
+
+def test_verilog(tmp_path):
+    text = """// заголовок в стиле ANSI, шина и комментарии
+module t(input a, b, input c, output [2:0] y, output z, w, v);
+  wire n1, \\n2 ;  /* многострочный
+     комментарий */ wire n3;
+  nand g1(n1, a, b);
+  xnor g2(\\n2 , n1, c), g3(n3, a, c);
+  assign y[0] = ~(a & b) | c ^ a & ~c,  // приоритет: & выше ^ выше |
+         y[1] = !(n3);
+  assign y [ 2 ] = 1'b1;
+  assign z = \\n2 ~^ (a | 1'b0);
+  not (w, a);
+  buf b1(v, n1);
+endmodule
+"""
+    gates, connections = load(tmp_path, 't.v', text)
+    nand = lambda a, b, c: 1 - (a & b)
+    xnor = lambda x, y: 1 - (x ^ y)
+    check(gates, connections, [
+        lambda a, b, c: nand(a, b, c) | (c ^ (a & (1 - c))),
+        lambda a, b, c: 1 - xnor(a, c),
+        lambda a, b, c: 1,
+        lambda a, b, c: xnor(xnor(nand(a, b, c), c), a),
+        lambda a, b, c: 1 - a,
+        nand,
+    ])
+
+
+@pytest.mark.parametrize('text, message', [
+    ("module t(a, y); input a; output y; assign y = a & ;\nendmodule\n", "оборвано"),
+    ("module t(a, y); input a; output y; assign y = (a b;\nendmodule\n", "скобки"),
+    ("module t(a, y); input a; output y; mux m(y, a);\nendmodule\n", "не поддерживается"),
+    ("module t(a, y); input a; output y; assign y = a @ a;\nendmodule\n", "непонятный символ"),
+    ("module t(a, y); input a; output y; assign y = a\n", "не закончен"),
+])
+def test_verilog_errors(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        load(tmp_path, 't.v', text)
@@ -0,0 +1,41 @@
+import itertools
+
+import pytest
+
+from circuit_core import Netlist
+from optimize import optimize
+from reference import small_circuits, truth_table
+
+CIRCUITS = small_circuits()
+
+
+def rows_of(netlist):
+    return list(itertools.product((0, 1), repeat=len(netlist.inputs)))
+
+
+def outputs_of(netlist, values):
+    return tuple(values[i] for i in netlist.outputs)
+
+
+@pytest.mark.parametrize('name, gates, connections', CIRCUITS)
+def test_optimize_preserves_function(name, gates, connections):
+    expected = truth_table(gates, connections)
+    netlist = Netlist.from_circuit(gates, connections)
+    optimized = optimize(netlist)
+    assert len(optimized.netlist.types) <= len(netlist.types)
+    for bits, row in zip(rows_of(netlist), expected):
+        original = netlist.evaluate(list(bits))
+        values = optimized.expand(optimized.netlist.evaluate(list(bits)))
+        assert outputs_of(netlist, values) == row
+        # Элементы, оставшиеся в netlist или слитые с другими, сохраняют значения
+        for i, (tap, _) in enumerate(optimized.taps):
+            if tap is not None:
+                assert values[i] == original[i]
+
+
+def test_optimize_folds_constants():
+    name, gates, connections = [circuit for circuit in CIRCUITS if circuit[0] == 'degenerate'][0]
+    optimized = optimize(Netlist.from_circuit(gates, connections))
+    # Остаются IN, OUT и не больше одного элемента на выход, зависящий от входов
+    logic = [typ for typ in optimized.netlist.types if typ not in ('IN', 'OUT')]
+    assert len(logic) <= 4
@@ -0,0 +1,248 @@
+"""Полная проверка схемы перебором всех 2**n наборов входов на нескольких ядрах.
+
+Пространство входов делится на выровненные отрезки по 2**chunk_bits строк.
+Каждый отрезок вычисляется в процессе пула блоками table_block, а частичные
+итоги сводятся в один Summary:
+
+- число единиц (минтермов) каждого выхода;
+- гистограмма векторов OUT (сколько строк даёт каждый вектор);
+- первый контрпример к свойству expect = {номер выхода: значение}
+  или к эквивалентности с эталонной схемой reference.
+
+Netlist передаётся в процессы один раз, при создании пула. Состояние
+регистров и тактовых генераторов считается нулевым.
+"""
+import concurrent.futures
+import os
+import time
+
+from circuit_core import TABLE_CHUNK_BITS
+from perf import monitor
+
+CHUNK_BITS = 20  # строк в одной задаче пула: 2**20
+HISTOGRAM_LIMIT = 16  # гистограмма векторов OUT строится, если выходов не больше
+MAX_INPUTS = 40  # больше входов полным перебором не проверить
+
+_worker = None  # (netlist, expect, reference) в процессе пула
+
+
+def split_lanes(mask, words):
+    """Группирует строки mask по вектору значений слов: {вектор: маска строк}.
+
+    Первое слово — старший бит вектора. Пустые группы не создаются, поэтому
+    групп не больше, чем строк.
+    """
+    groups = {0: mask}
+    for word in words:
+        split = {}
+        for vector, rows in groups.items():
+            ones = rows & word
+            if ones:
+                split[vector << 1 | 1] = ones
+            if ones != rows:
+                split[vector << 1] = rows ^ ones
+        groups = split
+    return groups
+
+
+def check_range(netlist, start, bits, expect=None, reference=None):
+    """Итоги для строк start .. start + 2**bits - 1 (start кратен 2**bits)"""
+    lane_bits = min(bits, TABLE_CHUNK_BITS)
+    step = 1 << lane_bits
+    mask = (1 << step) - 1
+    summary = Summary(len(netlist.outputs))
+    histogram = summary.histogram if len(netlist.outputs) <= HISTOGRAM_LIMIT else None
+
+    for block in range(start, start + (1 << bits), step):
+        words = netlist.table_block(block, lane_bits)
+        for k, word in enumerate(words):
+            summary.minterms[k] += word.bit_count()
+        if histogram is not None:
+            for vector, rows in split_lanes(mask, words).items():
+                histogram[vector] = histogram.get(vector, 0) + rows.bit_count()
+
+        if summary.counterexample is None and (expect or reference is not None):
+            bad = 0
+            for k, value in (expect or {}).items():
+                bad |= words[k] ^ (mask if value else 0)
+            if reference is not None:
+                for word, ref in zip(words, reference.table_block(block, lane_bits)):
+                    bad |= word ^ ref
+            if bad:
+                summary.counterexample = block + (bad & -bad).bit_length() - 1
+    summary.rows = 1 << bits
+    return summary
+
+
+def match_blocks(netlist, out, value, bits, seconds=0.03):
+    """Поиск строк таблицы, где OUT out = value, блоками по 2**bits строк.
+
+    Для фоновой задачи: порциями примерно по seconds выдаёт (доля
+    просмотренного, (просмотрено строк, [(начало блока, совпадений)])).
+    Блоки без совпадений в список не попадают.
+    """
+    total = 1 << len(netlist.inputs)
+    step = 1 << bits
+    full = (1 << step) - 1
+    pos = 0
+    while pos < total:
+        deadline = time.perf_counter() + seconds
+        found = []
+        while pos < total and time.perf_counter() < deadline:
+            word = netlist.table_block(pos, bits)[out]
+            count = (word if value else word ^ full).bit_count()
+            if count:
+                found.append((pos, count))
+            pos += step
+        yield pos / total, (pos, found)
+
+
+def _init_worker(netlist, expect, reference):
+    """Инициализатор процесса пула: netlist распаковывается один раз"""
+    global _worker
+    _worker = (netlist, expect, reference)
+
+
+def _check_chunk(start, bits):
+    netlist, expect, reference = _worker
+    return check_range(netlist, start, bits, expect, reference)
+
+
+class Summary:
+    """Сводные итоги проверки"""
+
+    def __init__(self, n_out):
+        self.rows = 0
+        self.minterms = [0] * n_out
+        self.histogram = {}  # вектор OUT (OUT1 — старший бит) -> число строк
+        self.counterexample = None  # наименьший номер строки, нарушающей свойство
+
+    def merge(self, part):
+        """Добавляет итоги другого отрезка"""
+        self.rows += part.rows
+        self.minterms = [a + b for a, b in zip(self.minterms, part.minterms)]
+        for vector, count in part.histogram.items():
+            self.histogram[vector] = self.histogram.get(vector, 0) + count
+        if part.counterexample is not None and (self.counterexample is None or
+                                                part.counterexample < self.counterexample):
+            self.counterexample = part.counterexample
+
+
+class ExhaustiveCheck:
+    """Перебор всех наборов входов в пуле процессов.
+
+    Для интерфейса: start(), затем периодически poll() до возврата True;
+    cancel() останавливает проверку. Для скриптов — run().
+    При одном процессе (или если перебор умещается в один отрезок) строки
+    считаются здесь же блоками TABLE_CHUNK_BITS в пределах timeout.
+    """
+
+    def __init__(self, netlist, expect=None, reference=None, workers=None,
+                 chunk_bits=CHUNK_BITS, stop_on_fail=False):
+        n_in = len(netlist.inputs)
+        if n_in > MAX_INPUTS:
+            raise ValueError(f"слишком много входов для полного перебора: {n_in} > {MAX_INPUTS}")
+        if reference is not None and (len(reference.inputs) != n_in or
+                                      len(reference.outputs) != len(netlist.outputs)):
+            raise ValueError("эталонная схема должна иметь столько же входов и выходов")
+
+        self.netlist = netlist
+        self.expect = expect
+        self.reference = reference
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bits = min(chunk_bits, n_in)
+        self.total = 1 << n_in
+        self.stop_on_fail = stop_on_fail
+        self.summary = Summary(len(netlist.outputs))
+
+        self.next_start = 0
+        self.pending = set()
+        self.executor = None
+        self.cancelled = False
+        self.started = None
+        self.elapsed = 0.0
+
+    @property
+    def done(self):
+        """Проверка закончена (или отменена)"""
+        stopped = self.stop_on_fail and self.summary.counterexample is not None
+        finished = self.next_start >= self.total or stopped
+        return self.cancelled or finished and not self.pending
+
+    @property
+    def progress(self):
+        """Доля проверенных строк"""
+        return self.summary.rows / self.total
+
+    def start(self):
+        """Создаёт пул процессов; netlist сериализуется один раз"""
+        self.started = time.perf_counter()
+        if self.workers > 1 and self.total > 1 << self.chunk_bits:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker,
+                initargs=(self.netlist, self.expect, self.reference))
+        else:
+            self.chunk_bits = min(self.chunk_bits, TABLE_CHUNK_BITS)
+
+    def submit_more(self):
+        """Держит в очереди пула по две задачи на процесс"""
+        step = 1 << self.chunk_bits
+        while len(self.pending) < 2 * self.workers and self.next_start < self.total:
+            if self.stop_on_fail and self.summary.counterexample is not None:
+                break
+            self.pending.add(self.executor.submit(_check_chunk, self.next_start, self.chunk_bits))
+            self.next_start += step
+
+    def poll(self, timeout=0):
+        """Собирает готовые отрезки и досылает новые; возвращает True по окончании"""
+        if self.done:
+            return True
+        if self.executor is None:
+            # Без пула: блоки считаются здесь, пока не истечёт timeout (хотя бы один)
+            deadline = time.perf_counter() + timeout
+            while True:
+                part = check_range(self.netlist, self.next_start, self.chunk_bits,
+                                   self.expect, self.reference)
+                self.next_start += 1 << self.chunk_bits
+                self.summary.merge(part)
+                if self.done or time.perf_counter() >= deadline:
+                    break
+        else:
+            self.submit_more()
+            ready, self.pending = concurrent.futures.wait(
+                self.pending, timeout, concurrent.futures.FIRST_COMPLETED)
+            for future in ready:
+                self.summary.merge(future.result())
+            self.submit_more()
+
+        self.elapsed = time.perf_counter() - self.started
+        if self.done:
+            self.close()
+            monitor.record('verify', self.elapsed, rows=self.summary.rows, workers=self.workers)
+            return True
+        return False
+
+    def cancel(self):
+        """Останавливает проверку; уже запущенные отрезки дорабатывают в фоне"""
+        self.cancelled = True
+        for future in self.pending:
+            future.cancel()
+        self.pending = set()
+        self.close()
+
+    def close(self):
+        """Освобождает пул процессов"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def run(self, progress=None):
+        """Блокирующая проверка; progress(check) вызывается после каждого опроса"""
+        self.start()
+        try:
+            while not self.poll(timeout=0.2):
+                if progress is not None:
+                    progress(self)
+        finally:
+            self.close()
+        return self.summary
@@ -0,0 +1,178 @@
+"""Запись осциллограмм всех цепей и потоковый экспорт в VCD.
+
+Отсчёт — значения всех элементов netlist после одного шага симуляции
+(такта или пересчёта после переключения входа). Отсчёт упаковывается по
+биту на цепь в строку из (n + 7) // 8 байт и кладётся в кольцевой буфер —
+один bytearray на весь бюджет памяти, без объектов Python на отсчёт.
+Когда буфер заполнен, новые отсчёты затирают самые старые.
+
+VCDWriter пишет изменения по мере записи, поэтому трасса на миллионы
+тактов не держится в памяти целиком: в файл уходят только цепи, значение
+которых изменилось с прошлого отсчёта.
+"""
+import time
+
+from perf import monitor
+
+WAVE_BUDGET = 16 << 20  # память кольцевого буфера по умолчанию, байт
+BITS = bytes.maketrans(b'\x00\x01', b'01')  # значения 0/1 -> цифры двоичной записи
+
+
+def pack_values(values):
+    """Отсчёт как int: бит i — значение цепи i (values — 0/1 на цепь)"""
+    return int(bytes(values)[::-1].translate(BITS) or b'0', 2)
+
+
+def net_names(netlist):
+    """Имена цепей для VCD и панели: IN1.., OUT1.., остальные — тип и номер элемента"""
+    names = [f"{typ.lower()}{i}" for i, typ in enumerate(netlist.types)]
+    for prefix, nodes in (('IN', netlist.inputs), ('OUT', netlist.outputs)):
+        for k, i in enumerate(nodes):
+            names[i] = f"{prefix}{k + 1}"
+    for i, p in netlist.pins.items():
+        names[i] = f"blk{netlist.fanin[i][0]}_out{p}"
+    return names
+
+
+def vcd_id(i):
+    """Короткий идентификатор сигнала VCD из печатных символов '!'..'~'"""
+    chars = []
+    while True:
+        i, rest = divmod(i, 94)
+        chars.append(chr(33 + rest))
+        if not i:
+            return ''.join(chars)
+        i -= 1
+
+
+class WaveformBuffer:
+    """Кольцевой буфер упакованных отсчётов всех цепей"""
+
+    def __init__(self, n_nets, budget=WAVE_BUDGET):
+        self.n_nets = n_nets
+        self.row = max(1, (n_nets + 7) // 8)  # байт на отсчёт
+        self.capacity = max(1, budget // self.row)  # отсчётов в буфере
+        self.data = bytearray(self.capacity * self.row)
+        self.total = 0  # записано отсчётов за всё время
+        self.stream = None  # VCDWriter, которому дублируются отсчёты
+
+    @property
+    def first(self):
+        """Номер самого старого отсчёта, ещё лежащего в буфере"""
+        return max(0, self.total - self.capacity)
+
+    def record(self, values):
+        """Добавляет отсчёт; values — 0/1 на каждую цепь"""
+        packed = pack_values(values)
+        pos = self.total % self.capacity * self.row
+        self.data[pos:pos + self.row] = packed.to_bytes(self.row, 'little')
+        if self.stream is not None:
+            self.stream.write(self.total, packed)
+        self.total += 1
+
+    def sample(self, t):
+        """Отсчёт t как int (бит i — цепь i)"""
+        if not self.first <= t < self.total:
+            raise IndexError(f"отсчёт {t} вне буфера [{self.first}, {self.total})")
+        pos = t % self.capacity * self.row
+        return int.from_bytes(self.data[pos:pos + self.row], 'little')
+
+    def value(self, net, t):
+        """Значение цепи net в отсчёте t"""
+        pos = t % self.capacity * self.row + net // 8
+        return self.data[pos] >> (net % 8) & 1
+
+    def segments(self, net, t0, t1):
+        """Участки постоянного значения цепи в отсчётах [t0, t1): (начало, конец, значение)"""
+        t0, t1 = max(t0, self.first), min(t1, self.total)
+        runs = []
+        for t in range(t0, t1):
+            v = self.value(net, t)
+            if runs and runs[-1][2] == v:
+                runs[-1][1] = t + 1
+            else:
+                runs.append([t, t + 1, v])
+        return [tuple(run) for run in runs]
+
+    def export_vcd(self, path, names):
+        """Сохраняет отсчёты из буфера в VCD"""
+        with VCDWriter(path, names) as writer:
+            for t in range(self.first, self.total):
+                writer.write(t, self.sample(t))
+
+
+class VCDWriter:
+    """Потоковая запись VCD: заголовок сразу, дальше только изменения"""
+
+    def __init__(self, path, names, scope='circuit'):
+        self.file = open(path, 'w', encoding='ascii', errors='replace')
+        self.ids = [vcd_id(i) for i in range(len(names))]
+        self.last = None  # предыдущий записанный отсчёт
+        self.time = None  # время последней записанной метки #t
+        self.end = 0  # время следующего отсчёта
+        self.file.write(f"$date {time.strftime('%Y-%m-%d %H:%M:%S')} $end\n"
+                        "$timescale 1ns $end\n"
+                        f"$scope module {scope} $end\n")
+        self.file.writelines(f"$var wire 1 {ident} {name} $end\n"
+                             for ident, name in zip(self.ids, names))
+        self.file.write("$upscope $end\n$enddefinitions $end\n")
+
+    def write(self, t, packed):
+        """Отсчёт t (int, бит i — цепь i): пишутся только изменившиеся цепи"""
+        ids = self.ids
+        self.end = t + 1
+        if self.last is None:
+            lines = [f"#{t}\n$dumpvars\n"]
+            lines += [f"{packed >> i & 1}{ident}\n" for i, ident in enumerate(ids)]
+            lines.append("$end\n")
+        else:
+            diff = packed ^ self.last
+            if not diff:
+                return
+            lines = [f"#{t}\n"]
+            while diff:
+                low = diff & -diff
+                i = low.bit_length() - 1
+                lines.append(f"{1 if packed & low else 0}{ids[i]}\n")
+                diff ^= low
+        self.file.writelines(lines)
+        self.last = packed
+        self.time = t
+
+    def close(self):
+        """Закрывает файл; метка последнего отсчёта задаёт длину трассы"""
+        if self.time is not None and self.end - 1 != self.time:
+            self.file.write(f"#{self.end - 1}\n")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def trace(netlist, cycles, inputs, state, recorder, initial=False):
+    """cycles тактов с записью значений всех цепей после каждого такта.
+
+    recorder — WaveformBuffer или VCDWriter; initial добавляет отсчёт для
+    исходного состояния. Значения вычисляются скомпилированным ядром;
+    возвращает новое состояние регистров и тактовых генераторов.
+    """
+    start = time.perf_counter()
+    kernel = netlist.kernel(all_nodes=True)
+    inputs = [int(v) for v in inputs]
+    if isinstance(recorder, WaveformBuffer):
+        write = recorder.record
+    else:
+        def write(values):
+            recorder.write(recorder.end, pack_values(values))
+
+    values = kernel.evaluate(inputs, 1, [int(v) for v in state])
+    if initial:
+        write(values)
+    for _ in range(cycles):
+        values = kernel.evaluate(inputs, 1, netlist.next_state(values))
+        write(values)
+    monitor.record('trace', time.perf_counter() - start, cycles=cycles)
+    return [values[i] for i in netlist.state_nodes]
@@ -0,0 +1,96 @@
+"""Фоновые задачи: долгие вычисления в отдельном потоке.
+
+Задача — генератор work(*args), который выдаёт пары (прогресс от 0 до 1,
+частичный результат). Поток прогоняет генератор и кладёт пары в очередь,
+а интерфейс забирает их poll() из root.after и дополняет окно по мере
+готовности — цикл Tk никогда не ждёт вычислений.
+
+cancel() просит поток остановиться: флаг проверяется между шагами
+генератора, поэтому шаг должен быть коротким (блок таблицы, пачка
+наборов, порция тактов). Вычисления идут на чистом Python и делят GIL с
+Tk, но интерпретатор переключает потоки каждые несколько миллисекунд,
+так что окно перерисовывается и откликается на кнопки, пока задача считает.
+"""
+import queue
+import threading
+import time
+
+from perf import monitor
+
+_DONE = object()  # метка конца задачи в очереди
+
+
+class BackgroundJob:
+    """Генератор work(*args) в фоновом потоке с очередью результатов.
+
+    Для интерфейса: start(), затем периодически poll() до done;
+    cancel() останавливает задачу. Исключение из work не теряется:
+    оно попадает в error, а задача считается завершённой.
+    """
+
+    def __init__(self, work, *args, name='job'):
+        self.work = work
+        self.args = args
+        self.name = name
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.progress = 0.0
+        self.done = False
+        self.error = None
+        self.started = None
+        self.elapsed = 0.0
+
+    @property
+    def cancelled(self):
+        """Отмена запрошена"""
+        return self.stop_event.is_set()
+
+    def start(self):
+        """Запускает поток; возвращает саму задачу"""
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        """Тело потока: шаги генератора в очередь до конца или отмены"""
+        try:
+            for item in self.work(*self.args):
+                if self.stop_event.is_set():
+                    break
+                self.queue.put(item)
+        except Exception as e:  # ошибка вычисления — результат задачи, а не падение потока
+            self.queue.put((None, e))
+        finally:
+            self.queue.put(_DONE)
+
+    def poll(self):
+        """Забирает накопившиеся частичные результаты (список, в порядке выдачи)"""
+        results = []
+        while not self.done:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                self.done = True
+                self.elapsed = time.perf_counter() - self.started
+                monitor.record(self.name, self.elapsed, cancelled=int(self.cancelled))
+                break
+            progress, result = item
+            if isinstance(result, Exception):
+                self.error = result
+            else:
+                self.progress = progress
+                results.append(result)
+        return results
+
+    def cancel(self):
+        """Просит поток остановиться после текущего шага"""
+        self.stop_event.set()
+
+    def wait(self, timeout=None):
+        """Ждёт конца потока (для скриптов); все результаты остаются в очереди"""
+        if self.thread is not None:
+            self.thread.join(timeout)